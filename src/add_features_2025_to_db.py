@@ -1,28 +1,24 @@
 # src/add_features_to_db.py
 
-import sqlite3
-import pandas as pd
 from pathlib import Path
 
+from sqlite_bulk import connect, bulk_load
+from feature_store import create_position_views
+
 # 1. Paths
 DB_PATH = Path("data/fpl.db")
 FEATURES_PQ = Path("data/processed/features_2025.parquet")
 
 def main():
-    # 2. Load your newly baked Features parquet
-    df = pd.read_parquet(FEATURES_PQ)
-
-    # 3. Open a sqlite3 connection (will create the DB if it doesn’t exist)
-    conn = sqlite3.connect(DB_PATH)
-
-    # 4. Write the table. If it already exists, replace it.
-    df.to_sql(
-        name="features_2025",
-        con=conn,
-        if_exists="replace",
-        index=False,
-    )
-    print(f"Wrote {len(df):,} rows into table 'features_2025' in {DB_PATH}")
+    # 2. Open a sqlite3 connection (will create the DB if it doesn’t exist)
+    conn = connect(DB_PATH)
+
+    # 3. Bulk-load the newly baked Features parquet. If the table exists, replace it.
+    n = bulk_load(conn, "features_2025", FEATURES_PQ)
+    print(f"Wrote {n:,} rows into table 'features_2025' in {DB_PATH}")
+
+    # 4. Per-position column sets are views over the one table
+    create_position_views(conn, "features_2025")
 
     conn.close()
 
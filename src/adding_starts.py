@@ -1,21 +1,23 @@
-import pandas as pd
 from pathlib import Path
 
-# 1. Define the seasons you want to process
-seasons = ["2023", "2024"]
+from table_schema import TableSchema
 
-for season in seasons:
-    path = Path(f"data/processed/history_{season}.parquet")
-    if not path.exists():
-        print(f"❌ {path} not found, skipping.")
-        continue
+# 1. The seasons whose history (merged CSV) has no 'starts' column
+SEASONS = ["2023", "2024"]
 
-    # 2. Load the existing history
-    df = pd.read_parquet(path)
 
-    # 3. Create 'starts': 1 if minutes > 45, else 0
-    df["starts"] = (df["minutes"] > 45).astype(int)
+def add_starts(seasons=SEASONS):
+    for season in seasons:
+        path = Path(f"data/processed/history_{season}.parquet")
+        if not path.exists():
+            print(f"❌ {path} not found, skipping.")
+            continue
 
-    # 4. Overwrite the Parquet with the new column added
-    df.to_parquet(path, index=False)
-    print(f"✅ history_{season}.parquet updated (added 'starts', new shape={df.shape})")
\ No newline at end of file
+        # 2. Derive 'starts': 1 if minutes > 45, else 0 (computed when the file is read)
+        schema = TableSchema(path)
+        schema.derive("starts", "int(minutes > 45)")
+        print(f"✅ history_{season}.parquet updated (added 'starts', now {len(schema.columns())} cols)")
+
+
+if __name__ == "__main__":
+    add_starts()
@@ -1,8 +1,11 @@
 # src/aggregate_history_to_players.py
 
-import pandas as pd
 from pathlib import Path
 
+import pandas as pd
+
+from table_schema import read_table, write_table
+
 # seasons you’ve got history_<season>.parquet for
 SEASONS = ["2023", "2024", "2025"]
 
@@ -33,41 +36,55 @@ HIST_COLS = [
 
 DATA_DIR = Path("data/processed")
 
-for season in SEASONS:
-    # --- 1) aggregate history_<season>.parquet ---
-    hist_path = DATA_DIR / f"history_{season}.parquet"
-    if not hist_path.exists():
-        print(f"⚠️  {hist_path.name} not found, skipping season {season}.")
-        continue
-
-    df_hist = pd.read_parquet(hist_path)
+def add_history_sums(players, hist):
+    """players with sum_<col> season totals of hist's HIST_COLS; sums of an
+    earlier run are replaced, so this can run again on its own output."""
+    hist = hist.copy()
     # ensure all needed columns are present
     for c in HIST_COLS:
-        if c not in df_hist.columns:
-            df_hist[c] = 0
+        if c not in hist.columns:
+            hist[c] = 0
+    # the API sends influence/creativity/threat/ict_index as decimal strings
+    hist[HIST_COLS] = hist[HIST_COLS].apply(pd.to_numeric, errors="coerce")
     # group & sum
     agg = (
-        df_hist
+        hist
         .groupby("element")[HIST_COLS]
         .sum()
         .add_prefix("sum_")   # sums will be sum_minutes, sum_goals_scored, …
         .reset_index()
     )
-    print(f"  • season {season}: aggregated history shape → {agg.shape}")
-
-    # --- 2) merge into players_<season>.parquet ---
-    players_path = DATA_DIR / f"players_{season}.parquet"
-    if not players_path.exists():
-        print(f"⚠️  {players_path.name} not found, skipping season {season}.")
-        continue
-
-    df_players = pd.read_parquet(players_path)
-    # merge on element
-    merged = df_players.merge(agg, on="element", how="left")
+    players = players.drop(columns=agg.columns.drop("element"), errors="ignore")
+    # merge on element (players_2025 comes from bootstrap-static, keyed by id)
+    if "element" in players.columns:
+        merged = players.merge(agg, on="element", how="left")
+    else:
+        merged = players.merge(agg, left_on="id", right_on="element", how="left").drop(columns="element")
     # fill any NaNs in the new sum_ columns with 0
     sum_cols = [col for col in merged.columns if col.startswith("sum_")]
     merged[sum_cols] = merged[sum_cols].fillna(0)
+    return merged
+
+
+def aggregate_history_to_players(seasons=SEASONS):
+    for season in seasons:
+        # --- 1) history_<season>.parquet ---
+        hist_path = DATA_DIR / f"history_{season}.parquet"
+        if not hist_path.exists():
+            print(f"⚠️  {hist_path.name} not found, skipping season {season}.")
+            continue
+
+        # --- 2) merge its sums into players_<season>.parquet ---
+        players_path = DATA_DIR / f"players_{season}.parquet"
+        if not players_path.exists():
+            print(f"⚠️  {players_path.name} not found, skipping season {season}.")
+            continue
+        merged = add_history_sums(read_table(players_path), read_table(hist_path))
+
+        # overwrite parquet
+        write_table(players_path, merged)
+        print(f"✅ players_{season}.parquet updated; new shape {merged.shape}\n")
+
 
-    # overwrite parquet
-    merged.to_parquet(players_path, index=False)
-    print(f"✅ players_{season}.parquet updated; new shape {merged.shape}\n")
+if __name__ == "__main__":
+    aggregate_history_to_players()
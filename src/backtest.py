@@ -0,0 +1,272 @@
+# src/backtest.py
+#
+# Walk-forward backtests for the per-position models: train on every period
+# up to k, predict k+1..k+h, for each k and position. Fold boundaries are
+# computed once per position, folds/positions run on a thread pool with a
+# fixed thread budget per model, and per-fold predictions are cached on disk
+# keyed by model config and a hash of the rows the fold saw.
+#     python src/backtest.py --model lgbm --params '{"n_estimators": 200}' [--horizon 1]
+#     python src/backtest.py --tuned              # tune.py's configs vs --model
+
+import os
+import json
+import time
+import hashlib
+import argparse
+import importlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+
+import dataset
+from feature_store import read_position, LAKE_DIR
+
+CACHE_DIR = Path("data/backtest_cache")
+POSITIONS = ["GK", "DEF", "MID", "FWD"]
+TARGET    = "gw_points"
+ID_COLS   = ["element", "round", "name", "season"]   # never features
+
+
+class _MeanModel:
+    """Baseline: predicts the training mean (DummyRegressor without sklearn)."""
+
+    def __init__(self, **params):
+        self.mean = 0.0
+
+    def fit(self, X, y):
+        self.mean = float(np.mean(y)) if len(y) else 0.0
+        return self
+
+    def predict(self, X):
+        return np.full(len(X), self.mean, dtype=np.float32)
+
+
+def _estimator(module: str, cls: str, thread_param: str = None):
+    """Factory for a lazily imported estimator; thread_param caps its threads."""
+    def make(params: dict, threads: int):
+        kwargs = dict(params)
+        if thread_param:
+            kwargs.setdefault(thread_param, threads)
+        return getattr(importlib.import_module(module), cls)(**kwargs)
+    return make
+
+
+# config["model"] -> factory(params, threads)
+MODELS = {
+    "mean":  lambda params, threads: _MeanModel(**params),
+    "ridge": _estimator("sklearn.linear_model", "Ridge"),
+    "gbr":   _estimator("sklearn.ensemble", "GradientBoostingRegressor"),
+    "rf":    _estimator("sklearn.ensemble", "RandomForestRegressor", "n_jobs"),
+    "lgbm":  _estimator("lightgbm", "LGBMRegressor", "n_jobs"),
+    "xgb":   _estimator("xgboost", "XGBRegressor", "n_jobs"),
+}
+
+
+class PositionData(NamedTuple):
+    X:        np.ndarray   # (rows, features) float32, rows in (season, round, element) order
+    y:        np.ndarray
+    element:  np.ndarray
+    season:   np.ndarray
+    round:    np.ndarray
+    columns:  list
+    bounds:   np.ndarray   # bounds[p]: first row of period p; bounds[-1] == rows
+    periods:  list         # (season, round) of each period
+    hashes:   list         # hashes[p]: hash of all rows before period p
+
+
+class Fold(NamedTuple):
+    period:     int   # last training period
+    train_end:  int   # rows [0, train_end) train
+    test_start: int   # rows [test_start, test_end) are predicted
+    test_end:   int
+
+
+def _prefix_hashes(X, y, columns, bounds) -> list:
+    """Running content hash at every period boundary, in one pass over the rows."""
+    h = hashlib.sha256(json.dumps(columns).encode())
+    out = [h.hexdigest()]
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        h.update(X[lo:hi].tobytes())
+        h.update(y[lo:hi].tobytes())
+        out.append(h.hexdigest())
+    return out
+
+
+def load_position(pos: str, seasons=None, target: str = TARGET,
+                  lake_dir: Path = LAKE_DIR) -> PositionData:
+    """One read of a position's features per season, in (season, round, element) order."""
+    if seasons is None:
+        seasons = dataset.seasons("features", lake_dir)
+    elif isinstance(seasons, (str, int)):
+        seasons = [seasons]
+    frames = []
+    for s in sorted(str(s) for s in seasons):
+        df = read_position(pos, seasons=s, lake_dir=lake_dir)
+        frames.append(df.assign(season=s).sort_values(["round", "element"], kind="stable"))
+    df = pd.concat(frames, ignore_index=True)
+
+    columns = [c for c in df.columns
+               if c not in ID_COLS and c != target and pd.api.types.is_numeric_dtype(df[c])]
+    X = np.ascontiguousarray(df[columns].to_numpy(dtype=np.float32, na_value=np.nan))
+    y = df[target].to_numpy(dtype=np.float32)
+    season = df["season"].to_numpy()
+    rounds = df["round"].to_numpy(dtype=np.int16)
+
+    # a period is one (season, round); rows of a period are contiguous
+    new = np.r_[True, (rounds[1:] != rounds[:-1]) | (season[1:] != season[:-1])]
+    starts = np.flatnonzero(new)
+    bounds = np.r_[starts, len(df)]
+    periods = [(season[i], int(rounds[i])) for i in starts]
+    return PositionData(X, y, df["element"].to_numpy(), season, rounds, columns,
+                        bounds, periods, _prefix_hashes(X, y, columns, bounds))
+
+
+def make_folds(data: PositionData, min_train: int = 5, horizon: int = 1, step: int = 1) -> list:
+    """Walk-forward folds as row ranges: train on periods [0, k], test on k+1..k+horizon.
+
+    Rows are time-ordered, so every train/test set is a contiguous slice and
+    no index arrays are materialised.
+    """
+    b = data.bounds
+    n = len(data.periods)
+    return [Fold(k, int(b[k + 1]), int(b[k + 1]), int(b[min(k + 1 + horizon, n)]))
+            for k in range(min_train - 1, n - 1, step)]
+
+
+def config_key(config: dict) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def position_configs(config: dict, positions=POSITIONS) -> dict:
+    """{position: config} from one config for all positions, or one already per position."""
+    if "model" in config:
+        return {pos: config for pos in positions}
+    return {pos: config[pos] for pos in positions}
+
+
+def _cache_path(cache_dir: Path, config: dict, pos: str, data: PositionData, fold: Fold) -> Path:
+    """Cache file for one fold: model config + the exact rows the fold trains and tests on."""
+    end_period = int(np.searchsorted(data.bounds, fold.test_end))
+    h = hashlib.sha256(f"{config_key(config)}|{pos}|{fold.train_end}|"
+                       f"{data.hashes[end_period]}".encode()).hexdigest()[:24]
+    return Path(cache_dir) / config_key(config) / f"{pos}-{h}.npy"
+
+
+def _run_fold(config: dict, data: PositionData, fold: Fold, threads: int) -> np.ndarray:
+    model = MODELS[config["model"]](config.get("params", {}), threads)
+    model.fit(data.X[:fold.train_end], data.y[:fold.train_end])
+    return np.asarray(model.predict(data.X[fold.test_start:fold.test_end]), dtype=np.float32)
+
+
+def run_backtest(config: dict, positions=POSITIONS, seasons=None, min_train: int = 5,
+                 horizon: int = 1, step: int = 1, workers: int = None,
+                 threads_per_model: int = 1, cache_dir: Path = CACHE_DIR,
+                 data: dict = None, use_cache=True) -> pd.DataFrame:
+    """Walk-forward predictions for every position and fold.
+
+    config is {"model": name in MODELS, "params": {...}}. Folds of all positions
+    share one pool of `workers` threads, each model limited to threads_per_model
+    (workers defaults to cpu_count // threads_per_model). `data` maps position ->
+    PositionData to reuse already loaded features across runs.
+    Returns one row per prediction: position, fold, season, round, element, y, pred.
+    """
+    if config["model"] not in MODELS:
+        raise KeyError(f"unknown model {config['model']!r}; known: {sorted(MODELS)}")
+    data = data if data is not None else {}
+    for pos in positions:
+        if pos not in data:
+            data[pos] = load_position(pos, seasons)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_model)
+
+    # 1) folds, and which of them the cache already has
+    tasks, preds = [], {}
+    for pos in positions:
+        for fold in make_folds(data[pos], min_train, horizon, step):
+            path = _cache_path(cache_dir, config, pos, data[pos], fold)
+            if use_cache and path.exists():
+                preds[pos, fold.period] = np.load(path)
+            else:
+                tasks.append((pos, fold, path))
+    cached = len(preds)
+
+    # 2) fit the rest in parallel; fitting releases the GIL in lightgbm/xgboost/sklearn
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_fold, config, data[pos], fold, threads_per_model): (pos, fold, path)
+                   for pos, fold, path in tasks}
+        for fut, (pos, fold, path) in futures.items():
+            pred = fut.result()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp.npy")
+            np.save(tmp, pred)
+            os.replace(tmp, path)
+            preds[pos, fold.period] = pred
+    print(f"Backtest {config['model']}: {len(tasks)} folds fitted, {cached} from cache "
+          f"({time.perf_counter() - t0:.2f}s, {workers} workers x {threads_per_model} threads)")
+
+    # 3) one long frame of predictions
+    frames = []
+    for pos in positions:
+        d = data[pos]
+        for fold in make_folds(d, min_train, horizon, step):
+            sl = slice(fold.test_start, fold.test_end)
+            season, rnd = d.periods[fold.period]
+            frames.append(pd.DataFrame({
+                "position": pos, "fold_season": season, "fold_round": rnd,
+                "season": d.season[sl], "round": d.round[sl], "element": d.element[sl],
+                "y": d.y[sl], "pred": preds[pos, fold.period],
+            }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def score(preds: pd.DataFrame, by=("position",)) -> pd.DataFrame:
+    """RMSE / MAE / rows per group of a run_backtest frame."""
+    err = preds["pred"] - preds["y"]
+    g = preds.assign(se=err ** 2, ae=err.abs()).groupby(list(by), sort=False)
+    out = g.agg(rmse=("se", "mean"), mae=("ae", "mean"), rows=("y", "size"))
+    out["rmse"] = np.sqrt(out["rmse"])
+    return out.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the per-position models")
+    parser.add_argument("--model", default="lgbm", choices=sorted(MODELS))
+    parser.add_argument("--params", default="{}", help="estimator params as JSON")
+    parser.add_argument("--positions", nargs="*", default=POSITIONS)
+    parser.add_argument("--seasons", nargs="*", default=None)
+    parser.add_argument("--min-train", type=int, default=5, help="rounds in the first training set")
+    parser.add_argument("--horizon", type=int, default=1, help="rounds predicted per fold")
+    parser.add_argument("--step", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=1, help="threads per model")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--by-fold", action="store_true", help="score every fold, not just positions")
+    parser.add_argument("--tuned", action="store_true",
+                        help="also backtest each position's tune.py config and compare with --model")
+    args = parser.parse_args()
+
+    config = {"model": args.model, "params": json.loads(args.params)}
+    run = lambda cfg, positions: run_backtest(cfg, positions, args.seasons, args.min_train, args.horizon,
+                                              args.step, args.workers, args.threads,
+                                              use_cache=not args.no_cache)
+    preds = run(config, args.positions)
+    by = ["position", "fold_season", "fold_round"] if args.by_fold else ["position"]
+    if not args.tuned:
+        print(score(preds, by).to_string(index=False))
+        return
+
+    from tune import best_config   # tune imports this module
+    tuned = pd.concat([run(best_config(pos), [pos]) for pos in args.positions], ignore_index=True)
+    t = score(preds, by).merge(score(tuned, by), on=by + ["rows"], suffixes=("", "_tuned"))
+    t["change"] = (t["rmse_tuned"] / t["rmse"] - 1).map("{:+.1%}".format)
+    print(t[by + ["rows", "rmse", "rmse_tuned", "change", "mae", "mae_tuned"]].to_string(
+        index=False, float_format=lambda v: f"{v:.4f}"))
+    worse = t.loc[t["rmse_tuned"] > t["rmse"], by[0]].unique().tolist()
+    print(f"⚠️ tuned config is worse for {worse}" if worse else
+          f"✅ tuned configs match or beat {args.model} everywhere")
+
+
+if __name__ == "__main__":
+    main()
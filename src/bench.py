@@ -0,0 +1,254 @@
+# src/bench.py
+#
+# Pipeline benchmark on synthetic data (synth.py). Each scale gets a fresh
+# workspace; the stages below run there `--repeat` times under metrics.stage,
+# and the best wall time and the peak RSS per stage are compared with a
+# stored baseline. Exits 1 when a stage's throughput drops, or its peak
+# memory grows, by more than --tolerance. Peak RSS is this process's only:
+# pool workers (load_element_histories, features_by_position) are not in it.
+# Baselines are machine-specific: save one on the machine that checks them.
+#     python src/bench.py [--scales small medium] [--repeat 3] [--tolerance 0.25]
+#     python src/bench.py --save-baseline            # after an intended change
+#     python src/bench.py --scales large --keep /tmp/fpl-bench
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import tempfile
+import platform
+import argparse
+import contextlib
+import pandas as pd
+from pathlib import Path
+
+import metrics
+import data_storage
+import fixture_index
+import feature_store
+import features_extended
+from table_schema import read_table
+from synth import generate, season_names, LATEST
+from team_ledger import build_team_ledger_for, team_stats_from_fixtures
+from metrics import stage
+
+BASELINE  = Path("data/bench_baseline.json")
+TOLERANCE = 0.25     # relative throughput drop / memory growth that fails the run
+MIN_SLOWER = 0.1     # seconds; smaller slow-downs are timer noise on sub-second stages
+REPEAT    = 3
+# name -> synthetic dataset size; seasons end with LATEST
+SCALES = {
+    "small":  {"players": 200, "rounds": 38, "seasons": 1},
+    "medium": {"players": 700, "rounds": 38, "seasons": 3},
+    "large":  {"players": 700, "rounds": 38, "seasons": 10},
+}
+STAGES = ["load_element_histories", "team_ledger", "team_stats", "features",
+          "features_by_position", "position_split", "load_sqlite"]
+
+
+# --- stages: each runs in the workspace and returns the rows it processed ------
+
+def _load_element_histories(seasons):
+    # a full re-parse every time: without history.parquet nothing is carried over
+    Path(data_storage.PROC_DIR, "history.parquet").unlink(missing_ok=True)
+    data_storage.load_element_histories()
+    return len(pd.read_parquet(Path(data_storage.PROC_DIR, "history.parquet"), columns=["element"]))
+
+
+def _team_ledger(seasons):
+    for s in seasons:
+        build_team_ledger_for(s)
+    return sum(2 * len(pd.read_parquet(f"data/processed/fixtures_{s}.parquet")) for s in seasons)
+
+
+def _team_stats(seasons):
+    n = 0
+    for s in seasons:
+        fx = pd.read_parquet(f"data/processed/fixtures_{s}.parquet")
+        n += len(team_stats_from_fixtures(fx))
+    return n
+
+
+def _features(seasons):
+    for s in seasons:
+        features_extended.build_features_for(s)
+    return _history_rows(seasons)
+
+
+def _features_by_position(seasons):
+    features_extended.build_features_parallel(seasons, by_position=True)
+    return _history_rows(seasons)
+
+
+def _position_split(seasons):
+    # in-memory slices of each season's table, then each position read back from the lake
+    n = 0
+    for s in seasons:
+        tbl = read_table(f"data/processed/features_{s}.parquet", as_arrow=True)
+        n += sum(v.num_rows for v in feature_store.position_slices(tbl).values())
+    for pos in feature_store.POSITIONS.values():
+        n += len(feature_store.read_position(pos, seasons=seasons, lake_dir=Path("data/lake")))
+    return n
+
+
+def _load_sqlite(seasons):
+    data_storage.load_sqlite()
+    return len(pd.read_parquet(f"data/processed/features_{LATEST}.parquet", columns=["element"]))
+
+
+def _history_rows(seasons):
+    return sum(len(pd.read_parquet(f"data/processed/history_{s}.parquet", columns=["element"]))
+               for s in seasons)
+
+
+RUNNERS = {
+    "load_element_histories": _load_element_histories,
+    "team_ledger":            _team_ledger,
+    "team_stats":             _team_stats,
+    "features":               _features,
+    "features_by_position":   _features_by_position,
+    "position_split":         _position_split,
+    "load_sqlite":            _load_sqlite,
+}
+
+
+@contextlib.contextmanager
+def _workspace(path: Path):
+    """chdir into path, with data_storage's absolute paths pointed there too."""
+    saved = (os.getcwd(), data_storage.RAW_DIR, data_storage.PROC_DIR, data_storage.DB_PATH)
+    os.chdir(path)
+    data_storage.RAW_DIR = str(path / "data" / "raw")
+    data_storage.PROC_DIR = str(path / "data" / "processed")
+    data_storage.DB_PATH = str(path / "data" / "fpl.db")
+    fixture_index._CACHE.clear()
+    try:
+        yield
+    finally:
+        os.chdir(saved[0])
+        data_storage.RAW_DIR, data_storage.PROC_DIR, data_storage.DB_PATH = saved[1:]
+        fixture_index._CACHE.clear()
+
+
+def run_scale(name: str, repeat: int = REPEAT, stages=STAGES, keep: Path = None,
+              verbose: bool = False) -> pd.DataFrame:
+    """Benchmark one scale; one row per stage with rows, best wall time,
+    rows/s, CPU time and peak RSS (MB)."""
+    cfg = SCALES[name]
+    seasons = season_names(cfg["seasons"])
+    root = Path(keep) / name if keep else Path(tempfile.mkdtemp(prefix=f"fpl-bench-{name}-"))
+    if root.exists() and keep:
+        shutil.rmtree(root)
+    t0 = time.perf_counter()
+    counts = generate(root, cfg["players"], cfg["rounds"], cfg["seasons"])
+    n_hist = sum(c["history"] for c in counts.values())
+    print(f"{name}: {cfg['players']} players x {cfg['rounds']} rounds x {len(seasons)} season(s), "
+          f"{n_hist:,} history rows (generated in {time.perf_counter() - t0:.1f}s)")
+
+    metrics.enable()
+    rows = {}
+    try:
+        with _workspace(root.resolve()):
+            for i in range(repeat):
+                os.environ["FPL_RUN_ID"] = f"bench-{name}-{i}"
+                for st in stages:
+                    out = io.StringIO()
+                    with contextlib.redirect_stdout(sys.stdout if verbose else out):
+                        with stage(f"bench:{st}") as m:
+                            rows[st] = m.rows_out = RUNNERS[st](seasons)
+            runs = metrics.load_runs(metrics.DB_PATH)
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    runs = runs[runs["run_id"].str.startswith(f"bench-{name}-") & runs["stage"].str.startswith("bench:")]
+    runs = runs.assign(stage=runs["stage"].str.removeprefix("bench:"))
+    res = (runs.groupby("stage", sort=False)
+               .agg(wall_s=("wall_s", "min"), cpu_s=("cpu_s", "min"), peak_rss_mb=("peak_rss_mb", "max"))
+               .reindex(stages))
+    res.insert(0, "rows", pd.Series(rows))
+    res["rows_per_s"] = res["rows"] / res["wall_s"]
+    return res
+
+
+def load_baseline(path: Path = BASELINE) -> dict:
+    if not Path(path).exists():
+        return {}
+    with open(path, "r", encoding="utf8") as f:
+        return json.load(f).get("scales", {})
+
+
+def save_baseline(results: dict, path: Path = BASELINE):
+    """Merge the given scales into the baseline file (other scales are kept)."""
+    scales = load_baseline(path)
+    scales.update({name: res.reset_index(names="stage").to_dict("records")
+                   for name, res in results.items()})
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf8") as f:
+        json.dump({"saved": time.strftime("%Y-%m-%d %H:%M:%S"), "machine": platform.node(),
+                   "python": platform.python_version(), "cpus": os.cpu_count(),
+                   "scales": scales}, f, indent=2)
+    print(f"Wrote {path} ({', '.join(sorted(scales))})")
+
+
+def compare(res: pd.DataFrame, base: list, tolerance: float = TOLERANCE) -> pd.DataFrame:
+    """res next to its baseline records; flag = slower / memory / '' per stage."""
+    out = res.copy()
+    b = pd.DataFrame(base).set_index("stage").reindex(res.index) if base else None
+    out["base_rows_per_s"] = b["rows_per_s"] if b is not None else float("nan")
+    out["change"] = out["rows_per_s"] / out["base_rows_per_s"] - 1
+    out["base_peak_mb"] = b["peak_rss_mb"] if b is not None else float("nan")
+    out["flag"] = ""
+    base_wall = out["rows"] / out["base_rows_per_s"]
+    out.loc[(out["change"] < -tolerance) & (out["wall_s"] - base_wall > MIN_SLOWER), "flag"] = "slower"
+    out.loc[(out["peak_rss_mb"] > out["base_peak_mb"] * (1 + tolerance)) & (out["flag"] == ""),
+            "flag"] = "memory"
+    return out
+
+
+def report(name: str, t: pd.DataFrame):
+    print(f"  {'stage':<24}{'rows':>10}{'wall s':>9}{'rows/s':>12}{'base rows/s':>13}{'change':>8}"
+          f"{'cpu s':>8}{'peak MB':>9}{'base MB':>9}")
+    for st, r in t.iterrows():
+        base = f"{r['base_rows_per_s']:13,.0f}" if pd.notna(r["base_rows_per_s"]) else f"{'-':>13}"
+        change = f"{r['change']:+7.0%}" if pd.notna(r["change"]) else f"{'new':>7}"
+        base_mb = f"{r['base_peak_mb']:9.1f}" if pd.notna(r["base_peak_mb"]) else f"{'-':>9}"
+        print(f"  {st:<24}{int(r['rows']):10,}{r['wall_s']:9.3f}{r['rows_per_s']:12,.0f}{base} "
+              f"{change}{r['cpu_s']:8.2f}{r['peak_rss_mb']:9.1f}{base_mb}  {r['flag']}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data")
+    ap.add_argument("--scales", nargs="+", default=["small", "medium"], choices=list(SCALES))
+    ap.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    ap.add_argument("--repeat", type=int, default=REPEAT, help="runs per stage; the fastest counts")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE)
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    ap.add_argument("--keep", type=Path, default=None, help="keep the workspaces under this directory")
+    ap.add_argument("--verbose", action="store_true", help="show the stages' own output")
+    a = ap.parse_args()
+
+    baseline = load_baseline(a.baseline.resolve())
+    results, flagged = {}, 0
+    for name in a.scales:
+        res = run_scale(name, a.repeat, a.stages, a.keep, a.verbose)
+        results[name] = res
+        t = compare(res, baseline.get(name), a.tolerance)
+        report(name, t)
+        flagged += (t["flag"] != "").sum()
+
+    if a.save_baseline:
+        save_baseline(results, a.baseline)
+        return
+    if not baseline:
+        print(f"No baseline at {a.baseline}; run with --save-baseline to create one")
+        return
+    print(f"{'⚠️ ' + str(flagged) + ' stage(s) regressed' if flagged else '✅ no regressions'} "
+          f"(tolerance {a.tolerance:.0%})")
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
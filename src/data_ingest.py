@@ -1,82 +1,217 @@
 import os
 import json
+import time
+import random
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from understatapi import UnderstatClient
-from statsbombpy import sb
+
+from manifest import Manifest
+from statsbomb_ingest import LocalSource, ApiSource, find_season, ingest
 
 # Base folders
 RAW_DIR = os.path.join(os.path.dirname(__file__), os.pardir, 'data', 'raw')
+LAKE_DIR = os.path.join(os.path.dirname(__file__), os.pardir, 'data', 'lake')
 os.makedirs(RAW_DIR, exist_ok=True)
 
-# Helper to skip existing files
-def _should_skip(path, name):
-    if os.path.exists(path):
-        print(f"{name} already exists, skipping.")
+# FPL API root (override with FPL_API_BASE, e.g. to point at a local stub server)
+FPL_API = os.getenv('FPL_API_BASE', 'https://fantasy.premierleague.com/api')
+
+# Files fetched or revalidated more recently than this are not requested at all
+REFRESH_AFTER = 6 * 3600   # seconds
+
+# Helper to skip files that are still fresh according to the manifest
+def _should_skip(manifest, name):
+    if manifest.is_fresh(name, REFRESH_AFTER):
+        print(f"{name} is fresh, skipping.")
         return True
     return False
 
-def fetch_fpl_bootstrap():
-    out_path = os.path.join(RAW_DIR, 'bootstrap-static.json')
-    if _should_skip(out_path, 'bootstrap-static.json'):
-        return
-    url = 'https://fantasy.premierleague.com/api/bootstrap-static/'
-    resp = requests.get(url)
+def _refresh(manifest, name, url, get=requests.get, headers=None):
+    """Conditional GET of url into the lake as name.
+
+    Returns 'not_modified' (304), 'unchanged' (200 with the same content hash,
+    file left alone) or 'saved', plus the response.
+    """
+    headers = {**(headers or {}), **manifest.conditional_headers(name)}
+    resp = get(url, headers=headers)
+    if resp.status_code == 304:
+        manifest.touch(name)
+        return 'not_modified', resp
     resp.raise_for_status()
-    data = resp.json()
-    with open(out_path, 'w', encoding='utf8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print("Saved bootstrap-static.json")
+    written = manifest.write_if_changed(name, url, resp.content, resp)
+    return ('saved' if written else 'unchanged'), resp
 
-def fetch_fpl_element_history(player_id):
-    fname = f'element-{player_id}-history.json'
-    out_path = os.path.join(RAW_DIR, fname)
-    if _should_skip(out_path, fname):
+def _fetch_one(name, url, headers=None):
+    manifest = Manifest(RAW_DIR)
+    if _should_skip(manifest, name):
         return
-    url = f'https://fantasy.premierleague.com/api/element-summary/{player_id}/'
-    resp = requests.get(url)
-    resp.raise_for_status()
-    data = resp.json()
-    with open(out_path, 'w', encoding='utf8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"Saved {fname}")
+    status, _ = _refresh(manifest, name, url, headers=headers)
+    manifest.save()
+    print(f"Saved {name}" if status == 'saved' else f"{name} unchanged ({status}).")
+
+def fetch_fpl_bootstrap():
+    _fetch_one('bootstrap-static.json', f'{FPL_API}/bootstrap-static/')
+
+def fetch_fpl_element_history(player_id):
+    _fetch_one(f'element-{player_id}-history.json', f'{FPL_API}/element-summary/{player_id}/')
+
+
+# Concurrent element-history refresh: one pooled session shared by a bounded
+# thread pool, throttled by a token bucket and retried on 429/5xx.
+MAX_WORKERS = 16      # concurrent requests in flight
+RATE_LIMIT = 50.0     # requests per second across all workers
+MAX_RETRIES = 5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size=MAX_WORKERS):
+    """requests.Session whose connection pool keeps one keep-alive socket per worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _get_with_retry(session, url, bucket, retries=MAX_RETRIES, backoff=0.5, **kwargs):
+    """GET through the rate limiter, backing off exponentially (or per Retry-After) on 429/5xx."""
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        resp = None
+        try:
+            resp = session.get(url, timeout=30, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+        if resp is not None and resp.status_code not in RETRY_STATUS:
+            resp.raise_for_status()
+            return resp
+        if attempt == retries:
+            resp.raise_for_status()
+        retry_after = resp.headers.get('Retry-After') if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = backoff * 2 ** attempt * (1 + random.random() / 2)
+        time.sleep(delay)
+
+
+def _download_element_history(session, bucket, manifest, player_id, base_url):
+    """Refresh one element-summary; returns (status, bytes received)."""
+    name = f'element-{player_id}-history.json'
+    if manifest.is_fresh(name, REFRESH_AFTER):
+        return 'skipped', 0
+    get = lambda url, headers: _get_with_retry(session, url, bucket, headers=headers)
+    status, resp = _refresh(manifest, name, f'{base_url}/element-summary/{player_id}/', get=get)
+    return status, len(resp.content)
+
+
+def fetch_element_histories(player_ids, max_workers=MAX_WORKERS, rate=RATE_LIMIT,
+                            base_url=FPL_API, raw_dir=RAW_DIR, session=None):
+    """Fetch many element histories concurrently and print a throughput summary.
+
+    Fresh files are skipped and the rest revalidated with conditional GETs, as
+    fetch_fpl_element_history does. Failures after all retries are reported,
+    not raised, so one bad player does not abort the refresh. Returns a dict
+    of counts and timings.
+    """
+    session = session or make_session(max_workers)
+    bucket = TokenBucket(rate)
+    manifest = Manifest(raw_dir)
+    player_ids = list(player_ids)
+    stats = {'saved': 0, 'unchanged': 0, 'not_modified': 0, 'skipped': 0, 'failed': 0, 'bytes': 0}
+    failed = []
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_download_element_history, session, bucket, manifest, pid, base_url): pid
+            for pid in player_ids
+        }
+        for done, fut in enumerate(as_completed(futures), 1):
+            try:
+                status, n_bytes = fut.result()
+            except Exception as e:
+                stats['failed'] += 1
+                failed.append(futures[fut])
+                print(f"Failed element {futures[fut]}: {e}")
+                continue
+            stats[status] += 1
+            stats['bytes'] += n_bytes
+            if done % 100 == 0 or done == len(futures):
+                elapsed = time.perf_counter() - start
+                print(f"  {done}/{len(futures)} element histories ({done / elapsed:.1f}/s)")
+
+    manifest.save()
+    stats['seconds'] = time.perf_counter() - start
+    stats['failed_ids'] = failed
+    requested = len(player_ids) - stats['skipped']
+    rate_s = requested / stats['seconds'] if stats['seconds'] else 0.0
+    print(f"Element histories: {stats['saved']} saved, {stats['unchanged']} unchanged, "
+          f"{stats['not_modified']} not modified, {stats['skipped']} fresh, "
+          f"{stats['failed']} failed in {stats['seconds']:.1f}s "
+          f"({rate_s:.1f} req/s, {stats['bytes'] / 1e6:.1f} MB)")
+    return stats
 
 HEADERS = {'X-Auth-Token': os.getenv('FOOTBALL_DATA_API_KEY', 'YOUR_API_KEY_HERE')}
 
 def fetch_fixtures():
-    out_path = os.path.join(RAW_DIR, 'matches.json')
-    if _should_skip(out_path, 'matches.json'):
-        return
-    url = 'https://api.football-data.org/v4/competitions/PL/matches'
-    resp = requests.get(url, headers=HEADERS)
-    resp.raise_for_status()
-    with open(out_path, 'w', encoding='utf8') as f:
-        json.dump(resp.json(), f, indent=2)
-    print("Saved matches.json")
+    _fetch_one('matches.json', 'https://api.football-data.org/v4/competitions/PL/matches',
+               headers=HEADERS)
 
 def fetch_understat_xg():
     out_path = os.path.join(RAW_DIR, 'understat-players-2025.json')
-    if _should_skip(out_path, 'understat-players-2025.json'):
+    manifest = Manifest(RAW_DIR)
+    if _should_skip(manifest, 'understat-players-2025.json'):
         return
     with UnderstatClient() as client:
         data = client.league(league="EPL").get_player_data(season="2025")
     with open(out_path, 'w', encoding='utf8') as f:
         json.dump(data, f, indent=2)
+    manifest.record('understat-players-2025.json', 'understatapi:EPL/2025')
+    manifest.save()
     print("Saved understat players data")
 
 def fetch_statsbomb_events():
-    out_path = os.path.join(RAW_DIR, 'statsbomb-events-2025.json')
-    if _should_skip(out_path, 'statsbomb-events-2025.json'):
-        return
-    comps = sb.competitions()
-    pl_comps = comps[comps.competition_name == 'Premier League']
-    if not any(pl_comps.season_name == '2025'):
+    """Stream the 2025 PL events into the lake match by match (statsbomb_ingest.py).
+
+    Uses a local open-data checkout when STATSBOMB_DIR is set, else statsbombpy.
+    Matches already in the lake are skipped.
+    """
+    local = os.getenv('STATSBOMB_DIR')
+    source = LocalSource(local) if local else ApiSource()
+    try:
+        competition_id, season_id = find_season(source, 'Premier League', '2025')
+    except LookupError:
         print("No StatsBomb open data for 2025 PL; skipping.")
         return
-    pl_row = pl_comps[pl_comps.season_name == '2025'].iloc[0]
-    events = sb.events(competition_id=pl_row.competition_id,
-                       season_id=pl_row.season_id)
-    events.to_json(out_path, orient='records')
-    print("Saved statsbomb-events-2025.json")
+    ingest(source, competition_id, season_id, lake_dir=LAKE_DIR)
 
 if __name__ == '__main__':
     bs_path = os.path.join(RAW_DIR, 'bootstrap-static.json')
@@ -84,8 +219,7 @@ if __name__ == '__main__':
         bs = json.load(f)
 
     element_ids = [e['id'] for e in bs['elements']]
-    for pid in element_ids:
-        fetch_fpl_element_history(pid)
+    fetch_element_histories(element_ids)
 
     fetch_fixtures()
     fetch_understat_xg()
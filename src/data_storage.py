@@ -2,6 +2,14 @@ import os
 import json
 import sqlite3
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+from manifest import Manifest
+from sqlite_bulk import connect, bulk_load
+from metrics import stage, rows
 
 # Paths
 root = os.path.dirname(__file__)
@@ -13,46 +21,47 @@ DB_PATH = os.path.join(DB_DIR, 'fpl.db')
 # Ensure processed directory exists
 os.makedirs(PROC_DIR, exist_ok=True)
 
-# Helper to skip existing Parquet outputs
-def _should_skip_parquet(path, name):
-    if os.path.exists(path):
-        print(f"{name} already exists, skipping.")
+# Helper to skip Parquet outputs already built from the current raw inputs
+def _should_skip_parquet(manifest, path, name, inputs):
+    changed, removed = manifest.changed_inputs(name, inputs)
+    if os.path.exists(path) and not changed and not removed:
+        print(f"{name} is up to date, skipping.")
         return True
     return False
 
 
 def load_bootstrap():
     """Normalize bootstrap-static.json to players, teams, positions."""
+    manifest = Manifest(RAW_DIR)
+    inputs = ['bootstrap-static.json']
+    outputs = {
+        'players.parquet':   'elements',
+        'teams.parquet':     'teams',
+        'positions.parquet': 'element_types',
+    }
+    todo = {name: rec for name, rec in outputs.items()
+            if not _should_skip_parquet(manifest, os.path.join(PROC_DIR, name), name, inputs)}
+    if not todo:
+        return
+
     bs_path = os.path.join(RAW_DIR, 'bootstrap-static.json')
     with open(bs_path, 'r', encoding='utf8') as f:
         bs = json.load(f)
 
-    # Players
-    players_pq = os.path.join(PROC_DIR, 'players.parquet')
-    if not _should_skip_parquet(players_pq, 'players.parquet'):
-        players = pd.json_normalize(bs, record_path=['elements'])
-        players.to_parquet(players_pq, index=False)
-        print("Wrote players.parquet")
-
-    # Teams
-    teams_pq = os.path.join(PROC_DIR, 'teams.parquet')
-    if not _should_skip_parquet(teams_pq, 'teams.parquet'):
-        teams = pd.json_normalize(bs, record_path=['teams'])
-        teams.to_parquet(teams_pq, index=False)
-        print("Wrote teams.parquet")
-
-    # Positions
-    pos_pq = os.path.join(PROC_DIR, 'positions.parquet')
-    if not _should_skip_parquet(pos_pq, 'positions.parquet'):
-        positions = pd.json_normalize(bs, record_path=['element_types'])
-        positions.to_parquet(pos_pq, index=False)
-        print("Wrote positions.parquet")
+    # Players, teams, positions
+    for name, record_path in todo.items():
+        df = pd.json_normalize(bs, record_path=[record_path])
+        df.to_parquet(os.path.join(PROC_DIR, name), index=False)
+        manifest.mark_built(name, inputs)
+        print(f"Wrote {name}")
+    manifest.save()
 
 
 def load_fixtures():
     """Extract matches list from matches.json, flatten nested data, and write fixtures.parquet."""
+    manifest = Manifest(RAW_DIR)
     fixtures_pq = os.path.join(PROC_DIR, 'fixtures.parquet')
-    if _should_skip_parquet(fixtures_pq, 'fixtures.parquet'):
+    if _should_skip_parquet(manifest, fixtures_pq, 'fixtures.parquet', ['matches.json']):
         return
     json_path = os.path.join(RAW_DIR, 'matches.json')
     with open(json_path, 'r', encoding='utf8') as f:
@@ -65,53 +74,254 @@ def load_fixtures():
         if col in fixtures_df.columns:
             fixtures_df = fixtures_df.drop(columns=[col])
     fixtures_df.to_parquet(fixtures_pq, index=False)
+    manifest.mark_built('fixtures.parquet', ['matches.json'])
+    manifest.save()
     print("Wrote fixtures.parquet")
 
 
-def load_element_histories():
-    """Aggregate per-player history JSONs into history.parquet."""
+def _element_id(fname):
+    return int(fname[len('element-'):-len('-history.json')])
+
+
+# Typed columns of an element-summary "history" record. Strings stay strings
+# (the API sends influence/xG etc. as decimals in quotes).
+HISTORY_SCHEMA = pa.schema([
+    ('element', pa.int64()), ('fixture', pa.int64()), ('opponent_team', pa.int64()),
+    ('total_points', pa.int64()), ('was_home', pa.bool_()), ('kickoff_time', pa.string()),
+    ('team_h_score', pa.int64()), ('team_a_score', pa.int64()), ('round', pa.int64()),
+    ('modified', pa.bool_()), ('minutes', pa.int64()), ('goals_scored', pa.int64()),
+    ('assists', pa.int64()), ('clean_sheets', pa.int64()), ('goals_conceded', pa.int64()),
+    ('own_goals', pa.int64()), ('penalties_saved', pa.int64()), ('penalties_missed', pa.int64()),
+    ('yellow_cards', pa.int64()), ('red_cards', pa.int64()), ('saves', pa.int64()),
+    ('bonus', pa.int64()), ('bps', pa.int64()), ('influence', pa.string()),
+    ('creativity', pa.string()), ('threat', pa.string()), ('ict_index', pa.string()),
+    ('starts', pa.int64()), ('expected_goals', pa.string()), ('expected_assists', pa.string()),
+    ('expected_goal_involvements', pa.string()), ('expected_goals_conceded', pa.string()),
+    ('value', pa.int64()), ('transfers_balance', pa.int64()), ('selected', pa.int64()),
+    ('transfers_in', pa.int64()), ('transfers_out', pa.int64()),
+    # defensive contributions (2025/26) and assistant-manager points (2024/25)
+    ('clearances_blocks_interceptions', pa.int64()), ('recoveries', pa.int64()),
+    ('tackles', pa.int64()), ('defensive_contribution', pa.int64()),
+    ('mng_win', pa.int64()), ('mng_draw', pa.int64()), ('mng_loss', pa.int64()),
+    ('mng_underdog_win', pa.int64()), ('mng_underdog_draw', pa.int64()),
+    ('mng_clean_sheets', pa.int64()), ('mng_goals_scored', pa.int64()),
+])
+HISTORY_SCHEMA_SAMPLE = 64    # files, spread over the list, that type fields not declared above
+HISTORY_BATCH_ROWS = 64_000   # rows buffered before a record batch is flushed
+HISTORY_WORKERS = os.cpu_count() or 1
+HISTORY_FILES_PER_TASK = 32  # files parsed per worker task (one record batch each)
+
+
+def _parse_history_files(paths, schema):
+    """Decode a chunk of element-*-history.json files straight into one typed Arrow record batch.
+
+    Runs in a worker process. Returns (batch or None, unknown field names).
+    """
+    columns = {name: [] for name in schema.names}
+    unknown = set()
+    for path in paths:
+        with open(path, 'r', encoding='utf8') as f:
+            history = json.load(f).get('history', [])
+        if not history:
+            continue
+        element_id = history[0].get('element')
+        unknown |= set(history[0]) - set(columns)
+        for name, values in columns.items():
+            if name == 'element':
+                values.extend([element_id] * len(history))
+            else:
+                values.extend([rec.get(name) for rec in history])
+    if not columns['element']:
+        return None, unknown
+    arrays = [_typed_array(columns[field.name], field.type) for field in schema]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema), unknown
+
+
+def _typed_array(values, type_):
+    """pa.array, except that a string column takes numbers too (a field typed as
+    string because the sampled files disagreed)."""
+    try:
+        return pa.array(values, type_)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if type_ != pa.string():
+            raise
+        return pa.array([None if v is None else str(v) for v in values], type_)
+
+
+def _common_type(a, b):
+    """One type for a field typed a in some files and b in others."""
+    if a == b or pa.types.is_null(b):
+        return a
+    if pa.types.is_null(a):
+        return b
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in (a, b)):
+        return pa.float64()
+    return pa.string()
+
+
+def _history_schema(raw_dir, names, sample=HISTORY_SCHEMA_SAMPLE):
+    """HISTORY_SCHEMA plus the extra fields of a sample of files spread over names.
+
+    A field's type is unified across the sample: ints and floats give float64,
+    any other disagreement string; a field that is null everywhere is string.
+    """
+    step = max(1, len(names) // sample)
+    extra = {}
+    for fname in names[::step][:sample]:
+        with open(os.path.join(raw_dir, fname), 'r', encoding='utf8') as f:
+            history = json.load(f).get('history', [])
+        fields = [k for k in dict.fromkeys(k for rec in history for k in rec)
+                  if k not in HISTORY_SCHEMA.names]
+        for k in fields:
+            try:
+                t = pa.array([rec.get(k) for rec in history]).type
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                t = pa.string()
+            extra[k] = _common_type(extra.get(k, pa.null()), t)
+    return pa.schema(list(HISTORY_SCHEMA) + [
+        pa.field(name, pa.string() if pa.types.is_null(t) else t) for name, t in extra.items()])
+
+
+def _parsed_batches(paths, schema, workers, files_per_task=HISTORY_FILES_PER_TASK):
+    """Yield record batches as the worker pool finishes chunks of files, keeping a bounded number in flight."""
+    chunks = [paths[i:i + files_per_task] for i in range(0, len(paths), files_per_task)]
+    unknown = set()
+    if workers <= 1:
+        results = (_parse_history_files(chunk, schema) for chunk in chunks)
+        for batch, extra in results:
+            unknown |= extra
+            if batch is not None:
+                yield batch
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for chunk in chunks:
+                pending.add(pool.submit(_parse_history_files, chunk, schema))
+                if len(pending) < 2 * workers:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    batch, extra = fut.result()
+                    unknown |= extra
+                    if batch is not None:
+                        yield batch
+            for fut in as_completed(pending):
+                batch, extra = fut.result()
+                unknown |= extra
+                if batch is not None:
+                    yield batch
+    if unknown:
+        print(f"Ignored history fields not in schema: {sorted(unknown)}")
+
+
+@stage
+def load_element_histories(workers=HISTORY_WORKERS, batch_rows=HISTORY_BATCH_ROWS):
+    """Aggregate per-player history JSONs into history.parquet.
+
+    Files are parsed in a process pool, in chunks, into Arrow record batches that are
+    streamed into the parquet writer, so memory is bounded by batch_rows rather
+    than the season. Only files whose content hash changed since the last
+    build are re-parsed; rows for the other players are carried over from the
+    existing parquet.
+    """
+    manifest = Manifest(RAW_DIR)
     history_pq = os.path.join(PROC_DIR, 'history.parquet')
-    if _should_skip_parquet(history_pq, 'history.parquet'):
+    names = sorted(f for f in os.listdir(RAW_DIR)
+                   if f.startswith('element-') and f.endswith('-history.json'))
+    changed, removed = manifest.changed_inputs('history.parquet', names)
+    if os.path.exists(history_pq) and not changed and not removed:
+        print("history.parquet is up to date, skipping.")
         return
-    records = []
-    for fname in os.listdir(RAW_DIR):
-        if fname.startswith('element-') and fname.endswith('-history.json'):
-            with open(os.path.join(RAW_DIR, fname), 'r', encoding='utf8') as f:
-                data = json.load(f)
-            history = data.get('history', [])
-            element_id = history[0].get('element') if history else None
-            for rec in history:
-                rec['element'] = element_id
-                records.append(rec)
-    if records:
-        hist_df = pd.DataFrame(records)
-        hist_df.to_parquet(history_pq, index=False)
-        print("Wrote history.parquet")
+
+    carry_over = os.path.exists(history_pq) and 'history.parquet' in manifest.outputs
+    if carry_over:
+        schema = pq.read_schema(history_pq).remove_metadata()
     else:
+        changed = names
+        schema = _history_schema(RAW_DIR, names)
+
+    n_read = 0   # history rows read: the old file's plus the re-parsed ones
+
+    def batches():
+        nonlocal n_read
+        # 1) untouched players straight from the old file, row group by row group
+        if carry_over:
+            stale = pa.array(sorted(_element_id(f) for f in changed + removed), pa.int64())
+            for batch in pq.ParquetFile(history_pq).iter_batches(batch_size=batch_rows):
+                n_read += batch.num_rows
+                keep = pc.invert(pc.is_in(batch.column('element').cast(pa.int64()), stale))
+                yield batch.filter(keep)
+        # 2) re-parsed files from the worker pool
+        for batch in _parsed_batches([os.path.join(RAW_DIR, f) for f in changed], schema, workers):
+            n_read += batch.num_rows
+            yield batch
+
+    # 3) buffer up to batch_rows rows, then flush one row group
+    tmp = history_pq + '.tmp'
+    n_rows, buffered, buffered_rows = 0, [], 0
+    with pq.ParquetWriter(tmp, schema) as writer:
+        for batch in batches():
+            buffered.append(batch)
+            buffered_rows += batch.num_rows
+            if buffered_rows >= batch_rows:
+                writer.write_table(pa.Table.from_batches(buffered, schema))
+                n_rows += buffered_rows
+                buffered, buffered_rows = [], 0
+        if buffered:
+            writer.write_table(pa.Table.from_batches(buffered, schema))
+            n_rows += buffered_rows
+
+    rows(rows_in=n_read, rows_out=n_rows)
+    if n_rows:
+        os.replace(tmp, history_pq)
+        manifest.mark_built('history.parquet', names)
+        manifest.save()
+        print(f"Wrote history.parquet ({n_rows} rows, re-parsed {len(changed)} of {len(names)} files)")
+    else:
+        os.remove(tmp)
         print("No element history found, skipping history.parquet")
 
 
+@stage
+def publish_season(season='2025'):
+    """Write the loaders' history.parquet / players.parquet as history_{season} /
+    players_{season}, players with their season sums (aggregate_history_to_players.py).
+
+    The only writer of those two files: later cleaning goes into their schema
+    logs, which a freshly written file replays in full (table_schema.py).
+    """
+    from aggregate_history_to_players import add_history_sums
+
+    hist = pd.read_parquet(os.path.join(PROC_DIR, 'history.parquet'))
+    players = add_history_sums(pd.read_parquet(os.path.join(PROC_DIR, 'players.parquet')), hist)
+    for name, df in ((f'history_{season}', hist), (f'players_{season}', players)):
+        out = os.path.join(PROC_DIR, f'{name}.parquet')
+        df.to_parquet(out + '.tmp', index=False)
+        os.replace(out + '.tmp', out)
+        print(f"Wrote {name}.parquet ({len(df)} rows)")
+    rows(rows_in=len(hist), rows_out=len(hist) + len(players))
+
+
+@stage
 def load_sqlite():
     """Load all Parquet tables into an SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     tables = ['players_2025','players_2024', 'players_2023', 'teams', 'positions', 'fixtures', 'history_2025', 'history_2024','history_2023', 'features']
     tables1 = ['features_2025']
+    loaded = 0
     for tbl in tables1:
         pq_path = os.path.join(PROC_DIR, f"{tbl}.parquet")
         if os.path.exists(pq_path):
-            df = pd.read_parquet(pq_path)
-            # Ensure no nested lists/dicts remain
-            for col in df.columns:
-                if df[col].apply(lambda x: isinstance(x, (list, dict))).any():
-                    df = df.drop(columns=[col])
-            df.to_sql(tbl, conn, if_exists='replace', index=False)
-            print(f"Loaded {tbl}.parquet into SQLite table '{tbl}'")
+            # nested list/dict columns are dropped from the Arrow schema by bulk_load
+            n = bulk_load(conn, tbl, pq_path)
+            loaded += n
+            print(f"Loaded {tbl}.parquet into SQLite table '{tbl}' ({n} rows)")
         else:
             print(f"{tbl}.parquet not found, skipping")
     conn.close()
+    rows(rows_out=loaded)
     print(f"SQLite database created at {DB_PATH}")
 
-
 if __name__ == '__main__':
     #load_bootstrap()
     #load_fixtures()
@@ -0,0 +1,191 @@
+# src/dataset.py
+#
+# One hive-partitioned parquet dataset per table under data/lake:
+#     data/lake/history/season=2025/round=12/part-0.parquet
+#     data/lake/features/season=2025/position=MID/part-0.parquet
+# Readers push season/round/position predicates and column projections down
+# to pyarrow, so only matching directories, row groups and columns are read.
+#     python src/dataset.py migrate [SEASON ...]
+#     python src/dataset.py info
+
+import os
+import sys
+import shutil
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pathlib import Path
+
+from table_schema import read_table
+from dtypes import compact_table, PARQUET_OPTIONS
+
+DATA_DIR = Path("data/processed")
+LAKE_DIR = Path("data/lake")
+POSITIONS = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+UNKNOWN_POSITION = "UNK"   # element_type outside POSITIONS (0 = player missing from players_{season})
+
+# table -> (partition columns below season, sort order inside each file)
+DATASETS = {
+    "history":     (["round"],    ["element", "round"]),
+    "players":     ([],           ["id"]),
+    "fixtures":    ([],           ["round"]),
+    "team_ledger": ([],           ["team_id", "round"]),
+    "features":    (["position"], ["round", "element"]),
+}
+# types of the directory keys, whatever the files hold
+PARTITION_TYPES = {"season": pa.string(), "round": pa.int8(), "position": pa.string()}
+ROW_GROUP_ROWS = 4096   # rounds stay contiguous, so round filters skip whole row groups
+
+
+def _partitioning(name: str):
+    keys = ["season"] + DATASETS[name][0]
+    return ds.partitioning(pa.schema([(k, PARTITION_TYPES[k]) for k in keys]), flavor="hive")
+
+
+def _prepare(name: str, data) -> pa.Table:
+    """Apply the dtype policy, add derived partition keys and sort so row-group
+    statistics are tight."""
+    tbl = compact_table(data)
+    parts, sort_by = DATASETS[name]
+    if "position" in parts and "position" not in tbl.column_names:
+        etype = tbl["element_type"].cast(pa.int8())
+        known = pc.fill_null(pc.is_in(etype, pa.array(list(POSITIONS), pa.int8())), False)
+        # choose() rejects out-of-range indices even where if_else discards them
+        index = pc.if_else(known, pc.subtract(etype, 1), pa.scalar(0, pa.int8()))
+        pos = pc.if_else(known, pc.choose(index, *[pa.scalar(p) for p in POSITIONS.values()]),
+                         pa.scalar(UNKNOWN_POSITION))
+        n_unknown = pc.sum(pc.invert(known)).as_py() or 0
+        if n_unknown:
+            print(f"{name}: {n_unknown} rows with an unknown element_type → position={UNKNOWN_POSITION}")
+        tbl = tbl.append_column("position", pos)
+    sort_by = [c for c in sort_by if c in tbl.column_names]
+    if sort_by:
+        tbl = tbl.sort_by([(c, "ascending") for c in sort_by])
+    return tbl
+
+
+def _write(name: str, tbl: pa.Table, dest: Path, basename="part-{i}.parquet",
+           behavior="error"):
+    parts = DATASETS[name][0]
+    ds.write_dataset(
+        tbl, dest, format="parquet",
+        file_options=ds.ParquetFileFormat().make_write_options(**PARQUET_OPTIONS),
+        partitioning=ds.partitioning(
+            pa.schema([(k, tbl.schema.field(k).type) for k in parts]), flavor="hive"
+        ) if parts else None,
+        basename_template=basename,
+        existing_data_behavior=behavior,
+        min_rows_per_group=min(ROW_GROUP_ROWS, max(tbl.num_rows, 1)),
+        max_rows_per_group=ROW_GROUP_ROWS,
+    )
+
+
+def write_season(name: str, data, season: str, lake_dir: Path = LAKE_DIR):
+    """Replace one season's partition of `name` with `data` (DataFrame or Arrow table).
+
+    The season is written to a hidden sibling directory and swapped in, so
+    readers never see a half-written season.
+    """
+    tbl = _prepare(name, data)
+    root = Path(lake_dir) / name
+    final = root / f"season={season}"
+    tmp = root / f"_tmp-season={season}"
+    old = root / f"_old-season={season}"
+    for d in (tmp, old):
+        shutil.rmtree(d, ignore_errors=True)
+    root.mkdir(parents=True, exist_ok=True)
+
+    _write(name, tbl, tmp)
+    if final.exists():
+        os.replace(final, old)
+    os.replace(tmp, final)
+    shutil.rmtree(old, ignore_errors=True)
+    print(f"Wrote {name} season={season}: {tbl.num_rows} rows → {final}")
+
+
+def append_rounds(name: str, data, season: str, lake_dir: Path = LAKE_DIR):
+    """Add rows for new rounds as extra files in the season's existing partitions.
+
+    Files are named after the round range, so re-appending the same rounds
+    overwrites them rather than duplicating rows.
+    """
+    tbl = _prepare(name, data)
+    if tbl.num_rows == 0:
+        return
+    lo, hi = pc.min_max(tbl["round"]).values()
+    basename = f"rounds-{lo.as_py()}-{hi.as_py()}-{{i}}.parquet"
+    _write(name, tbl, Path(lake_dir) / name / f"season={season}",
+           basename=basename, behavior="overwrite_or_ignore")
+    print(f"Appended {name} season={season} rounds {lo}-{hi}: {tbl.num_rows} rows")
+
+
+def dataset(name: str, lake_dir: Path = LAKE_DIR) -> ds.Dataset:
+    return ds.dataset(Path(lake_dir) / name, format="parquet", partitioning=_partitioning(name))
+
+
+def seasons(name: str, lake_dir: Path = LAKE_DIR) -> list:
+    """Seasons present in a dataset; adding a season is adding a season= directory."""
+    root = Path(lake_dir) / name
+    if not root.exists():
+        return []
+    return sorted(d.name.split("=", 1)[1] for d in root.iterdir()
+                  if d.is_dir() and d.name.startswith("season="))
+
+
+def _filter(seasons=None, rounds=None, positions=None, where=None):
+    expr = None
+    for field, values in (("season", seasons), ("round", rounds), ("position", positions)):
+        if values is None:
+            continue
+        if isinstance(values, (str, int)):
+            values = [values]
+        values = [str(v) for v in values] if field == "season" else list(values)
+        cond = ds.field(field).isin(values)
+        expr = cond if expr is None else expr & cond
+    if where is not None:
+        expr = where if expr is None else expr & where
+    return expr
+
+
+def read(name: str, columns=None, seasons=None, rounds=None, positions=None,
+         where=None, lake_dir: Path = LAKE_DIR, as_arrow=False):
+    """Read `name` with season/round/position predicates and a column projection.
+
+    e.g. MID features for rounds 30-38 of every season:
+        read("features", positions="MID", rounds=range(30, 39), columns=["element", "points_4"])
+    `where` is an extra pyarrow.dataset expression. Partition keys can be selected
+    like any other column.
+    """
+    tbl = dataset(name, lake_dir).to_table(
+        columns=columns, filter=_filter(seasons, rounds, positions, where)
+    )
+    return tbl if as_arrow else tbl.to_pandas()
+
+
+def migrate(season_list=None, tables=None, data_dir: Path = DATA_DIR, lake_dir: Path = LAKE_DIR):
+    """Copy the per-season {table}_{season}.parquet files into the lake, schema log applied."""
+    if not season_list:
+        season_list = sorted({p.stem.rsplit("_", 1)[1] for p in Path(data_dir).glob("history_*.parquet")})
+    for season in season_list:
+        for name in tables or DATASETS:
+            src = Path(data_dir) / f"{name}_{season}.parquet"
+            if not src.exists():
+                print(f"{src.name} not found, skipping")
+                continue
+            write_season(name, read_table(src, as_arrow=True), season, lake_dir)
+
+
+def info(lake_dir: Path = LAKE_DIR):
+    for name in DATASETS:
+        if not (Path(lake_dir) / name).exists():
+            continue
+        d = dataset(name, lake_dir)
+        print(f"{name:<12} seasons={seasons(name, lake_dir)} files={len(d.files)} "
+              f"rows={d.count_rows()}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        migrate(sys.argv[2:])
+    else:
+        info()
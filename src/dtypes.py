@@ -0,0 +1,140 @@
+# src/dtypes.py
+#
+# One dtype policy for players, history and feature tables, applied when
+# parquet/lake/SQLite tables are written. Readers get the compact types back
+# from parquet (int8/int16, float32, categorical names) with no extra step.
+#     python src/dtypes.py [PARQUET ...]      # savings report
+
+import io
+import sys
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pathlib import Path
+
+DATA_DIR = Path("data/processed")
+
+# ids, small counts and 0/1 flags
+INT8_COLS = [
+    "element_type", "round", "team_id", "opp_team_id", "opponent_team", "team",
+    "home_team_id", "away_team_id", "home_goals", "away_goals",
+    "goals_scored", "goals_conceded", "points", "opp_points",
+    "opp_goals_scored", "opp_goals_conceded", "clean_sheet", "opp_clean_sheet",
+    "double_gw", "blank_gw", "is_home", "start_flag", "full_match_flag", "starts",
+    "fixtures_next_3", "fixtures_next_5", "dgw_next_3", "dgw_next_5",
+]
+# player ids, tenths-of-a-million prices, minutes and points
+INT16_COLS = ["element", "id", "price", "now_cost", "minutes", "gw_points", "total_points"]
+# repeated labels
+DICT_COLS = ["name", "first_name", "second_name", "web_name", "team_name", "short_name", "position"]
+
+# writer settings that go with the policy
+PARQUET_OPTIONS = {"compression": "zstd"}
+
+_INT_TYPES = {**{c: pa.int8() for c in INT8_COLS}, **{c: pa.int16() for c in INT16_COLS}}
+
+
+def policy_type(name: str, t: pa.DataType):
+    """Target type for a column under the policy, or None to leave it alone."""
+    if pa.types.is_string(t) or pa.types.is_large_string(t):
+        # names and team/position labels
+        if name in DICT_COLS or name in _INT_TYPES:
+            return pa.dictionary(pa.int32(), pa.string())
+        return None
+    if name in _INT_TYPES and (pa.types.is_integer(t) or pa.types.is_floating(t)):
+        return _INT_TYPES[name]
+    if pa.types.is_float64(t):
+        return pa.float32()
+    return None
+
+
+def _cast_int(col, target):
+    """Checked cast to the policy's int type, widened if the values outgrow it.
+
+    Non-whole floats (or NaN) stay floating, as float32.
+    """
+    for t in (target, pa.int16(), pa.int32(), pa.int64()):
+        if t.bit_width < target.bit_width:
+            continue
+        try:
+            return pc.cast(col, t, safe=True)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+    return col.cast(pa.float32(), safe=False) if pa.types.is_floating(col.type) else col
+
+
+def apply_policy(tbl: pa.Table) -> pa.Table:
+    """Cast every column the policy covers. Int casts are checked, so an id or
+    count that outgrows int8/int16 is widened instead of wrapping."""
+    for i, field in enumerate(tbl.schema):
+        target = policy_type(field.name, field.type)
+        if target is None or target == field.type:
+            continue
+        col = tbl.column(i)
+        if pa.types.is_dictionary(target):
+            col = pc.dictionary_encode(col)
+        elif pa.types.is_integer(target):
+            col = _cast_int(col, target)
+        else:
+            col = col.cast(target, safe=False)
+        tbl = tbl.set_column(i, pa.field(field.name, col.type, field.nullable), col)
+    return tbl
+
+
+def compact_table(data) -> pa.Table:
+    """DataFrame or Arrow table -> Arrow table under the policy."""
+    if not isinstance(data, pa.Table):
+        data = pa.Table.from_pandas(data, preserve_index=False)
+    return apply_policy(data)
+
+
+def compact_frame(df):
+    """The same policy for an in-memory DataFrame (float32, int8/16, categorical)."""
+    return compact_table(df).to_pandas()
+
+
+def write_parquet(data, path):
+    """Write a DataFrame/Arrow table as parquet under the policy."""
+    pq.write_table(compact_table(data), path, **PARQUET_OPTIONS)
+
+
+def _parquet_size(tbl: pa.Table, **options) -> int:
+    buf = io.BytesIO()
+    pq.write_table(tbl, buf, **options)
+    return buf.tell()
+
+
+def savings(tbl: pa.Table) -> dict:
+    """In-memory and parquet bytes before and after the policy."""
+    after = apply_policy(tbl)
+    return {
+        "rows": tbl.num_rows,
+        "mem_before": tbl.nbytes, "mem_after": after.nbytes,
+        "file_before": _parquet_size(tbl), "file_after": _parquet_size(after, **PARQUET_OPTIONS),
+    }
+
+
+def report(paths):
+    """Print the savings for each parquet file, measured from its float64/int64/string form.
+
+    RAM is Arrow buffer size; a pandas frame with object-string names saves more.
+    """
+    for p in paths:
+        tbl = pq.read_table(p)
+        # measure against the wide types the tables used before the policy
+        wide = tbl.cast(pa.schema([
+            pa.field(f.name, pa.float64() if pa.types.is_floating(f.type) else
+                     pa.int64() if pa.types.is_integer(f.type) else
+                     f.type.value_type if pa.types.is_dictionary(f.type) else f.type)
+            for f in tbl.schema
+        ]))
+        s = savings(wide)
+        print(f"{Path(p).name:<36} rows={s['rows']:>8,} "
+              f"RAM {s['mem_before'] / 2**20:7.2f} → {s['mem_after'] / 2**20:7.2f} MB "
+              f"({1 - s['mem_after'] / max(s['mem_before'], 1):.0%} less)  "
+              f"file {s['file_before'] / 2**20:7.2f} → {s['file_after'] / 2**20:7.2f} MB "
+              f"({1 - s['file_after'] / max(s['file_before'], 1):.0%} less)")
+
+
+if __name__ == "__main__":
+    report(sys.argv[1:] or sorted(DATA_DIR.glob("*.parquet")))
@@ -0,0 +1,94 @@
+# src/feature_store.py
+#
+# One feature store per season, partitioned by position (data/lake/features,
+# season=/position=, see dataset.py) plus one SQLite table indexed on
+# (element_type, round). Per-position column sets are declared here and
+# applied as projections / SQL views instead of stored as separate copies.
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from pathlib import Path
+
+import dataset
+
+LAKE_DIR  = dataset.LAKE_DIR
+POSITIONS = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+
+# columns each position's models leave out (formerly prune_features.py)
+OUTFIELD_DROP = ["blank_gw", "saves_4", "saves_10", "penalties_saved_38"]
+POSITION_DROPS = {
+    "GK":  ["full_match_4", "red_propensity", "penalties_missed_38",
+            "threat_4", "xg_4", "xg_10", "team_goals_scored_10", "blank_gw"],
+    "DEF": OUTFIELD_DROP + ["penalties_missed_38"],
+    "MID": OUTFIELD_DROP,
+    "FWD": OUTFIELD_DROP,
+}
+
+
+def position_columns(pos: str, columns) -> list:
+    """The stored feature columns a position's view exposes, in store order."""
+    drop = set(POSITION_DROPS[pos])
+    return [c for c in columns if c not in drop and c not in ("season", "position")]
+
+
+def stored_columns(lake_dir: Path = LAKE_DIR) -> list:
+    return dataset.dataset("features", lake_dir).schema.names
+
+
+def read_position(pos: str, seasons=None, rounds=None, columns=None,
+                  lake_dir: Path = LAKE_DIR, as_arrow=False):
+    """A position's features: its partition only, projected to its column set.
+
+    columns narrows the view further (must be a subset of the position's columns).
+    """
+    view = position_columns(pos, stored_columns(lake_dir))
+    if columns is not None:
+        missing = set(columns) - set(view)
+        if missing:
+            raise KeyError(f"{sorted(missing)} not in the {pos} feature view")
+        view = list(columns)
+    return dataset.read("features", columns=view, seasons=seasons, rounds=rounds,
+                        positions=pos, lake_dir=lake_dir, as_arrow=as_arrow)
+
+
+def position_slices(tbl: pa.Table) -> dict:
+    """Zero-copy per-position views of an in-memory feature table.
+
+    The table is sorted by element_type once (if it is not already); every
+    position is then a contiguous slice with its column set selected, so no
+    values are copied.
+    """
+    etype = tbl["element_type"]
+    if len(etype) and not pc.all(pc.greater_equal(etype[1:], etype[:-1])).as_py():
+        tbl = tbl.sort_by([("element_type", "ascending")])
+        etype = tbl["element_type"]
+    views = {}
+    for code, pos in POSITIONS.items():
+        lo = pc.sum(pc.less(etype, code)).as_py() or 0
+        n  = pc.sum(pc.equal(etype, code)).as_py() or 0
+        views[pos] = tbl.slice(lo, n).select(position_columns(pos, tbl.column_names))
+    return views
+
+
+def create_position_views(conn, table: str):
+    """features_{season}_{POS} as SQL views over the single `table`.
+
+    Replaces any old per-position tables of the same name.
+    """
+    cols = [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+    conn.execute("BEGIN")
+    try:
+        for code, pos in POSITIONS.items():
+            view = f"{table}_{pos}"
+            # DROP TABLE on a view (or DROP VIEW on a table) is an error, so ask first
+            row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (view,)).fetchone()
+            if row:
+                conn.execute(f'DROP {row[0].upper()} "{view}"')
+            select = ", ".join(f'"{c}"' for c in position_columns(pos, cols))
+            conn.execute(f'CREATE VIEW "{view}" AS SELECT {select} FROM "{table}" '
+                         f'WHERE element_type = {code}')
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    print(f"Created views {', '.join(f'{table}_{p}' for p in POSITIONS.values())}")
@@ -1,8 +1,11 @@
 import os
-import json
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+from fixture_index import build_index, clubs_played_for, from_matches_json
+from player_map import understat_records, fpl_players, resolve
+
 def build_features():
     # ---------------------------------------------------------------------------------
     # 1. Define paths
@@ -47,16 +50,13 @@ def build_features():
     # ---------------------------------------------------------------------------------
     # 5. fixture_diff: map opponent_team → strength_ratio
     # ---------------------------------------------------------------------------------
-    # Build diff_map from teams.strength (scaled 0–1)
+    # Dense lookup by team id from teams.strength (scaled 0–1), 1.0 if it isn’t available
+    strength = np.ones(int(max(teams['id'].max(), df['opponent_team'].max())) + 1)
     if 'strength' in teams.columns:
-        max_strength = teams['strength'].max()
-        diff_map = (teams.set_index('id')['strength'] / max_strength).to_dict()
-    else:
-        # Fallback if “strength” isn’t available
-        diff_map = {tid: 1.0 for tid in teams['id']}
+        strength[teams['id'].to_numpy()] = teams['strength'] / teams['strength'].max()
 
     # “opponent_team” is the FPL ID of the opponent in that GW
-    df['fixture_diff'] = df['opponent_team'].map(diff_map)
+    df['fixture_diff'] = strength[df['opponent_team'].to_numpy()]
 
     # ---------------------------------------------------------------------------------
     # 6. is_home flag (0/1) comes directly from history.was_home
@@ -66,40 +66,14 @@ def build_features():
     # ---------------------------------------------------------------------------------
     # 7. Double/Blank GW flags: count how many fixtures each team has in each round
     # ---------------------------------------------------------------------------------
-    # 7a. Read matches.json and flatten with json_normalize
-    with open(raw_dir / 'matches.json', 'r', encoding='utf8') as f:
-        raw_matches = json.load(f)
-
-    matches = pd.json_normalize(raw_matches['matches'], sep='_').rename(columns={'id': 'match_id'})
-    # Ensure types for merging
-    matches['matchday']    = matches['matchday'].astype(int)
-    matches['homeTeam_id'] = matches['homeTeam_id'].astype(int)
-    matches['awayTeam_id'] = matches['awayTeam_id'].astype(int)
-
-    # 7b. Build a small table listing (matchday, team_id) for every fixture
-    home_entries = matches[['matchday', 'homeTeam_id']].rename(columns={'homeTeam_id': 'team_id'})
-    away_entries = matches[['matchday', 'awayTeam_id']].rename(columns={'awayTeam_id': 'team_id'})
-
-    gw_counts = (
-        pd.concat([home_entries, away_entries], ignore_index=True)
-          .groupby(['matchday', 'team_id'])
-          .size()
-          .reset_index(name='gw_matches')
-    )
-
-    # 7c. Merge “gw_counts” onto df using (round, team)
-    df = df.merge(
-        gw_counts,
-        left_on=['round', 'team'],
-        right_on=['matchday', 'team_id'],
-        how='left'
-    )
-    df['gw_matches'] = df['gw_matches'].fillna(0).astype(int)
-    df['double_gw']  = (df['gw_matches'] > 1).astype(int)
-    df['blank_gw']   = (df['gw_matches'] == 0).astype(int)
-
-    # Clean up the temporary merge columns
-    df.drop(columns=['matchday', 'team_id', 'gw_matches'], inplace=True)
+    # Dense [team, round] fixture counts built once from matches.json (see fixture_index.py)
+    index = build_index(from_matches_json(raw_dir / 'matches.json'))
+    # the club each row was played for, from its fixture (players.team is the current club)
+    team = clubs_played_for(index, df['element'], df['opponent_team'].fillna(-1), df['round'],
+                            df['was_home'], df['team'])
+    gw_matches = index.at(index.count, team, df['round'])
+    df['double_gw']  = (gw_matches > 1).astype(int)
+    df['blank_gw']   = (gw_matches == 0).astype(int)
 
     # ---------------------------------------------------------------------------------
     # 8. Price and minutes indicators
@@ -113,12 +87,13 @@ def build_features():
     # 9. Understat’s xG / xA features (if the JSON exists)
     # ---------------------------------------------------------------------------------
     try:
-        with open(raw_dir / 'understat-players-2025.json', 'r', encoding='utf8') as f:
-            us_list = json.load(f)
-        us = pd.json_normalize(us_list)
-        # Understat fields include “player_name”, “xG”, “xA” (among others)
-        us = us[['player_name', 'xG', 'xA']]
-        df = df.merge(us, left_on='web_name', right_on='player_name', how='left')
+        us = understat_records('2025', raw_dir)
+        # Understat names → FPL element by name + club (cached in fpl.db’s player_id_map)
+        ids = resolve(us, 'understat', '2025', players=fpl_players(players=players, teams=teams),
+                      db_path=project_root / 'data' / 'fpl.db')
+        us = us[['source_id', 'xG', 'xA']].merge(ids[['source_id', 'element']], on='source_id')
+        df = df.merge(us.dropna(subset=['element']).drop(columns='source_id'),
+                      on='element', how='left')
     except Exception:
         # If Understat data is missing or can’t be parsed, just set xG/xA = NA
         df['xG'] = pd.NA
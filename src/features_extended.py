@@ -1,23 +1,103 @@
 # src/build_features.py
 
+import os
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import sqlite3
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from rolling import rolling_features, rolling_state, extend_rolling_features
+from team_ledger import TEAM_ROLLING_MEANS
+from dataset import write_season, append_rounds
+from table_schema import read_table
+from fixture_index import FIXTURE_FEATURES, clubs_played_for, fixture_index
+from dtypes import compact_table, apply_policy, write_parquet, PARQUET_OPTIONS
+from sqlite_bulk import connect, bulk_load
+from metrics import stage, rows
 
 DATA_DIR = Path("data/processed")
 DB_PATH  = Path("data/fpl.db")
 SEASONS  = ["2025"]   # only doing 2025
+POSITION_CODES = [1, 2, 3, 4]   # element_type: GK, DEF, MID, FWD
 
-def build_features_for(season: str):
-    # 1) load raw data
-    hist    = pd.read_parquet(DATA_DIR / f"history_{season}.parquet")
-    players = pd.read_parquet(DATA_DIR / f"players_{season}.parquet")
+# rolling features by element, all shifted so only prior data used:
+# output name -> (source column, window)
+ROLLING_MEANS = {
+    # 4-GW rolling
+    "starts_4":            ("start_flag", 4),
+    "full_match_4":        ("full_match_flag", 4),
+    "points_4":            ("gw_points", 4),
+    "minutes_4":           ("minutes", 4),
+    "clean_sheets_4":      ("clean_sheets", 4),
+    "saves_4":             ("saves", 4),
+    "influence_4":         ("influence", 4),
+    "creativity_4":        ("creativity", 4),
+    "threat_4":            ("threat", 4),
+    "ict_index_4":         ("ict_index", 4),
 
-    # standardize opponent column
-    hist = hist.rename(columns={"opponent_team":"opp_team_id"})
-    players = players.rename(columns={"id": "element"})
+    # 10-GW rolling
+    "points_10":           ("gw_points", 10),
+    "minutes_10":          ("minutes", 10),
+    "clean_sheets_10":     ("clean_sheets", 10),
+    "saves_10":            ("saves", 10),
 
+    # xG / xA
+    "xg_4":                ("expected_goals", 4),
+    "xg_10":               ("expected_goals", 10),
+    "xa_4":                ("expected_assists", 4),
+    "xa_10":               ("expected_assists", 10),
+    "xg_involvements_4":   ("expected_goal_involvements", 4),
+    "xg_involvements_10":  ("expected_goal_involvements", 10),
+    "xg_conceded_4":       ("expected_goals_conceded", 4),
+    "xg_conceded_10":      ("expected_goals_conceded", 10),
+    # last GW's transfers and ownership, for the transfer pct features
+    "prev_transfers_in":   ("transfers_in", 1),
+    "prev_transfers_out":  ("transfers_out", 1),
+    "prev_ownership":      ("ownership", 1),
+}
+# running totals of everything before this GW: output name -> source column
+ROLLING_CUMSUMS = {
+    # full-season running totals
+    "penalties_saved_38":  "penalties_saved",
+    "penalties_missed_38": "penalties_missed",
+    "cum_minutes_prev":    "minutes",
+    "cum_points_prev":     "gw_points",
+    "cum_yellow_prev":     "yellow_cards",
+    "cum_red_prev":        "red_cards",
+}
+
+FEATURE_COLS = [
+    "element","round","element_type","name","price","ownership","gw_points",
+    "starts_4","full_match_4","ppm",
+    "points_4","points_10","minutes_4","minutes_10",
+    "clean_sheets_4","clean_sheets_10",
+    "saves_4","saves_10",
+    "penalties_saved_38","penalties_missed_38",
+    "yellow_propensity","red_propensity",
+    "influence_4","creativity_4","threat_4","ict_index_4",
+    "xg_4","xg_10","xa_4","xa_10",
+    "xg_involvements_4","xg_involvements_10",
+    "xg_conceded_4","xg_conceded_10",
+    "team_form_4","team_form_10","team_form_38",
+    "opp_form_4","opp_form_10","opp_form_38",
+    "team_goals_scored_10","team_goals_conceded_10",
+    "opp_clean_sheets_4","opp_clean_sheets_10",
+    "opp_team_goals_scored_10","opp_team_goals_conceded_10",
+    "transfers_in_pct","transfers_out_pct",
+    "double_gw","blank_gw", "is_home",
+    "fixture_difficulty",
+    "fixtures_next_3","dgw_next_3","difficulty_next_3",
+    "fixtures_next_5","dgw_next_5","difficulty_next_5",
+]
+
+
+def _merge_context(hist, players, ledger, season: str, index=None) -> pd.DataFrame:
+    """Steps 2-4: player statics, team/opponent rolling form, fixture context and
+    start flags per history row. `index` defaults to the season's FixtureIndex."""
     # 2) merge in player‐static + name/price/ownership/position
     df = (hist.merge(players[["element","team","first_name","second_name","now_cost","selected_by_percent","element_type"]],on="element", how="left").rename(columns={
             "team":                  "team_id",
@@ -27,169 +107,264 @@ def build_features_for(season: str):
         })
     )
     df["ownership"] = pd.to_numeric(df["ownership"], errors="coerce").fillna(0.0)
-    if season=="2025":
+    if season == "2025" or "name" not in df.columns:
+        # earlier seasons' history (merged CSV) carries the name of the time
         df["name"] = df["first_name"] + " " + df["second_name"]
 
-    # 3) pull in team_stats_{season} from SQLite
-    with sqlite3.connect(DB_PATH) as conn:
-        ts = pd.read_sql(f"SELECT * FROM team_stats_{season}", conn)
-    # add a clean_sheet_match flag
-    ts["clean_sheet_match"] = (ts["goals_conceded"]==0).astype(int)
-
-    # merge team match‐level stats
-    df = (
-        df
-        .merge(
-            ts.rename(columns={
-                "points":             "team_points",
-                "goals_scored":       "team_goals_scored_match",
-                "goals_conceded":     "team_goals_conceded_match",
-                "clean_sheet_match":  "team_clean_sheet_match"
-            }),
-            on=["team_id","round"], how="left"
-        )
-        .merge(
-            ts.rename(columns={
-                "team_id":            "opp_team_id",
-                "points":             "opp_points",
-                "goals_scored":       "opp_goals_scored_match",
-                "goals_conceded":     "opp_goals_conceded_match",
-                "clean_sheet_match":  "opp_clean_sheet_match"
-            }),
-            on=["opp_team_id","round"], how="left"
-        )
+    # 2b) the club each row was played for, from the fixture list (players.team is
+    #     the current club, wrong for rows before a mid-season transfer)
+    index = index if index is not None else fixture_index(season)
+    df["team_id"] = clubs_played_for(index, df["element"], df["opp_team_id"].fillna(-1),
+                                     df["round"], df["was_home"], df["team_id"])
+
+    # 3) team / opponent rolling form from team_ledger_{season}, computed once per team.
+    #    (team, opponent, round) picks out exactly one fixture, even in double gameweeks.
+    df = df.merge(
+        ledger[["team_id","opp_team_id","round"] + list(TEAM_ROLLING_MEANS)],
+        on=["team_id","opp_team_id","round"], how="left"
     )
-    # fill any NaNs (e.g. blanks) with zero
-    df[[
-        "team_points","team_goals_scored_match","team_goals_conceded_match",
-        "team_clean_sheet_match","opp_points","opp_goals_scored_match",
-        "opp_goals_conceded_match","opp_clean_sheet_match"
-    ]] = df[[
-        "team_points","team_goals_scored_match","team_goals_conceded_match",
-        "team_clean_sheet_match","opp_points","opp_goals_scored_match",
-        "opp_goals_conceded_match","opp_clean_sheet_match"
-    ]].fillna(0)
+
+    # 3b) fixture count, difficulty and look-ahead for that team (fixture_index.py)
+    fx = index.features(df["team_id"], df["round"])
+    df[FIXTURE_FEATURES] = fx.set_axis(df.index)
 
     # 4) basic start/full flags
     df["start_flag"]      = (df["minutes"] > 45).astype(int)
     df["full_match_flag"] = (df["minutes"] == 90).astype(int)
+    return df
 
-    # 5) rolling features by element, all shifted so only prior data used
-    gb = df.groupby("element", group_keys=False)
-
-    # 4-GW rolling
-    df["starts_4"]            = gb["start_flag"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["full_match_4"]        = gb["full_match_flag"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["points_4"]            = gb["gw_points"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["minutes_4"]           = gb["minutes"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["clean_sheets_4"]      = gb["clean_sheets"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["saves_4"]             = gb["saves"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["influence_4"]         = gb["influence"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["creativity_4"]        = gb["creativity"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["threat_4"]            = gb["threat"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["ict_index_4"]         = gb["ict_index"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    # opponent clean sheets
-    df["opp_clean_sheets_4"]  = gb["opp_clean_sheet_match"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
 
-    # 10-GW rolling
-    df["points_10"]           = gb["gw_points"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["minutes_10"]          = gb["minutes"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["clean_sheets_10"]     = gb["clean_sheets"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["saves_10"]            = gb["saves"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["opp_clean_sheets_10"] = gb["opp_clean_sheet_match"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-
-    # full-season rolling (38)
-    df["penalties_saved_38"]   = gb["penalties_saved"].transform(lambda s: s.shift(1).cumsum().fillna(0))
-    df["penalties_missed_38"]  = gb["penalties_missed"].transform(lambda s: s.shift(1).cumsum().fillna(0))
-
-    # 6) team / opponent rolling form
-    df["team_form_4"]   = gb["team_points"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["team_form_10"]  = gb["team_points"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["team_form_38"]  = gb["team_points"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-
-    df["opp_form_4"]    = gb["opp_points"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["opp_form_10"]   = gb["opp_points"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["opp_form_38"]   = gb["opp_points"].transform(lambda s: s.shift(1).rolling(window=38,min_periods=1).mean())
-
-    # 7) goals scored/conceded rolling
-    df["team_goals_scored_10"]   = gb["team_goals_scored_match"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["team_goals_conceded_10"] = gb["team_goals_conceded_match"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["opp_team_goals_scored_10"]   = gb["opp_goals_scored_match"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["opp_team_goals_conceded_10"] = gb["opp_goals_conceded_match"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-
-    # 8) xG / xA (if you've merged them into df as 'xG','xA','xGChain','xGBuildup')
-    
-    df["xg_4"]             = gb["expected_goals"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["xg_10"]            = gb["expected_goals"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["xa_4"]             = gb["expected_assists"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["xa_10"]            = gb["expected_assists"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["xg_involvements_4"] = gb["expected_goal_involvements"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["xg_involvements_10"]= gb["expected_goal_involvements"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    df["xg_conceded_4"]     = gb["expected_goals_conceded"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
-    df["xg_conceded_10"]    = gb["expected_goals_conceded"].transform(lambda s: s.shift(1).rolling(window=10,min_periods=1).mean())
-    
+def _derive_features(df: pd.DataFrame, roll: pd.DataFrame) -> pd.DataFrame:
+    """Steps 5-11: turn the rolling windows into the final feature frame."""
+    df[roll.columns] = roll
+    df[["penalties_saved_38","penalties_missed_38","cum_minutes_prev","cum_points_prev"]] = \
+        df[["penalties_saved_38","penalties_missed_38","cum_minutes_prev","cum_points_prev"]].fillna(0)
 
     # 9) transfers pct
-    df["transfers_in_pct"]   = gb["transfers_in"].transform(lambda s: s.shift(1).fillna(0)) \
-                                / (df["ownership"].shift(1).fillna(0) + 1e-6)
-    df["transfers_out_pct"]  = gb["transfers_out"].transform(lambda s: s.shift(1).fillna(0)) \
-                                / (df["ownership"].shift(1).fillna(0) + 1e-6)
-    # 10) double/blank GW
-    cnt = hist.groupby(["element","round"]).size().rename("cnt").reset_index()
-    df = df.merge(cnt, on=["element","round"], how="left")
-
-    df["double_gw"] = (df["cnt"]>1).astype(int)
-    df["blank_gw"]  = (df["cnt"]==0).astype(int)
-
-    df.drop(columns="cnt", inplace=True)
-    
-    df["is_home"]    = df["was_home"].astype(int)
+    df["transfers_in_pct"]   = df["prev_transfers_in"].fillna(0) \
+                                / (df["prev_ownership"].fillna(0) + 1e-6)
+    df["transfers_out_pct"]  = df["prev_transfers_out"].fillna(0) \
+                                / (df["prev_ownership"].fillna(0) + 1e-6)
+    # 10) double/blank GW from the team's fixture list, not the player's own rows
+    df["double_gw"] = (df["fixture_count"]>1).astype(int)
+    df["blank_gw"]  = (df["fixture_count"]==0).astype(int)
 
-    df["full_match_4"]  = gb["full_match_flag"].transform(lambda s: s.shift(1).rolling(window=4,min_periods=1).mean())
+    df["is_home"]    = df["was_home"].astype(int)
 
-    df["cum_minutes_prev"]     = gb["minutes"].transform(lambda s: s.shift(1).cumsum().fillna(0))
-    df["cum_points_prev"]      = gb["gw_points"].transform(lambda s: s.shift(1).cumsum().fillna(0))
     df["ppm"]                  = df["cum_points_prev"] / (df["cum_minutes_prev"] + 1e-6)
-    # cumulative sums (including current GW)
-    df["cum_yellow"]  = gb["yellow_cards"].cumsum()
-    df["cum_red"]     = gb["red_cards"].cumsum()
-    df["cum_minutes"] = gb["minutes"].cumsum()
     # shift by one so we only use _previous_ GWs
-    df["yellow_propensity"]    = gb["yellow_cards"].transform(lambda s: s.shift(1).cumsum()) \
-                                 / (df["cum_minutes_prev"] + 1e-6)
-    df["red_propensity"]       = gb["red_cards"].transform(lambda s: s.shift(1).cumsum()) \
-                                 / (df["cum_minutes_prev"] + 1e-6)
+    df["yellow_propensity"]    = df["cum_yellow_prev"] / (df["cum_minutes_prev"] + 1e-6)
+    df["red_propensity"]       = df["cum_red_prev"] / (df["cum_minutes_prev"] + 1e-6)
     df[["yellow_propensity","red_propensity"]] = df[["yellow_propensity","red_propensity"]].fillna(0)
 
     # 11) assemble final feature list
-    feature_cols = [
-        "element","round","element_type","name","price","ownership","gw_points",
-        "starts_4","full_match_4","ppm",
-        "points_4","points_10","minutes_4","minutes_10",
-        "clean_sheets_4","clean_sheets_10",
-        "saves_4","saves_10",
-        "penalties_saved_38","penalties_missed_38",
-        "yellow_propensity","red_propensity",
-        "influence_4","creativity_4","threat_4","ict_index_4",
-        "xg_4","xg_10","xa_4","xa_10",
-        "xg_involvements_4","xg_involvements_10",
-        "xg_conceded_4","xg_conceded_10",
-        "team_form_4","team_form_10","team_form_38",
-        "opp_form_4","opp_form_10","opp_form_38",
-        "team_goals_scored_10","team_goals_conceded_10",
-        "opp_clean_sheets_4","opp_clean_sheets_10",
-        "opp_team_goals_scored_10","opp_team_goals_conceded_10",
-        "transfers_in_pct","transfers_out_pct",
-        "double_gw","blank_gw", "is_home"
-    ]
-
     df.fillna(0, inplace=True)
+    return df[FEATURE_COLS]
+
+
+def _load_inputs(season: str, after_round: int = None):
+    """History/players parquet and the team ledger, optionally only rounds after `after_round`."""
+    where   = None if after_round is None else f"round > {int(after_round)}"
+    hist    = read_table(DATA_DIR / f"history_{season}.parquet", where=where)
+    players = read_table(DATA_DIR / f"players_{season}.parquet")
+
+    # standardize opponent column
+    hist = hist.rename(columns={"opponent_team":"opp_team_id"})
+    players = players.rename(columns={"id": "element"})
+
+    # pull in team_ledger_{season} (see team_ledger.py) from SQLite
+    with sqlite3.connect(DB_PATH) as conn:
+        if after_round is None:
+            ledger = pd.read_sql(f"SELECT * FROM team_ledger_{season}", conn)
+        else:
+            ledger = pd.read_sql(f"SELECT * FROM team_ledger_{season} WHERE round > ?",
+                                 conn, params=(after_round,))
+    return hist, players, ledger
+
+
+def _state_path(season: str) -> Path:
+    return DATA_DIR / f"features_{season}_state.parquet"
+
+
+def _season_features(season: str, etype: int = None):
+    """Features and rolling state for one season, optionally one element_type only.
 
+    A position part filters the history before any merge; every feature looks
+    only at the player's own rows, and rows keep their place in the full season
+    (`_row`), so position parts merge back into exactly the serial result.
+    """
+    # 1) load raw data
+    hist, players, ledger = _load_inputs(season)
+    row = np.arange(len(hist))
+    if etype is not None:
+        # etype 0 collects rows without a known position (player missing from players_{season})
+        etypes = hist["element"].map(players.set_index("element")["element_type"])
+        keep = (etypes == etype) if etype else ~etypes.isin(POSITION_CODES)
+        keep = keep.to_numpy()
+        hist, row = hist[keep].reset_index(drop=True), row[keep]
+    df = _merge_context(hist, players, ledger, season)
+
+    # 5) one sort by (element, round) feeds every window via per-player prefix sums
+    roll = rolling_features(df, by="element", order="round",
+                            means=ROLLING_MEANS, cumsums=ROLLING_CUMSUMS)
+    # carry-over for update_features_for
+    state = rolling_state(df, by="element", order="round",
+                          means=ROLLING_MEANS, cumsums=ROLLING_CUMSUMS)
+    feats = _derive_features(df, roll)
+    feats.insert(0, "_row", row)
+    return feats, state
+
+
+def _write_season(season: str, feats: pa.Table, state: pd.DataFrame):
     out = DATA_DIR / f"features_{season}.parquet"
-    df[feature_cols].to_parquet(out, index=False)
-    print(f"Wrote {out} → shape {df[feature_cols].shape}")
+    write_parquet(feats, out)
+    print(f"Wrote {out} → shape {feats.shape}")
+    write_season("features", feats, season)
+    state.to_parquet(_state_path(season), index=False)
+
+
+@stage
+def build_features_for(season: str):
+    feats, state = _season_features(season)
+    rows(rows_in=pq.read_metadata(DATA_DIR / f"history_{season}.parquet").num_rows, rows_out=len(feats))
+    _write_season(season, compact_table(feats.drop(columns="_row")), state)
+
+
+# --- parallel build ----------------------------------------------------------
+
+def _to_ipc(tbl: pa.Table) -> pa.Buffer:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, tbl.schema) as writer:
+        writer.write_table(tbl)
+    return sink.getvalue()
+
+
+def _from_ipc(buf) -> pa.Table:
+    return pa.ipc.open_stream(buf).read_all()
+
+
+def _build_part(season: str, etype: int = None):
+    """Worker: one (season, position) part as Arrow IPC buffers, not pickled DataFrames."""
+    feats, state = _season_features(season, etype)
+    return season, etype, _to_ipc(compact_table(feats)), \
+        _to_ipc(pa.Table.from_pandas(state, preserve_index=False))
+
+
+def build_features_parallel(seasons=SEASONS, workers: int = None, by_position: bool = False):
+    """build_features_for over many seasons on a process pool.
+
+    Work is split per season and, with by_position, per element_type. A position
+    part costs a worker start, an IPC round trip and a re-encode on top of its
+    rows, which outweighs the smaller merge at FPL sizes (bench.py's
+    features_by_position), hence per season by default. Each season
+    is written once all its parts are back: parts are concatenated in position
+    order and rows sorted by their place in the season, so the output is
+    identical to the serial build whatever order the workers finish in.
+    """
+    etypes = POSITION_CODES + [0] if by_position else [None]
+    per_season = len(etypes)
+    parts = [(s, e) for s in seasons for e in etypes]
+    pending = {s: {} for s in seasons}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_build_part, s, e) for s, e in parts]
+        for fut in as_completed(futures):
+            season, etype, feats_buf, state_buf = fut.result()
+            pending[season][etype] = (_from_ipc(feats_buf), _from_ipc(state_buf))
+            if len(pending[season]) < per_season:
+                continue
+            # deterministic merge: position order, then original row order
+            got = pending.pop(season)
+            keys = sorted(got, key=lambda e: -1 if e is None else e)
+            feats = pa.concat_tables([got[e][0] for e in keys], promote_options="permissive")
+            feats = feats.take(pc.sort_indices(feats["_row"])).drop_columns(["_row"])
+            # labels were dictionary-encoded per part; re-encode in row order like the serial build
+            feats = apply_policy(feats.cast(pa.schema([
+                pa.field(f.name, f.type.value_type) if pa.types.is_dictionary(f.type) else f
+                for f in feats.schema
+            ])))
+            state = pa.concat_tables([got[e][1] for e in keys]).to_pandas()
+            _write_season(season, feats, state)
+
+
+def update_features_for(season: str):
+    """Append features for rounds finished since the last build/update.
+
+    Reads only the new history rows plus the per-player rolling state written
+    by build_features_for, so the cost is one gameweek rather than the season.
+    Price/ownership on appended rows are frozen at update time, whereas a full
+    rebuild restamps every past row with today's values.
+    """
+    state_pq = _state_path(season)
+    if not state_pq.exists():
+        print(f"{state_pq.name} not found, running a full build.")
+        return build_features_for(season)
+
+    state = pd.read_parquet(state_pq)
+    sources = {c for c, _ in ROLLING_MEANS.values()} | set(ROLLING_CUMSUMS.values())
+    if not sources <= set(state.columns):
+        print(f"{state_pq.name} lacks {sorted(sources - set(state.columns))}, running a full build.")
+        return build_features_for(season)
+    last_round = int(state["round"].max())
+
+    # 1) load only the rounds after the state
+    hist, players, ledger = _load_inputs(season, after_round=last_round)
+    if hist.empty:
+        print(f"No rounds after {last_round} in history_{season}.parquet, nothing to do.")
+        return
+    df = _merge_context(hist, players, ledger, season)
+
+    # 5) extend the rolling windows from the carried-over tails
+    roll = extend_rolling_features(df, state, by="element", order="round",
+                                   means=ROLLING_MEANS, cumsums=ROLLING_CUMSUMS)
+    feats = _derive_features(df, roll)
+    rounds = sorted(feats["round"].unique().tolist())
+
+    # 6) append to the parquet (atomic swap) and to the SQLite tables
+    out = DATA_DIR / f"features_{season}.parquet"
+    _append_parquet(out, feats, rounds)
+    append_rounds("features", feats, season)
+    # (the per-position views in feature_store.py follow the main table)
+    conn = connect(DB_PATH)
+    _append_table(conn, f"features_{season}", feats, rounds)
+    conn.close()
+
+    new_state = rolling_state(df, by="element", order="round",
+                              means=ROLLING_MEANS, cumsums=ROLLING_CUMSUMS, prev_state=state)
+    new_state.to_parquet(state_pq, index=False)
+    print(f"Appended rounds {rounds} to {out} → {len(feats)} new rows")
+
+
+def _append_parquet(path: Path, feats: pd.DataFrame, rounds: list):
+    """Concatenate new rows onto an existing parquet without re-deriving anything."""
+    old = pq.read_table(path)
+    old = old.filter(pc.invert(pc.is_in(old["round"], pa.array(rounds, old.schema.field("round").type))))
+    new = compact_table(feats)
+    both = pa.concat_tables([old, new], promote_options="permissive")
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(apply_policy(both), tmp, **PARQUET_OPTIONS)
+    os.replace(tmp, path)
+
+
+def _append_table(conn, tbl: str, feats: pd.DataFrame, rounds: list):
+    """Replace `rounds` in an existing SQLite table, keeping only the columns it already has.
+    Goes through bulk_load, so appended rows get the same types as a full load."""
+    cols = [r[1] for r in conn.execute(f'PRAGMA table_info("{tbl}")')]
+    if not cols:
+        print(f"Table {tbl} not found, skipping")
+        return
+    n = bulk_load(conn, tbl, feats[[c for c in cols if c in feats.columns]], if_exists="append",
+                  delete_where=(f'round IN ({",".join("?" * len(rounds))})', rounds))
+    print(f"Appended {n} rows to {tbl}")
 
 
 if __name__ == "__main__":
-    for s in SEASONS:
-        build_features_for(s)
+    import sys
+
+    if "--parallel" in sys.argv:
+        build_features_parallel(SEASONS)
+    else:
+        for s in SEASONS:
+            if "--update" in sys.argv:
+                update_features_for(s)
+            else:
+                build_features_for(s)
@@ -0,0 +1,236 @@
+# src/fixture_index.py
+#
+# Dense fixture arrays indexed directly by [team_id, round]: fixture count,
+# opponents, home/away, opponent strength and difficulty, plus look-ahead
+# windows ("fixtures / doubles / mean difficulty over the next n rounds").
+# Built once per season from fixtures_{season}.parquet and cached as .npz, so
+# feature builds and planners get fixture context by array indexing, not joins.
+#     python src/fixture_index.py [SEASON]
+
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import NamedTuple
+
+DATA_DIR = Path("data/processed")
+SEASON   = "2025"
+
+SLOTS     = 2         # fixtures one team can have in a round
+LOOKAHEAD = (3, 5)    # windows, in rounds starting with the current one
+PRIOR     = 2.0       # pseudo-fixtures at league-average form before a team has results
+FORMAT    = 1         # bump when build_index changes, so cached .npz files are rebuilt
+
+
+class FixtureIndex(NamedTuple):
+    count:      np.ndarray   # (teams, rounds) int8 fixtures in the round
+    opponent:   np.ndarray   # (teams, rounds, SLOTS) int16, -1 = no fixture
+    home:       np.ndarray   # (teams, rounds, SLOTS) int8, -1 = no fixture
+    strength:   np.ndarray   # (teams, rounds) float32 points per fixture / 3 before the round
+    difficulty: np.ndarray   # (teams, rounds) float32 mean opponent strength in the round, 0 if blank
+    ahead:      dict         # n -> {"fixtures", "doubles", "difficulty"} (teams, rounds)
+
+    def at(self, arr: np.ndarray, team_ids, rounds) -> np.ndarray:
+        """arr[team, round] for many pairs; ids outside the index read as 0."""
+        t = np.asarray(team_ids, dtype=np.int64)
+        r = np.asarray(rounds, dtype=np.int64)
+        ok = (t >= 0) & (t < arr.shape[0]) & (r >= 0) & (r < arr.shape[1])
+        out = np.zeros(t.shape, dtype=arr.dtype)
+        out[ok] = arr[t[ok], r[ok]]
+        return out
+
+    def played_for(self, opponents, rounds, was_home) -> np.ndarray:
+        """The other side of each (opponent, round, home/away) fixture; -1 where
+        the index has none, or two (the opponent playing twice on that side in a
+        double gameweek)."""
+        o = np.asarray(opponents, dtype=np.int64)
+        r = np.asarray(rounds, dtype=np.int64)
+        side = 1 - np.asarray(was_home, dtype=np.int8)   # the opponent's home flag
+        out = np.full(o.shape, -1, dtype=np.int64)
+        hits = np.zeros(o.shape, dtype=np.int8)
+        for s in range(SLOTS):
+            team = self.at(self.opponent[:, :, s], o, r).astype(np.int64)
+            hit = (team > 0) & (self.at(self.home[:, :, s], o, r) == side)
+            out[hit] = team[hit]
+            hits += hit
+        out[hits != 1] = -1
+        return out
+
+    def features(self, team_ids, rounds) -> pd.DataFrame:
+        """FIXTURE_FEATURES for each (team, round) pair, in input order."""
+        cols = {"fixture_count": self.at(self.count, team_ids, rounds),
+                "fixture_difficulty": self.at(self.difficulty, team_ids, rounds)}
+        for n, win in self.ahead.items():
+            cols[f"fixtures_next_{n}"]   = self.at(win["fixtures"], team_ids, rounds)
+            cols[f"dgw_next_{n}"]        = self.at(win["doubles"], team_ids, rounds)
+            cols[f"difficulty_next_{n}"] = self.at(win["difficulty"], team_ids, rounds)
+        return pd.DataFrame(cols)
+
+
+FIXTURE_FEATURES = ["fixture_count", "fixture_difficulty"] + [
+    f"{kind}_next_{n}" for n in LOOKAHEAD for kind in ("fixtures", "dgw", "difficulty")
+]
+
+
+def clubs_played_for(index: FixtureIndex, elements, opponents, rounds, was_home, current) -> np.ndarray:
+    """The club of each history row, from its fixture rather than players.team,
+    which is the current club and wrong for rows before a mid-season transfer.
+
+    Rows the fixture list cannot settle take the player's nearest settled row
+    (earlier first), then `current`.
+    """
+    team = pd.Series(index.played_for(opponents, rounds, was_home), dtype="float64")
+    team[team < 0] = np.nan
+    order = np.lexsort((np.asarray(rounds), np.asarray(elements)))
+    by_player = team.iloc[order].groupby(np.asarray(elements)[order])
+    filled = by_player.ffill().fillna(by_player.bfill()).sort_index()
+    return filled.fillna(pd.Series(np.asarray(current, dtype="float64"))).fillna(-1).to_numpy(np.int64)
+
+
+def build_index(fx: pd.DataFrame, lookahead=LOOKAHEAD) -> FixtureIndex:
+    """Index from a fixture list: round, home_team_id, away_team_id, and optionally
+    home_goals/away_goals for fixtures already played (they drive strength)."""
+    fx = fx.dropna(subset=["round", "home_team_id", "away_team_id"])
+    rnd = fx["round"].to_numpy(dtype=np.int64)
+    home_t = fx["home_team_id"].to_numpy(dtype=np.int64)
+    away_t = fx["away_team_id"].to_numpy(dtype=np.int64)
+    n_teams = int(max(home_t.max(initial=0), away_t.max(initial=0))) + 1
+    n_rounds = int(rnd.max(initial=0)) + 1 + max(lookahead, default=0)   # padded for windows
+
+    # 1) one entry per (team, fixture); slot = how many fixtures the team already has that round
+    team = np.r_[home_t, away_t]
+    opp  = np.r_[away_t, home_t]
+    r    = np.r_[rnd, rnd]
+    is_home = np.r_[np.ones(len(rnd)), np.zeros(len(rnd))].astype(np.int8)
+    slot = pd.DataFrame({"t": team, "r": r}).groupby(["t", "r"]).cumcount().to_numpy()
+    keep = slot < SLOTS
+    count = np.zeros((n_teams, n_rounds), dtype=np.int8)
+    np.add.at(count, (team, r), 1)
+    opponent = np.full((n_teams, n_rounds, SLOTS), -1, dtype=np.int16)
+    home = np.full((n_teams, n_rounds, SLOTS), -1, dtype=np.int8)
+    opponent[team[keep], r[keep], slot[keep]] = opp[keep]
+    home[team[keep], r[keep], slot[keep]] = is_home[keep]
+
+    # 2) strength: points per played fixture before each round, shrunk to the league average
+    pts = np.zeros((n_teams, n_rounds))
+    played = np.zeros((n_teams, n_rounds))
+    if {"home_goals", "away_goals"} <= set(fx.columns):
+        hg = fx["home_goals"].to_numpy(dtype=float)
+        ag = fx["away_goals"].to_numpy(dtype=float)
+        done = ~(np.isnan(hg) | np.isnan(ag))
+        gf, ga = np.r_[hg, ag], np.r_[ag, hg]
+        done2 = np.r_[done, done]
+        np.add.at(pts, (team[done2], r[done2]), np.select([gf > ga, gf == ga], [3, 1], 0)[done2])
+        np.add.at(played, (team[done2], r[done2]), 1)
+    cum_pts = np.cumsum(pts, axis=1) - pts          # before the round
+    cum_played = np.cumsum(played, axis=1) - played
+    # league points per fixture before the round, a draw-ish 4/3 until anything is played
+    all_pts, all_played = cum_pts.sum(0), cum_played.sum(0)
+    league = np.where(all_played > 0, all_pts / np.maximum(all_played, 1), 4 / 3)
+    strength = ((cum_pts + PRIOR * league) / (cum_played + PRIOR) / 3).astype(np.float32)
+
+    # 3) difficulty: opponents' strength as known at round r, for round r and the rounds after it
+    rounds = np.arange(n_rounds)
+
+    def opp_strength_sum(offset: int) -> np.ndarray:
+        """(teams, rounds): summed strength (as of r) of the opponents in round r + offset."""
+        src = np.minimum(rounds + offset, n_rounds - 1)
+        o = opponent[:, src, :].astype(np.int64)                  # (teams, rounds, SLOTS)
+        s = strength[np.maximum(o, 0), rounds[None, :, None]]
+        valid = (o >= 0) & (rounds + offset < n_rounds)[None, :, None]
+        return np.where(valid, s, 0).sum(2)
+
+    def opp_count(offset: int) -> np.ndarray:
+        src = np.minimum(rounds + offset, n_rounds - 1)
+        return np.where((rounds + offset < n_rounds)[None, :], count[:, src], 0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        difficulty = np.where(count > 0, opp_strength_sum(0) / count, 0).astype(np.float32)
+        ahead = {}
+        for n in lookahead:
+            fixtures = sum(opp_count(k) for k in range(n))
+            doubles = sum((opp_count(k) > 1).astype(np.int8) for k in range(n))
+            total = sum(opp_strength_sum(k) for k in range(n))
+            ahead[n] = {
+                "fixtures":   fixtures.astype(np.int8),
+                "doubles":    doubles.astype(np.int8),
+                "difficulty": np.where(fixtures > 0, total / fixtures, 0).astype(np.float32),
+            }
+    return FixtureIndex(count, opponent, home, strength, difficulty, ahead)
+
+
+def from_matches_json(path) -> pd.DataFrame:
+    """football-data.org matches.json as a build_index fixture list (matchday = round)."""
+    with open(path, "r", encoding="utf8") as f:
+        matches = pd.json_normalize(json.load(f).get("matches", []), sep="_")
+    out = pd.DataFrame({"round": matches["matchday"], "home_team_id": matches["homeTeam_id"],
+                        "away_team_id": matches["awayTeam_id"]})
+    if "score_fullTime_home" in matches:
+        out["home_goals"] = pd.to_numeric(matches["score_fullTime_home"], errors="coerce")
+        out["away_goals"] = pd.to_numeric(matches["score_fullTime_away"], errors="coerce")
+    return out
+
+
+def _index_path(season: str, data_dir: Path) -> Path:
+    return Path(data_dir) / f"fixture_index_{season}.npz"
+
+
+def _meta() -> np.ndarray:
+    return np.array([FORMAT, PRIOR, *LOOKAHEAD], dtype=float)
+
+
+def save_index(index: FixtureIndex, path: Path):
+    arrays = {k: getattr(index, k) for k in ("count", "opponent", "home", "strength", "difficulty")}
+    for n, win in index.ahead.items():
+        arrays.update({f"ahead_{n}_{k}": v for k, v in win.items()})
+    arrays["meta"] = _meta()
+    tmp = Path(path).with_suffix(f".{os.getpid()}.npz")   # parallel feature builds may race
+    np.savez(tmp, **arrays)
+    tmp.replace(path)
+
+
+def load_index(path: Path) -> FixtureIndex:
+    with np.load(path) as z:
+        ahead = {}
+        for key in z.files:
+            if key.startswith("ahead_"):
+                _, n, kind = key.split("_", 2)
+                ahead.setdefault(int(n), {})[kind] = z[key]
+        return FixtureIndex(z["count"], z["opponent"], z["home"], z["strength"], z["difficulty"],
+                            dict(sorted(ahead.items())))
+
+
+_CACHE = {}
+
+
+def fixture_index(season: str = SEASON, data_dir: Path = DATA_DIR) -> FixtureIndex:
+    """The season's index: from memory, else the .npz if it is newer than the
+    fixtures parquet and built with the current settings, else built and saved."""
+    src = Path(data_dir) / f"fixtures_{season}.parquet"
+    path = _index_path(season, data_dir)
+    key = (str(path), src.stat().st_mtime_ns)
+    if key in _CACHE:
+        return _CACHE[key]
+    index = None
+    if path.exists() and path.stat().st_mtime_ns >= key[1]:
+        with np.load(path) as z:
+            fresh = "meta" in z.files and np.array_equal(z["meta"], _meta())
+        index = load_index(path) if fresh else None
+    if index is None:
+        index = build_index(pd.read_parquet(src))
+        save_index(index, path)
+        print(f"Wrote {path}: {index.count.shape[0] - 1} teams x {index.count.shape[1]} rounds")
+    _CACHE[key] = index
+    return index
+
+
+if __name__ == "__main__":
+    season = sys.argv[1] if len(sys.argv) > 1 else SEASON
+    idx = fixture_index(season)
+    teams = idx.count[1:]
+    played = teams.sum(0) > 0
+    print(f"rounds {np.flatnonzero(played).min()}-{np.flatnonzero(played).max()}: "
+          f"{int((teams > 1).sum())} double and {int(((teams == 0) & played).sum())} blank "
+          f"team-gameweeks")
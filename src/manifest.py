@@ -0,0 +1,137 @@
+# src/manifest.py
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Manifest:
+    """Record of every raw file in the lake and of which raw hashes each output was built from.
+
+    manifest.json in raw_dir holds
+      files:   name -> {url, fetched_at, etag, last_modified, sha256, size, mtime_ns}
+      outputs: output name -> {input name -> sha256 it was built from}
+    Ingest uses the validators for conditional GETs; storage compares hashes to
+    re-parse only the inputs that changed. Safe to share between threads.
+    """
+
+    def __init__(self, raw_dir):
+        self.raw_dir = raw_dir
+        self.path = os.path.join(raw_dir, MANIFEST_NAME)
+        self.lock = threading.RLock()
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf8') as f:
+                data = json.load(f)
+        else:
+            data = {}
+        self.files = data.get('files', {})
+        self.outputs = data.get('outputs', {})
+
+    def save(self):
+        with self.lock:
+            data = {'files': self.files, 'outputs': self.outputs}
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf8') as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+
+    # --- ingest side -------------------------------------------------------
+
+    def is_fresh(self, name, max_age):
+        """True if name is on disk and was fetched or revalidated less than max_age seconds ago."""
+        entry = self.files.get(name)
+        if entry is None or not os.path.exists(os.path.join(self.raw_dir, name)):
+            return False
+        return time.time() - entry.get('fetched_at', 0) < max_age
+
+    def conditional_headers(self, name):
+        """If-None-Match / If-Modified-Since for a file we already hold."""
+        entry = self.files.get(name)
+        if entry is None or not os.path.exists(os.path.join(self.raw_dir, name)):
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def touch(self, name):
+        """A 304: the file is still current, only the check time moves."""
+        with self.lock:
+            self.files[name]['fetched_at'] = time.time()
+
+    def record(self, name, url, resp=None):
+        """Register a freshly written file; returns True if its content changed."""
+        path = os.path.join(self.raw_dir, name)
+        sha = file_sha256(path)
+        st = os.stat(path)
+        with self.lock:
+            old = self.files.get(name, {})
+            self.files[name] = {
+                'url': url,
+                'fetched_at': time.time(),
+                'etag': resp.headers.get('ETag') if resp is not None else None,
+                'last_modified': resp.headers.get('Last-Modified') if resp is not None else None,
+                'sha256': sha,
+                'size': st.st_size,
+                'mtime_ns': st.st_mtime_ns,
+            }
+        return old.get('sha256') != sha
+
+    def write_if_changed(self, name, url, content: bytes, resp=None):
+        """Write content unless it hashes the same as the file on record; returns True if written."""
+        path = os.path.join(self.raw_dir, name)
+        sha = hashlib.sha256(content).hexdigest()
+        entry = self.files.get(name)
+        if entry and entry.get('sha256') == sha and os.path.exists(path):
+            with self.lock:
+                entry['fetched_at'] = time.time()
+                if resp is not None:
+                    entry['etag'] = resp.headers.get('ETag')
+                    entry['last_modified'] = resp.headers.get('Last-Modified')
+            return False
+        with open(path + '.part', 'wb') as f:
+            f.write(content)
+        os.replace(path + '.part', path)
+        self.record(name, url, resp)
+        return True
+
+    # --- storage side ------------------------------------------------------
+
+    def sha(self, name):
+        """Content hash of a raw file, re-hashed only if its size/mtime moved since recorded."""
+        path = os.path.join(self.raw_dir, name)
+        st = os.stat(path)
+        entry = self.files.get(name)
+        if entry and entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns:
+            return entry['sha256']
+        sha = file_sha256(path)
+        with self.lock:
+            entry = self.files.setdefault(name, {'url': None, 'fetched_at': 0})
+            entry.update(sha256=sha, size=st.st_size, mtime_ns=st.st_mtime_ns)
+        return sha
+
+    def changed_inputs(self, output, inputs):
+        """(changed, removed): inputs whose hash differs from what output was built from,
+        and inputs output was built from that no longer exist."""
+        built = self.outputs.get(output, {})
+        changed = [name for name in inputs if built.get(name) != self.sha(name)]
+        removed = sorted(set(built) - set(inputs))
+        return changed, removed
+
+    def mark_built(self, output, inputs):
+        with self.lock:
+            self.outputs[output] = {name: self.sha(name) for name in inputs}
@@ -0,0 +1,307 @@
+# src/metrics.py
+#
+# Per-stage instrumentation. Wrap a stage with @stage / `with stage("name")`
+# and, when metrics are on (FPL_METRICS=1, or `trace` to add tracemalloc), each
+# call records wall and CPU time, rows in/out, bytes read/written and peak
+# memory into the `run_metrics` table of fpl.db. When off, a wrapped call costs
+# one flag check. Stages of one run share a run id (FPL_RUN_ID, set by
+# `pipeline.py --metrics` for its worker processes).
+#     python src/pipeline.py --force --metrics          # or FPL_METRICS=1 for any script
+#     python src/metrics.py report [--run RUN] [--baseline RUN] [--threshold 0.2]
+#     python src/metrics.py runs
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import resource
+import threading
+import functools
+import tracemalloc
+import pandas as pd
+from pathlib import Path
+
+DB_PATH   = Path("data/fpl.db")
+THRESHOLD = 0.2    # relative slow-down the report flags
+
+METRICS_SQL = """
+CREATE TABLE IF NOT EXISTS run_metrics (
+    run_id        TEXT NOT NULL,
+    stage         TEXT NOT NULL,
+    parent        TEXT,            -- enclosing stage, if nested
+    started_at    REAL,
+    wall_s        REAL,
+    cpu_s         REAL,            -- this process plus finished child processes
+    rows_in       INTEGER,
+    rows_out      INTEGER,
+    bytes_read    INTEGER,
+    bytes_written INTEGER,
+    peak_rss_mb   REAL,
+    peak_alloc_mb REAL,            -- tracemalloc, with FPL_METRICS=trace
+    status        TEXT
+)"""
+
+_mode = os.getenv("FPL_METRICS", "")
+_enabled = _mode not in ("", "0")
+_trace = _mode == "trace"
+_local = threading.local()
+
+
+def enable(trace: bool = False, run_id: str = None) -> str:
+    """Turn metrics on for this process and any it starts; returns the run id."""
+    global _enabled, _trace
+    _enabled, _trace = True, trace
+    os.environ["FPL_METRICS"] = "trace" if trace else "1"
+    os.environ["FPL_RUN_ID"] = run_id or os.getenv("FPL_RUN_ID") or \
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    return os.environ["FPL_RUN_ID"]
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def _run_id() -> str:
+    if "FPL_RUN_ID" not in os.environ:
+        os.environ["FPL_RUN_ID"] = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    return os.environ["FPL_RUN_ID"]
+
+
+# --- process counters --------------------------------------------------------
+
+def _cpu() -> float:
+    me, kids = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    return me.ru_utime + me.ru_stime + kids.ru_utime + kids.ru_stime
+
+
+def _io() -> tuple:
+    """Bytes passed through read/write calls so far (Linux), else (None, None)."""
+    try:
+        with open("/proc/self/io") as f:
+            io = dict(line.split(": ") for line in f.read().splitlines())
+        return int(io["rchar"]), int(io["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _peak_rss() -> float:
+    """Peak RSS in MB since the last _reset_peak_rss (since start if it can't be reset)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+# --- stages ------------------------------------------------------------------
+
+class _Stage:
+    """Context manager for one stage call; also a decorator via stage(name)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows_in = self.rows_out = None
+        self.peak_rss = self.peak_alloc = 0.0
+
+    def __call__(self, func):
+        return _wrap(func, self.name or func.__qualname__)
+
+    def __enter__(self):
+        if not _enabled:
+            return self
+        stack = _local.__dict__.setdefault("stack", [])
+        if stack:
+            # the parent keeps what it has peaked at so far; peaks restart for this stage
+            parent = stack[-1]
+            parent.peak_rss = max(parent.peak_rss, _peak_rss())
+            if _trace:
+                parent.peak_alloc = max(parent.peak_alloc, tracemalloc.get_traced_memory()[1])
+        _reset_peak_rss()
+        if _trace:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.started = time.time()
+        self.t0, self.cpu0, self.io0 = time.perf_counter(), _cpu(), _io()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not _enabled or not getattr(self, "started", None):
+            return False
+        wall, cpu, io = time.perf_counter() - self.t0, _cpu() - self.cpu0, _io()
+        self.peak_rss = max(self.peak_rss, _peak_rss())
+        if _trace:
+            self.peak_alloc = max(self.peak_alloc, tracemalloc.get_traced_memory()[1])
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1].peak_rss = max(stack[-1].peak_rss, self.peak_rss)
+            stack[-1].peak_alloc = max(stack[-1].peak_alloc, self.peak_alloc)
+        read = io[0] - self.io0[0] if io[0] is not None else None
+        written = io[1] - self.io0[1] if io[1] is not None else None
+        _record((_run_id(), self.name, self.parent, self.started, wall, cpu,
+                 self.rows_in, self.rows_out, read, written, self.peak_rss,
+                 self.peak_alloc / 2**20 if _trace else None,
+                 "ok" if exc_type is None else "failed"))
+        return False
+
+
+def _rows(value):
+    """Row count of a stage's return value, if it has one."""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    n = getattr(value, "num_rows", None)
+    if n is None and isinstance(value, (pd.DataFrame, pd.Series)):
+        n = len(value)
+    return n
+
+
+def _wrap(func, name: str):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        with _Stage(name) as m:
+            out = func(*args, **kwargs)
+            if m.rows_out is None:
+                m.rows_out = _rows(out)
+            return out
+    return wrapper
+
+
+def stage(name=None):
+    """@stage, @stage("name") or `with stage("name") as m:` (then m.rows_in = ...)."""
+    if callable(name):
+        return _wrap(name, name.__qualname__)
+    return _Stage(name)
+
+
+def rows(rows_in: int = None, rows_out: int = None):
+    """Set the current stage's row counts from inside it; no-op when metrics are off."""
+    if not _enabled or not getattr(_local, "stack", None):
+        return
+    m = _local.stack[-1]
+    if rows_in is not None:
+        m.rows_in = int(rows_in)
+    if rows_out is not None:
+        m.rows_out = int(rows_out)
+
+
+def _record(row: tuple, db_path: Path = DB_PATH):
+    """Append one row; a metrics failure never fails the stage."""
+    try:
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(db_path, timeout=30) as conn:
+            conn.execute(METRICS_SQL)
+            conn.execute("INSERT INTO run_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"run_metrics: not recorded ({e})", file=sys.stderr)
+
+
+# --- report ------------------------------------------------------------------
+
+def _total(s: pd.Series):
+    return s.sum(min_count=1)    # NULL if no call recorded it
+
+
+def load_runs(db_path: Path = DB_PATH) -> pd.DataFrame:
+    """Per (run, stage) totals: times, rows and bytes summed over calls, peaks maxed."""
+    with sqlite3.connect(db_path) as conn:
+        m = pd.read_sql("SELECT * FROM run_metrics", conn)
+    return (m.groupby(["run_id", "stage"], sort=False)
+             .agg(started_at=("started_at", "min"), calls=("stage", "size"),
+                  wall_s=("wall_s", "sum"), cpu_s=("cpu_s", "sum"),
+                  rows_in=("rows_in", _total), rows_out=("rows_out", _total),
+                  bytes_read=("bytes_read", _total), bytes_written=("bytes_written", _total),
+                  peak_rss_mb=("peak_rss_mb", "max"), peak_alloc_mb=("peak_alloc_mb", "max"),
+                  failed=("status", lambda s: (s != "ok").any()))
+             .reset_index())
+
+
+def compare(run: str = None, baseline: str = None, threshold: float = THRESHOLD,
+            db_path: Path = DB_PATH) -> pd.DataFrame:
+    """Stages of `run` (default: latest) next to `baseline` (default: the run before it)."""
+    m = load_runs(db_path)
+    order = m.groupby("run_id")["started_at"].min().sort_values().index.tolist()
+    run = run or order[-1]
+    if baseline is None:
+        earlier = order[:order.index(run)]
+        baseline = earlier[-1] if earlier else None
+    cur = m[m["run_id"] == run].set_index("stage")
+    base = m[m["run_id"] == baseline].set_index("stage").reindex(cur.index)
+    out = cur[["wall_s", "cpu_s", "rows_out", "bytes_read", "bytes_written", "peak_rss_mb"]].copy()
+    out["base_wall_s"] = base["wall_s"]
+    out["change"] = cur["wall_s"] / base["wall_s"] - 1
+    out["base_peak_mb"] = base["peak_rss_mb"]
+    out["flag"] = ""
+    out.loc[out["change"] > threshold, "flag"] = "slower"
+    out.loc[(cur["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold)) & (out["flag"] == ""),
+            "flag"] = "memory"
+    out.loc[cur["failed"], "flag"] = "failed"
+    out.attrs.update(run=run, baseline=baseline)
+    return out
+
+
+def _mb(n):
+    return f"{n / 2**20:9.1f}" if pd.notna(n) else f"{'-':>9}"
+
+
+def report(run: str = None, baseline: str = None, threshold: float = THRESHOLD):
+    t = compare(run, baseline, threshold)
+    print(f"Run {t.attrs['run']} vs baseline {t.attrs['baseline'] or '(none)'}")
+    print(f"  {'stage':<32}{'wall s':>9}{'base s':>9}{'change':>8}{'cpu s':>9}{'rows out':>10}"
+          f"{'MB read':>9}{'MB writ':>9}{'peak MB':>9}")
+    for name, r in t.iterrows():
+        change = f"{r['change']:+7.0%}" if pd.notna(r["change"]) else f"{'new':>7}"
+        base = f"{r['base_wall_s']:9.2f}" if pd.notna(r["base_wall_s"]) else f"{'-':>9}"
+        rows_out = f"{int(r['rows_out']):10,}" if pd.notna(r["rows_out"]) else f"{'-':>10}"
+        print(f"  {name:<32}{r['wall_s']:9.2f}{base} {change}{r['cpu_s']:9.2f}{rows_out}"
+              f"{_mb(r['bytes_read'])}{_mb(r['bytes_written'])}{r['peak_rss_mb']:9.1f}  {r['flag']}")
+    flagged = (t["flag"] != "").sum()
+    print(f"{'⚠️ ' + str(flagged) + ' stage(s) flagged' if flagged else '✅ no regressions'} "
+          f"(threshold {threshold:.0%})")
+    return t
+
+
+def runs(db_path: Path = DB_PATH, n: int = 10) -> pd.DataFrame:
+    """Latest runs; wall_s adds up top-level stages (parallel stages overlap)."""
+    with sqlite3.connect(db_path) as conn:
+        return pd.read_sql(
+            "SELECT run_id, datetime(MIN(started_at), 'unixepoch') AS started, "
+            "COUNT(DISTINCT stage) AS stages, SUM(CASE WHEN parent IS NULL THEN wall_s END) AS wall_s, "
+            "SUM(status != 'ok') AS failed FROM run_metrics GROUP BY run_id "
+            "ORDER BY MIN(started_at) DESC LIMIT ?", conn, params=(n,))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-stage run metrics recorded in fpl.db")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("report", help="compare a run with a baseline run")
+    r.add_argument("--run", default=None, help="run id (default: latest)")
+    r.add_argument("--baseline", default=None, help="run id (default: the run before --run)")
+    r.add_argument("--threshold", type=float, default=THRESHOLD)
+    sub.add_parser("runs", help="list recent runs")
+    a = ap.parse_args()
+    if a.cmd == "report":
+        t = report(a.run, a.baseline, a.threshold)
+        sys.exit(1 if (t["flag"] != "").any() else 0)
+    print(runs().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# src/model_update.py
+#
+# Weekly model refresh. Normally the saved per-position boosters are continued
+# on the rows of the newly finished gameweeks (LightGBM/XGBoost `init_model`),
+# with LightGBM reusing the binned Dataset saved at the last full fit. A full
+# retrain only happens every FULL_EVERY rounds, or when the models' error on
+# the new rounds drifts DRIFT above their walk-forward backtest error. Models
+# with nothing to continue (ridge, gbr, rf, ...) are always fully retrained.
+#     python src/model_update.py                 # update, or full retrain if due
+#     python src/model_update.py --full --model lgbm --params '{"n_estimators": 300}'
+
+import json
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+from backtest import POSITIONS, load_position, run_backtest, score, position_configs
+from predict import MODEL_DIR, train_models, save_models, load_models
+
+UPDATE_TREES   = 50     # trees added per position per update
+FULL_EVERY     = 6      # rounds between scheduled full retrains
+DRIFT          = 0.15   # relative RMSE increase on new rounds that forces a full retrain
+BASELINE_FOLDS = 4      # walk-forward folds the baseline RMSE is measured on
+# LightGBM aliases of num_iterations; lgb.train lets any of these in params
+# override num_boost_round, and a fitted model's params carry its n_estimators
+ITERATION_ALIASES = {"num_iterations", "num_iteration", "n_iter", "num_tree", "num_trees",
+                     "num_round", "num_rounds", "nrounds", "num_boost_round",
+                     "n_estimators", "max_iter"}
+
+
+def _binned_path(model_dir: Path, version: str, pos: str) -> Path:
+    return Path(model_dir) / version / f"{pos}.bin"
+
+
+def _save_binned(model, d, path: Path):
+    """LightGBM's binned training Dataset, so later updates bin new rows the same way."""
+    import lightgbm as lgb
+
+    booster = model if isinstance(model, lgb.Booster) else model.booster_
+    params = {k: v for k, v in booster.params.items() if k not in ITERATION_ALIASES}
+    lgb.Dataset(d.X, d.y, params=params).save_binary(str(path))
+
+
+def _add_trees_lgbm(model, X, y, n_trees: int, binned: Path):
+    """Boost n_trees more rounds on X, y starting from the current booster.
+
+    The new rows take their bin boundaries from the saved training Dataset, so
+    no bin search runs and the old trees' splits keep their meaning. Returns
+    an lgb.Booster (same .predict(X) as the sklearn wrapper).
+    """
+    import lightgbm as lgb
+
+    booster = model if isinstance(model, lgb.Booster) else model.booster_
+    params = {k: v for k, v in booster.params.items() if k not in ITERATION_ALIASES}
+    before = booster.num_trees()
+    ref = lgb.Dataset(str(binned)) if binned.exists() else None
+    train = lgb.Dataset(X, y, reference=ref, params=params)
+    out = lgb.train(params, train, num_boost_round=n_trees,
+                    init_model=booster, keep_training_booster=True)
+    if out.num_trees() != before + n_trees:
+        raise RuntimeError(f"expected {before} + {n_trees} trees after the update, "
+                           f"got {out.num_trees()}")
+    return out
+
+
+def _add_trees_xgb(model, X, y, n_trees: int, binned: Path):
+    model.set_params(n_estimators=n_trees)
+    return model.fit(X, y, xgb_model=model.get_booster())
+
+
+# config["model"] -> continue training; other models always get a full retrain
+UPDATERS = {"lgbm": _add_trees_lgbm, "xgb": _add_trees_xgb}
+
+
+def _rmse(model, X, y) -> float:
+    return float(np.sqrt(np.mean((np.asarray(model.predict(X)) - y) ** 2))) if len(y) else 0.0
+
+
+def full_train(config: dict, seasons=None, model_dir: Path = MODEL_DIR, data: dict = None) -> str:
+    """Retrain every position from scratch and record its baseline error.
+
+    config is one config for every position or {position: config}.
+
+    The baseline is the walk-forward RMSE over the last BASELINE_FOLDS rounds
+    (cached by backtest.py), which is what later rounds are compared with.
+    """
+    data = data or {pos: load_position(pos, seasons) for pos in POSITIONS}
+    configs = position_configs(config)
+    version = train_models(config, seasons, model_dir=model_dir, data=data)
+    _, bundles = load_models(version, model_dir)
+
+    for pos, bundle in bundles.items():
+        d = data[pos]
+        folds = min(BASELINE_FOLDS, len(d.periods) - 1)
+        preds = run_backtest(configs[pos], [pos], min_train=len(d.periods) - folds, data={pos: d})
+        bundle["baseline_rmse"] = float(score(preds)["rmse"].iat[0]) if len(preds) else None
+        if configs[pos]["model"] == "lgbm":
+            _save_binned(bundle["model"], d, _binned_path(model_dir, version, pos))
+    save_models(version, bundles, model_dir)
+    print(f"✅ Full retrain {version}: baseline RMSE "
+          + ", ".join(f"{p} {b['baseline_rmse']:.3f}" for p, b in bundles.items()
+                      if b["baseline_rmse"] is not None))
+    return version
+
+
+def refresh(seasons=None, full_every: int = FULL_EVERY, drift: float = DRIFT,
+            n_trees: int = UPDATE_TREES, config: dict = None, force_full=False,
+            model_dir: Path = MODEL_DIR) -> str:
+    """Bring the latest models up to the newest finished round.
+
+    Returns the new version: `<root>+<round>` for an update, a fresh hash for a
+    full retrain. Nothing happens if there are no new rounds.
+    """
+    t0 = time.perf_counter()
+    version, bundles = load_models(model_dir=model_dir)
+    # the models' own configs (per position after `predict.py train --tuned`) unless given
+    configs = position_configs(config) if config else {p: b["config"] for p, b in bundles.items()}
+    data = {pos: load_position(pos, seasons) for pos in POSITIONS}
+
+    # 1) rows after what each model has seen
+    new_rows = {}
+    for pos, bundle in bundles.items():
+        d = data[pos]
+        seen = d.periods.index(tuple(bundle["trained_through"])) + 1 \
+            if tuple(bundle["trained_through"]) in d.periods else 0
+        new_rows[pos] = slice(int(d.bounds[seen]), len(d.y))
+    newest = max(data[p].periods[-1] for p in POSITIONS)
+    if all(s.start == s.stop for s in new_rows.values()) and not force_full:
+        print(f"{version} is already trained through {newest}, nothing to do")
+        return version
+
+    # 2) full retrain on schedule, on drift, or when asked
+    d0, b0 = data[POSITIONS[0]], bundles[POSITIONS[0]]
+    full_through = tuple(b0["full_through"])
+    since_full = len(d0.periods) - 1 - d0.periods.index(full_through) \
+        if full_through in d0.periods else full_every
+    reasons = ["forced"] if force_full else []
+    if since_full >= full_every:
+        reasons.append(f"{since_full} rounds since the last full fit")
+    for pos, bundle in bundles.items():
+        d, rows = data[pos], new_rows[pos]
+        err, base = _rmse(bundle["model"], d.X[rows], d.y[rows]), bundle.get("baseline_rmse")
+        if base and err > base * (1 + drift):
+            reasons.append(f"{pos} RMSE {err:.3f} vs baseline {base:.3f}")
+    fixed = sorted({c["model"] for c in configs.values() if c["model"] not in UPDATERS})
+    if fixed:
+        reasons.append(f"{', '.join(fixed)} can't be trained incrementally")
+    if reasons or any(configs[p] != b["config"] for p, b in bundles.items()):
+        print(f"Full retrain: {'; '.join(reasons) or 'config changed'}")
+        return full_train(configs, seasons, model_dir, data)
+
+    # 3) otherwise add trees for the new rows only
+    new_version = f"{b0['root']}+{newest[1]}"
+    for pos, bundle in bundles.items():
+        d, rows = data[pos], new_rows[pos]
+        if rows.start < rows.stop:
+            binned = _binned_path(model_dir, b0["root"], pos)
+            update = UPDATERS[configs[pos]["model"]]
+            bundle["model"] = update(bundle["model"], d.X[rows], d.y[rows], n_trees, binned)
+        bundle["trained_through"] = d.periods[-1]
+        print(f"Updated {pos}: {rows.stop - rows.start} new rows")
+    save_models(new_version, bundles, model_dir)
+    print(f"✅ {version} → {new_version} in {time.perf_counter() - t0:.2f}s")
+    return new_version
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Refresh the per-position models after a gameweek")
+    ap.add_argument("--full", action="store_true", help="full retrain regardless of schedule/drift")
+    ap.add_argument("--model", default=None, help="model for a full retrain (default: current)")
+    ap.add_argument("--params", default="{}", help="estimator params as JSON, with --model")
+    ap.add_argument("--every", type=int, default=FULL_EVERY, help="rounds between full retrains")
+    ap.add_argument("--drift", type=float, default=DRIFT, help="relative RMSE rise that forces a full retrain")
+    ap.add_argument("--trees", type=int, default=UPDATE_TREES, help="trees added per update")
+    a = ap.parse_args()
+
+    config = {"model": a.model, "params": json.loads(a.params)} if a.model else None
+    if not (Path(MODEL_DIR) / "LATEST").exists():
+        if config is None:
+            ap.error("no trained models yet; pass --model for the first full fit")
+        full_train(config)
+    else:
+        refresh(full_every=a.every, drift=a.drift, n_trees=a.trees, config=config, force_full=a.full)
+
+
+if __name__ == "__main__":
+    main()
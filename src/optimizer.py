@@ -0,0 +1,260 @@
+# src/optimizer.py
+#
+# Step 8 of fpl_plan: pick the 15-man squad and starting XI as an integer
+# linear program with PuLP.
+#     python src/optimizer.py --round 10 [--xp-col points_4] [--current 1 2 3 ...]
+#     python src/optimizer.py --round 31 --predicted [--version V]
+#     python src/optimizer.py --bench
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import pulp
+from pathlib import Path
+
+from table_schema import read_table
+
+DATA_DIR = Path("data/processed")
+SEASON   = "2025"
+POSITIONS = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+
+BUDGET       = 1000                               # tenths of £m, like now_cost
+SQUAD_QUOTAS = {1: 2, 2: 5, 3: 5, 4: 3}           # element_type -> squad slots
+XI_LIMITS    = {1: (1, 1), 2: (3, 5), 3: (2, 5), 4: (1, 3)}
+XI_SIZE      = 11
+MAX_PER_CLUB = 3
+BENCH_WEIGHT = 0.1                                # value of a bench player's xp
+
+
+def load_candidates(round_: int, xp_col: str = "points_4", season: str = SEASON) -> pd.DataFrame:
+    """One row per player with a fixture in `round_`: element, name, element_type, team_id, price, xp.
+
+    xp is `xp_col` from features_{season}, summed over a double gameweek's fixtures.
+    """
+    feats = pd.read_parquet(DATA_DIR / f"features_{season}.parquet",
+                            columns=["element", "round", "name", "element_type", "price", xp_col],
+                            filters=[("round", "==", round_)])
+    players = read_table(DATA_DIR / f"players_{season}.parquet", columns=["id", "team"])
+
+    cand = (feats.groupby("element", as_index=False)
+                 .agg(name=("name", "first"), element_type=("element_type", "first"),
+                      price=("price", "first"), xp=(xp_col, "sum")))
+    cand = cand.merge(players.rename(columns={"id": "element", "team": "team_id"}),
+                      on="element", how="left")
+    return cand[["element", "name", "element_type", "team_id", "price", "xp"]]
+
+
+def load_predicted_candidates(round_: int, version: str = None, season: str = SEASON) -> pd.DataFrame:
+    """load_candidates with xp from the `predictions` table (see predict.py).
+
+    Works for rounds not played yet: price, club and position come from
+    players_{season}, not from the feature rows.
+    """
+    from predict import read_predictions
+
+    preds = read_predictions(round_, version)
+    players = read_table(DATA_DIR / f"players_{season}.parquet",
+                         columns=["id", "first_name", "second_name", "element_type", "team", "now_cost"])
+    cand = preds[["element", "xp"]].merge(
+        players.rename(columns={"id": "element", "team": "team_id", "now_cost": "price"}),
+        on="element", how="inner")
+    cand["name"] = cand["first_name"] + " " + cand["second_name"]
+    return cand[["element", "name", "element_type", "team_id", "price", "xp"]]
+
+
+def prune_dominated(cand: pd.DataFrame, keep=()) -> pd.DataFrame:
+    """Drop players no optimal squad needs.
+
+    j dominates i if both play the same position, j costs no more and scores no
+    less (ties broken by element id). i is dropped when its dominators come from
+    at least quota + 4 different clubs, quota being the position's squad slots:
+    with at most MAX_PER_CLUB (3) players per club, the 14 other picks reach the
+    cap at no more than 14 // 3 = 4 clubs, and at most quota - 1 dominators are
+    in the squad beside i. So some dominator outside the squad plays for a club
+    with room, and swapping i for it keeps the squad legal and loses no points:
+    pruning i keeps the optimum. Players in `keep` always stay.
+    """
+    n_full = (sum(SQUAD_QUOTAS.values()) - 1) // MAX_PER_CLUB   # clubs the other picks can fill
+    keep_mask = cand["element"].isin(list(keep)).to_numpy()
+    mask = np.ones(len(cand), dtype=bool)
+
+    for etype, quota in SQUAD_QUOTAS.items():
+        idx = np.flatnonzero(cand["element_type"].to_numpy() == etype)
+        if len(idx) <= quota:
+            continue
+        price = cand["price"].to_numpy(dtype=np.float64)[idx]
+        xp    = cand["xp"].to_numpy(dtype=np.float64)[idx]
+        elem  = cand["element"].to_numpy()[idx]
+
+        # dom[i, j]: j dominates i
+        no_worse = (price[None, :] <= price[:, None]) & (xp[None, :] >= xp[:, None])
+        better   = (price[None, :] < price[:, None]) | (xp[None, :] > xp[:, None]) \
+                   | (elem[None, :] < elem[:, None])
+        dom = no_worse & better
+        clubs = pd.factorize(cand["team_id"].to_numpy()[idx])[0]
+        onehot = np.zeros((len(idx), clubs.max() + 1), dtype=bool)
+        onehot[np.arange(len(idx)), clubs] = True
+        dom_clubs = (dom.astype(np.int32) @ onehot.astype(np.int32) > 0).sum(axis=1)
+        mask[idx[dom_clubs >= quota + n_full]] = False
+
+    return cand[mask | keep_mask].reset_index(drop=True)
+
+
+def _greedy_xi(squad: pd.DataFrame) -> set:
+    """Best legal XI from a 15-man squad: position minimums first, then top xp."""
+    squad = squad.sort_values("xp", ascending=False)
+    xi = []
+    for etype, (lo, _) in XI_LIMITS.items():
+        xi += squad[squad["element_type"] == etype]["element"].head(lo).tolist()
+    counts = {etype: lo for etype, (lo, _) in XI_LIMITS.items()}
+    for element, etype in zip(squad["element"], squad["element_type"]):
+        if len(xi) == XI_SIZE:
+            break
+        if element not in xi and counts[etype] < XI_LIMITS[etype][1]:
+            xi.append(element)
+            counts[etype] += 1
+    return set(xi)
+
+
+def build_model(cand: pd.DataFrame, budget=BUDGET, captain=True):
+    """PuLP model over `cand`; returns (model, squad vars, xi vars, captain vars)."""
+    ids   = cand["element"].tolist()
+    xp    = cand["xp"].astype(float).tolist()
+    price = cand["price"].astype(float).tolist()
+    model = pulp.LpProblem("fpl_squad", pulp.LpMaximize)
+
+    squad = [pulp.LpVariable(f"squad_{e}", cat="Binary") for e in ids]
+    xi    = [pulp.LpVariable(f"xi_{e}", cat="Binary") for e in ids]
+    capt  = [pulp.LpVariable(f"capt_{e}", cat="Binary") for e in ids] if captain else []
+
+    # 1) objective: starters, captain counted twice, a little for the bench
+    #    (one term per variable: LpAffineExpression keeps the last of duplicate keys)
+    obj = [(v, BENCH_WEIGHT * p) for v, p in zip(squad, xp)]
+    obj += [(v, (1 - BENCH_WEIGHT) * p) for v, p in zip(xi, xp)]
+    obj += [(v, p) for v, p in zip(capt, xp)]
+    model += pulp.LpAffineExpression(obj)
+
+    # 2) budget, squad size and position quotas
+    model += pulp.LpAffineExpression(zip(squad, price)) <= budget
+    etypes = cand["element_type"].to_numpy()
+    for etype, quota in SQUAD_QUOTAS.items():
+        rows = np.flatnonzero(etypes == etype)
+        model += pulp.lpSum(squad[i] for i in rows) == quota
+        lo, hi = XI_LIMITS[etype]
+        model += pulp.lpSum(xi[i] for i in rows) >= lo
+        model += pulp.lpSum(xi[i] for i in rows) <= hi
+
+    # 3) max players per club
+    for _, rows in cand.groupby("team_id").indices.items():
+        if len(rows) > MAX_PER_CLUB:
+            model += pulp.lpSum(squad[i] for i in rows) <= MAX_PER_CLUB
+
+    # 4) starters and captain come from the squad
+    model += pulp.lpSum(xi) == XI_SIZE
+    for s, x in zip(squad, xi):
+        model += x <= s
+    if captain:
+        model += pulp.lpSum(capt) == 1
+        for x, c in zip(xi, capt):
+            model += c <= x
+    return model, squad, xi, capt
+
+
+def _warm_start(cand, squad, xi, capt, current):
+    """Seed CBC with the current squad, its greedy XI and best-xp captain."""
+    current = set(current)
+    in_squad = cand["element"].isin(current)
+    starters = _greedy_xi(cand[in_squad])
+    best = cand[cand["element"].isin(starters)]["xp"].idxmax() if starters else None
+    for i, e in enumerate(cand["element"]):
+        squad[i].setInitialValue(int(e in current))
+        xi[i].setInitialValue(int(e in starters))
+        if capt:
+            capt[i].setInitialValue(int(i == best))
+
+
+def optimize_squad(cand: pd.DataFrame, budget=BUDGET, current=None,
+                   prune=True, captain=True, time_limit=None, msg=False) -> pd.DataFrame:
+    """Solve for the best squad/XI; returns the 15 picks with starter/captain flags.
+
+    current: element ids of the squad we hold, used as a CBC warm start and
+    never pruned. The result carries solve timings in .attrs.
+    """
+    t0 = time.perf_counter()
+    current = list(current or [])
+    pool = prune_dominated(cand, keep=current) if prune else cand.reset_index(drop=True)
+    model, squad, xi, capt = build_model(pool, budget, captain)
+    warm = bool(current) and pool["element"].isin(current).sum() == sum(SQUAD_QUOTAS.values())
+    if warm:
+        _warm_start(pool, squad, xi, capt, current)
+    t1 = time.perf_counter()
+
+    status = model.solve(pulp.PULP_CBC_CMD(msg=msg, warmStart=warm, timeLimit=time_limit))
+    t2 = time.perf_counter()
+    if pulp.LpStatus[status] != "Optimal":
+        raise RuntimeError(f"Squad ILP finished with status {pulp.LpStatus[status]}")
+
+    picked = [i for i, v in enumerate(squad) if v.value() > 0.5]
+    out = pool.iloc[picked].copy()
+    out["position"] = out["element_type"].map(POSITIONS)
+    out["starter"]  = [xi[i].value() > 0.5 for i in picked]
+    out["captain"]  = [bool(capt) and capt[i].value() > 0.5 for i in picked]
+    out = out.sort_values(["starter", "element_type", "xp"], ascending=[False, True, False])
+    out.attrs.update(pool_size=len(cand), candidates=len(pool),
+                     objective=pulp.value(model.objective),
+                     build_s=t1 - t0, solve_s=t2 - t1)
+    return out.reset_index(drop=True)
+
+
+def random_pool(n: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic candidate pool with the real pool's position mix and price spread."""
+    rng = np.random.default_rng(seed)
+    etype = rng.choice([1, 2, 3, 4], size=n, p=[0.1, 0.33, 0.4, 0.17])
+    price = np.round(rng.gamma(4.0, 1.5, n) + 40).astype(int)
+    xp = np.clip((price - 40) / 15 + rng.normal(2.0, 1.5, n), 0, None)
+    return pd.DataFrame({
+        "element": np.arange(1, n + 1), "name": [f"P{i}" for i in range(1, n + 1)],
+        "element_type": etype, "team_id": rng.integers(1, 21, n),
+        "price": price, "xp": xp.round(2),
+    })
+
+
+def benchmark(sizes=(100, 200, 400, 700), repeats=3, seed=0):
+    """Solve time vs pool size, with and without dominance pruning."""
+    rows = []
+    for n in sizes:
+        for prune in (False, True):
+            for r in range(repeats):
+                res = optimize_squad(random_pool(n, seed + r), prune=prune)
+                rows.append({"pool": n, "prune": prune, "candidates": res.attrs["candidates"],
+                             "build_s": res.attrs["build_s"], "solve_s": res.attrs["solve_s"],
+                             "objective": res.attrs["objective"]})
+    report = (pd.DataFrame(rows).groupby(["pool", "prune"], as_index=False)
+                .agg(candidates=("candidates", "mean"), build_s=("build_s", "median"),
+                     solve_s=("solve_s", "median"), objective=("objective", "mean")))
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Pick the best FPL squad and XI for one gameweek.")
+    ap.add_argument("--round", type=int, help="gameweek to optimise")
+    ap.add_argument("--xp-col", default="points_4", help="features column used as expected points")
+    ap.add_argument("--budget", type=int, default=BUDGET, help="budget in tenths of £m")
+    ap.add_argument("--current", type=int, nargs="*", default=None, help="current squad element ids")
+    ap.add_argument("--predicted", action="store_true", help="xp from the predictions table")
+    ap.add_argument("--version", default=None, help="model version for --predicted (default: latest)")
+    ap.add_argument("--bench", action="store_true", help="benchmark solve time vs pool size")
+    a = ap.parse_args()
+
+    if a.bench:
+        benchmark()
+    else:
+        cand = load_predicted_candidates(a.round, a.version) if a.predicted \
+            else load_candidates(a.round, a.xp_col)
+        squad = optimize_squad(cand, a.budget, a.current)
+        print(squad[["element", "name", "position", "team_id", "price", "xp", "starter", "captain"]]
+              .to_string(index=False))
+        print(f"Objective {squad.attrs['objective']:.2f} | {squad.attrs['candidates']}/"
+              f"{squad.attrs['pool_size']} candidates | solved in {squad.attrs['solve_s']:.2f}s")
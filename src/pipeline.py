@@ -0,0 +1,307 @@
+# src/pipeline.py
+#
+# Dependency-aware runner for the processing stages. Run from the repo root:
+#     python src/pipeline.py [--force] [--only STAGE ...] [--jobs N] [--dry-run] [--metrics]
+
+import os
+import re
+import sys
+import json
+import glob
+import time
+import fnmatch
+import hashlib
+import runpy
+import argparse
+import importlib
+from pathlib import Path
+from typing import NamedTuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+SRC_DIR    = Path(__file__).resolve().parent
+STATE_PATH = Path("data/pipeline_state.json")
+CURRENT    = "2025"                # built from the API files by the load_* stages
+OLD_SEASONS = ("2023", "2024")     # players rebuilt from the merged CSV
+
+
+class Stage(NamedTuple):
+    name:    str
+    target:  str            # "module:function" in src/, or a script "name.py" run as __main__
+    inputs:  tuple = ()     # paths or glob patterns, relative to the repo root
+    outputs: tuple = ()
+    args:    tuple = ()
+
+
+def seasons_present(data_dir="data/processed") -> list:
+    """Seasons with a history_<season>.parquet, plus the current one."""
+    found = (re.fullmatch(r"history_(\d{4})\.parquet", os.path.basename(p))
+             for p in glob.glob(os.path.join(data_dir, "history_*.parquet")))
+    return sorted({m.group(1) for m in found if m} | {CURRENT})
+
+
+def default_stages(seasons=None):
+    """The processing path, for every season present by default. A stage depends
+    on every earlier stage that writes a file it reads or writes, so declaration
+    order settles files that several stages rewrite in place; every file has
+    exactly one stage that creates it."""
+    P = "data/processed"
+    seasons = seasons or seasons_present(P)
+    CSV = "data/raw/cleaned_merged_seasons_team_aggregated.csv"
+    files = lambda kind, ss, ext="parquet": tuple(f"{P}/{kind}_{s}.{ext}" for s in ss)
+    # a table read through table_schema: the parquet plus its schema log, if it has one
+    logical = lambda kind, ss: tuple(f"{P}/{kind}_{s}.*" for s in ss)
+
+    stages = [
+        Stage("load_bootstrap", "data_storage:load_bootstrap",
+              ("data/raw/bootstrap-static.json",),
+              (f"{P}/players.parquet", f"{P}/teams.parquet", f"{P}/positions.parquet")),
+        Stage("load_fixtures", "data_storage:load_fixtures",
+              ("data/raw/matches.json",), (f"{P}/fixtures.parquet",)),
+        Stage("load_element_histories", "data_storage:load_element_histories",
+              ("data/raw/element-*-history.json",), (f"{P}/history.parquet",)),
+        Stage("build_fixtures_2025", "build_fixtures_2025:build_fixtures_2025",
+              ("data/raw/matches_2025.csv",), (f"{P}/fixtures_2025.parquet",)),
+
+        # the current season's tables from the loaders' output; columns dropped
+        # as a schema-log entry (see table_schema.py)
+        Stage(f"publish_{CURRENT}", "data_storage:publish_season",
+              (f"{P}/history.parquet", f"{P}/players.parquet"),
+              files("history", [CURRENT]) + files("players", [CURRENT]), (CURRENT,)),
+        Stage(f"clean_players_{CURRENT}", "cleaning_player_databases:clean_players",
+              files("players", [CURRENT]), files("players", [CURRENT], "schema.json"), (CURRENT,)),
+    ]
+    old = [s for s in OLD_SEASONS if s in seasons]
+    if old:
+        # earlier seasons: history as found in data/processed, players from the
+        # merged CSV in the current season's columns. Nothing current reads these.
+        stages += [
+            Stage("adding_starts", "adding_starts:add_starts",
+                  files("history", old), files("history", old, "schema.json"), (old,)),
+            Stage("rebuild_players_23_24", "rebuild_players_23_24.py",
+                  (CSV,) + logical("history", OLD_SEASONS) + logical("players", [CURRENT]),
+                  files("players", OLD_SEASONS)),
+        ]
+    for s in seasons:
+        stages += [
+            Stage(f"lake_{s}", "dataset:migrate",
+                  logical("history", [s]) + logical("players", [s]) + (f"{P}/fixtures_{s}.parquet",),
+                  args=([s], ["history", "players", "fixtures"])),
+            Stage(f"team_ledger_{s}", "team_ledger:build_team_ledger_for",
+                  (f"{P}/fixtures_{s}.parquet",),
+                  (f"{P}/team_ledger_{s}.parquet", f"{P}/team_stats_{s}.parquet"), (s,)),
+            Stage(f"features_{s}", "features_extended:build_features_for",
+                  logical("history", [s]) + logical("players", [s])
+                  + (f"{P}/fixtures_{s}.parquet", f"{P}/team_ledger_{s}.parquet"),
+                  (f"{P}/features_{s}.parquet", f"{P}/features_{s}_state.parquet"), (s,)),
+        ]
+    stages += [
+        Stage("add_features_2025_to_db", "add_features_2025_to_db:main",
+              files("features", [CURRENT])),
+    ]
+    return stages
+
+
+# --- hashing ---------------------------------------------------------------
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class _Hasher:
+    """Content hashes, recomputed only when a file's size/mtime moved since the last run."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def __call__(self, path):
+        st = os.stat(path)
+        hit = self.cache.get(path)
+        if hit and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+            return hit[2]
+        sha = _sha256(path)
+        self.cache[path] = [st.st_size, st.st_mtime_ns, sha]
+        return sha
+
+
+def _expand(patterns):
+    """Input paths; a glob that matches nothing is kept as-is so it counts as missing."""
+    paths = []
+    for p in patterns:
+        paths += (sorted(glob.glob(p)) or [p]) if glob.has_magic(p) else [p]
+    return paths
+
+
+def _target_file(target):
+    if target.endswith(".py"):
+        return SRC_DIR / target
+    return SRC_DIR / f"{target.split(':')[0]}.py"
+
+
+_LOCAL_IMPORT = re.compile(r"^\s*(?:from|import)\s+(\w+)", re.M)
+
+
+def _code_hash(path, hasher, seen=None):
+    """Hash of a stage's source file plus every src/ module it imports, recursively."""
+    seen = seen if seen is not None else set()
+    if path in seen or not path.exists():
+        return ""
+    seen.add(path)
+    parts = [hasher(str(path))]
+    for mod in sorted(set(_LOCAL_IMPORT.findall(path.read_text(encoding="utf8")))):
+        parts.append(_code_hash(SRC_DIR / f"{mod}.py", hasher, seen))
+    return hashlib.sha256("".join(parts).encode()).hexdigest()
+
+
+# --- scheduling ------------------------------------------------------------
+
+def _dependencies(stages):
+    deps = {s.name: set() for s in stages}
+    for i, s in enumerate(stages):
+        touched = list(s.inputs) + list(s.outputs)
+        for prev in stages[:i]:
+            if any(fnmatch.fnmatch(out, pat) for out in prev.outputs for pat in touched):
+                deps[s.name].add(prev.name)
+    return deps
+
+
+def _run_stage(name, target, args):
+    """Executed in a worker process; returns (wall seconds, cpu seconds)."""
+    if str(SRC_DIR) not in sys.path:
+        sys.path.insert(0, str(SRC_DIR))
+    from metrics import stage
+
+    start, cpu = time.perf_counter(), time.process_time()
+    with stage(name):
+        if target.endswith(".py"):
+            runpy.run_path(str(SRC_DIR / target), run_name="__main__")
+        else:
+            module, func = target.split(":")
+            getattr(importlib.import_module(module), func)(*args)
+    return time.perf_counter() - start, time.process_time() - cpu
+
+
+def _fingerprint(stage, hasher):
+    """None if an input is missing, else what a cached run must match."""
+    inputs = _expand(stage.inputs)
+    if any(not os.path.exists(p) for p in inputs):
+        return None
+    return {
+        "code":   _code_hash(_target_file(stage.target), hasher),
+        "args":   list(stage.args),
+        "inputs": {p: hasher(p) for p in inputs},
+    }
+
+
+def _is_fresh(stage, fp, record):
+    if not record or record["code"] != fp["code"] or record["args"] != fp["args"]:
+        return False
+    if set(record["inputs"]) != set(fp["inputs"]):
+        return False
+    if not all(os.path.exists(p) for p in stage.outputs):
+        return False
+    for path, sha in fp["inputs"].items():
+        # a file the stage rewrites in place is current if it is what the stage last wrote
+        if sha != record["inputs"][path] and sha != record["outputs"].get(path):
+            return False
+    return True
+
+
+def run_pipeline(stages=None, force=False, only=None, jobs=None, dry_run=False, metrics=False):
+    """Run stale stages, independent ones in parallel; returns {stage: status}.
+
+    With metrics, every stage run (and the instrumented functions inside it)
+    is recorded in fpl.db's run_metrics under one run id (see metrics.py).
+    """
+    if metrics and not dry_run:
+        from metrics import enable
+        print(f"Recording run metrics as run {enable()}")
+    stages = stages or default_stages()
+    if only:
+        stages = [s for s in stages if s.name in only]
+    deps = _dependencies(stages)
+
+    state = json.loads(STATE_PATH.read_text()) if STATE_PATH.exists() else {}
+    records = state.setdefault("stages", {})
+    hasher = _Hasher(state.setdefault("hashes", {}))
+    timings = {}
+    status = {}
+    pending = list(stages)
+    running = {}
+    pool = None
+    start = time.perf_counter()
+
+    try:
+        while pending or running:
+            for s in list(pending):
+                dep_status = [status.get(d) for d in deps[s.name]]
+                if any(st in ("failed", "blocked", "missing") for st in dep_status):
+                    status[s.name] = "blocked"
+                    pending.remove(s)
+                    continue
+                if any(st is None or st == "running" for st in dep_status):
+                    continue
+                pending.remove(s)
+                fp = _fingerprint(s, hasher)
+                if fp is None:
+                    # without its inputs a stage can still hand on the outputs it built earlier
+                    kept = all(os.path.exists(p) for p in s.outputs)
+                    status[s.name] = "kept" if kept else "missing"
+                    if not kept:
+                        print(f"[{s.name}] missing inputs, skipping")
+                elif not force and _is_fresh(s, fp, records.get(s.name)):
+                    status[s.name] = "cached"
+                elif dry_run:
+                    status[s.name] = "stale"
+                else:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=jobs or os.cpu_count())
+                    status[s.name] = "running"
+                    running[pool.submit(_run_stage, s.name, s.target, s.args)] = (s, fp)
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                s, fp = running.pop(fut)
+                try:
+                    wall, cpu = fut.result()
+                except Exception as e:
+                    status[s.name] = "failed"
+                    print(f"[{s.name}] failed: {e!r}")
+                    continue
+                status[s.name] = "ran"
+                timings[s.name] = (wall, cpu)
+                records[s.name] = {**fp, "outputs": {p: hasher(p) for p in s.outputs if os.path.exists(p)},
+                                   "wall_s": wall, "cpu_s": cpu, "finished_at": time.time()}
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if not dry_run:
+            STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp = STATE_PATH.with_suffix(".tmp")
+            tmp.write_text(json.dumps(state, indent=1))
+            os.replace(tmp, STATE_PATH)
+
+    # per-stage summary
+    for s in stages:
+        wall, cpu = timings.get(s.name, (None, None))
+        took = f"{wall:8.2f}s wall {cpu:8.2f}s cpu" if wall is not None else ""
+        print(f"  {s.name:<30} {status.get(s.name, '?'):<8} {took}")
+    print(f"Pipeline finished in {time.perf_counter() - start:.2f}s")
+    return status
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run the FPL processing pipeline.")
+    ap.add_argument("--force", action="store_true", help="re-run every stage")
+    ap.add_argument("--only", nargs="+", help="stage names to consider")
+    ap.add_argument("--jobs", type=int, default=None, help="parallel stages (default: CPU count)")
+    ap.add_argument("--dry-run", action="store_true", help="report stale stages without running")
+    ap.add_argument("--metrics", action="store_true", help="record per-stage metrics in fpl.db")
+    a = ap.parse_args()
+    status = run_pipeline(force=a.force, only=a.only, jobs=a.jobs, dry_run=a.dry_run,
+                          metrics=a.metrics)
+    sys.exit(1 if "failed" in status.values() else 0)
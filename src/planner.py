@@ -0,0 +1,263 @@
+# src/planner.py
+#
+# Multi-gameweek transfer planning by beam search. Starting from the current
+# squad, bank and free transfers, each gameweek expands every kept plan by
+# rolling the transfer, every legal single transfer and the best pairs, charges
+# -4 per transfer beyond the free ones, and keeps the `beam` plans with the
+# best points so far plus what their squad would score over the rest of the
+# horizon without further moves.
+#     python src/planner.py --current 1 2 3 ... --bank 5 --ft 1 [--horizon 6] [--beam 20]
+#     python src/planner.py --bench
+
+import time
+import sqlite3
+import argparse
+import numpy as np
+import pandas as pd
+
+from optimizer import SQUAD_QUOTAS, MAX_PER_CLUB, BUDGET, SEASON, random_pool, optimize_squad
+
+HIT_COST      = 4     # points per transfer beyond the free ones
+MAX_FREE      = 5     # free transfers that can be banked
+MAX_PER_GW    = 2     # transfers considered in one gameweek
+POOL_PER_POS  = 30    # buy candidates per position, by xp over the horizon
+MAX_SINGLES   = 40    # single transfers expanded per plan, by xp gain over the rest of the horizon
+PAIR_POOL     = 15    # best singles combined into double transfers
+HORIZON       = 6
+GAMEWEEKS     = 38    # rounds in a season
+BEAM          = 20
+
+# squad slots in position order: 0-1 GK, 2-6 DEF, 7-11 MID, 12-14 FWD
+_SLOT_ETYPE = np.repeat(list(SQUAD_QUOTAS), list(SQUAD_QUOTAS.values()))
+_BLOCKS = np.cumsum([0] + list(SQUAD_QUOTAS.values()))
+
+
+def xi_points(xp: np.ndarray, squads: np.ndarray) -> np.ndarray:
+    """Best XI plus captain for many squads over many gameweeks at once.
+
+    xp is (players, gws), squads (n, 15) rows of player indices in slot order;
+    returns (n, gws). Filling the formation minimums (1 GK, 3 DEF, 2 MID, 1 FWD)
+    with each position's best and then the best 4 of the other outfielders is
+    exact, because a 5/5/3 outfield cannot break the maximums.
+    """
+    v = xp[squads]                                         # (n, 15, gws)
+    gk, d, m, f = (-np.sort(-v[:, lo:hi], axis=1) for lo, hi in zip(_BLOCKS[:-1], _BLOCKS[1:]))
+    forced = gk[:, 0] + d[:, :3].sum(1) + m[:, :2].sum(1) + f[:, 0]
+    rest = -np.sort(-np.concatenate([d[:, 3:], m[:, 2:], f[:, 1:]], axis=1), axis=1)
+    captain = np.maximum.reduce([gk[:, 0], d[:, 0], m[:, 0], f[:, 0]])
+    return forced + rest[:, :4].sum(1) + captain
+
+
+def _candidate_pool(players: pd.DataFrame, xp: np.ndarray, current) -> np.ndarray:
+    """Row positions worth buying: the best POOL_PER_POS per position by horizon xp, plus the squad."""
+    total = xp.sum(1)
+    keep = set(np.flatnonzero(players["element"].isin(current).to_numpy()))
+    etype = players["element_type"].to_numpy()
+    for e in SQUAD_QUOTAS:
+        idx = np.flatnonzero(etype == e)
+        keep.update(idx[np.argsort(-total[idx], kind="stable")[:POOL_PER_POS]])
+    return np.array(sorted(keep))
+
+
+def _expand(sq, bank, etype, team, price, rem, n_teams):
+    """Child squads of one plan: (squads, n transfers, bank after, outs, ins)."""
+    in_squad = np.zeros(len(etype), dtype=bool)
+    in_squad[sq] = True
+    club = np.bincount(team[sq], minlength=n_teams)
+
+    # 1) every legal single transfer, best MAX_SINGLES by xp gain over the rest of the horizon
+    out_e, out_t, out_p = etype[sq][:, None], team[sq][:, None], price[sq][:, None]
+    ok = (etype[None, :] == out_e) & ~in_squad[None, :] & (price[None, :] <= bank + out_p) \
+        & (club[team][None, :] - (team[None, :] == out_t) < MAX_PER_CLUB)
+    slot, buy = np.nonzero(ok)
+    gain = rem[buy] - rem[sq[slot]]
+    order = np.argsort(-gain, kind="stable")[:MAX_SINGLES]
+    slot, buy, gain = slot[order], buy[order], gain[order]
+
+    # 2) pairs of the best improving singles: different slots and players, re-checked below
+    top = np.flatnonzero(gain > 0)[:PAIR_POOL] if MAX_PER_GW >= 2 else np.zeros(0, dtype=int)
+    a, b = np.triu_indices(len(top), k=1)
+    a, b = top[a], top[b]
+    pair = (slot[a] != slot[b]) & (buy[a] != buy[b])
+    a, b = a[pair], b[pair]
+
+    n1, n2 = len(slot), len(a)
+    squads = np.repeat(sq[None, :], 1 + n1 + n2, axis=0)
+    outs = np.full((len(squads), 2), -1)
+    ins = np.full((len(squads), 2), -1)
+    r1 = np.arange(1, 1 + n1)
+    outs[r1, 0], ins[r1, 0] = sq[slot], buy
+    squads[r1, slot] = buy
+    r2 = np.arange(1 + n1, 1 + n1 + n2)
+    outs[r2, 0], ins[r2, 0], outs[r2, 1], ins[r2, 1] = sq[slot[a]], buy[a], sq[slot[b]], buy[b]
+    squads[r2, slot[a]] = buy[a]
+    squads[r2, slot[b]] = buy[b]
+    n_moves = np.r_[0, np.ones(n1, dtype=int), np.full(n2, 2)]
+
+    # 3) budget and club limits for the pairs (singles already pass)
+    spent = np.where(ins >= 0, price[np.maximum(ins, 0)], 0).sum(1) \
+        - np.where(outs >= 0, price[np.maximum(outs, 0)], 0).sum(1)
+    clubs = np.zeros((len(squads), n_teams), dtype=np.int16)
+    np.add.at(clubs, (np.arange(len(squads))[:, None], team[squads]), 1)
+    valid = (spent <= bank) & (clubs.max(1) <= MAX_PER_CLUB)
+    return squads[valid], n_moves[valid], (bank - spent)[valid], outs[valid], ins[valid]
+
+
+def plan_transfers(players: pd.DataFrame, xp: np.ndarray, current, bank: int, free: int = 1,
+                   rounds=None, beam: int = BEAM) -> pd.DataFrame:
+    """Best transfer sequence over xp's gameweeks.
+
+    players has element, element_type, team_id, price (tenths) in xp's row
+    order; xp is (players, gws) expected points; current the 15 element ids;
+    bank in tenths. Returns one row per gameweek: transfers out/in, hits, bank
+    after, expected points net of hits and captain, with the plan total, the
+    hold-the-squad total and runtime in .attrs.
+    """
+    t0 = time.perf_counter()
+    xp = np.asarray(xp, dtype=np.float64)
+    horizon = xp.shape[1]
+    rounds = list(rounds) if rounds is not None else list(range(1, horizon + 1))
+
+    # 1) work on a pruned pool; squad as slots in position order
+    pool = _candidate_pool(players, xp, current)
+    sub = players.iloc[pool].reset_index(drop=True)
+    xp = xp[pool]
+    etype = sub["element_type"].to_numpy()
+    team_codes, team = np.unique(sub["team_id"].to_numpy(), return_inverse=True)
+    price = sub["price"].to_numpy(dtype=np.int64)
+    elements = sub["element"].to_numpy()
+    pos = {e: i for i, e in enumerate(elements)}
+    sq0 = np.array([pos[e] for e in current])
+    sq0 = sq0[np.argsort(etype[sq0], kind="stable")]
+    if not np.array_equal(etype[sq0], _SLOT_ETYPE):
+        raise ValueError("current squad must be 2 GK, 5 DEF, 5 MID and 3 FWD")
+
+    # beam: squads, bank, free transfers, points so far, history per plan
+    squads, banks = sq0[None, :], np.array([bank])
+    frees, score = np.array([free]), np.zeros(1)
+    history = [[]]
+    for t in range(horizon):
+        rem = xp[:, t:].sum(1)
+        kids = [_expand(squads[i], banks[i], etype, team, price, rem, len(team_codes))
+                for i in range(len(squads))]
+        parent = np.concatenate([np.full(len(k[0]), i) for i, k in enumerate(kids)])
+        c_sq, c_n, c_bank, c_out, c_in = (np.concatenate([k[j] for k in kids]) for j in range(5))
+
+        # 2) this gameweek's points net of hits, plus the squad's value for the rest of the horizon
+        hits = np.maximum(c_n - frees[parent], 0)
+        gw = xi_points(xp[:, t:t + 1], c_sq)[:, 0] - HIT_COST * hits
+        ahead = xi_points(xp[:, t + 1:], c_sq).sum(1) if t + 1 < horizon else 0.0
+        c_score = score[parent] + gw
+        c_free = np.minimum(np.maximum(frees[parent] - c_n, 0) + 1, MAX_FREE)
+
+        # 3) keep the best `beam` distinct (squad, bank, free transfers) states
+        order = np.argsort(-(c_score + ahead), kind="stable")
+        key = np.c_[np.sort(c_sq[order], axis=1), c_bank[order], c_free[order]]
+        _, first = np.unique(key, axis=0, return_index=True)
+        keep = order[np.sort(first)][:beam]
+
+        history = [history[parent[k]] + [(c_out[k], c_in[k], int(hits[k]), float(gw[k]),
+                                          int(c_bank[k]), c_sq[k])] for k in keep]
+        squads, banks, frees, score = c_sq[keep], c_bank[keep], c_free[keep], c_score[keep]
+
+    # 4) best plan as a table
+    best = history[int(np.argmax(score))]
+    rows = []
+    for r, (outs, ins, hits, gw, bank_after, sq) in zip(rounds, best, strict=True):
+        v = xp[sq, rounds.index(r)]
+        rows.append({
+            "round": r,
+            "out": [int(elements[i]) for i in outs if i >= 0],
+            "in":  [int(elements[i]) for i in ins if i >= 0],
+            "hits": hits, "bank": bank_after, "xp": round(gw, 2),
+            "captain": int(elements[sq[np.argmax(v)]]),
+        })
+    out = pd.DataFrame(rows)
+    out.attrs.update(total=float(score.max()), seconds=time.perf_counter() - t0,
+                     hold=float(xi_points(xp, sq0[None, :]).sum()))
+    return out
+
+
+def xp_matrix(rounds, version: str = None, season: str = SEASON):
+    """(players, xp) for plan_transfers from the predictions table (see predict.py).
+
+    Players without a prediction in a round (blank gameweek) get 0 there.
+    """
+    from predict import read_predictions
+    from optimizer import load_predicted_candidates
+
+    rounds = list(rounds)
+    preds = read_predictions(rounds, version)
+    wide = preds.pivot_table(index="element", columns="round", values="xp", aggfunc="sum")
+    wide = wide.reindex(columns=rounds).fillna(0.0)
+    players = load_predicted_candidates(rounds[0], version, season).drop(columns="xp")
+    players = players[players["element"].isin(wide.index)].reset_index(drop=True)
+    return players, wide.loc[players["element"]].to_numpy()
+
+
+def random_horizon(n: int, horizon: int, seed: int = 0):
+    """Synthetic (players, xp) with per-gameweek fixture swings around each player's level."""
+    players = random_pool(n, seed)
+    rng = np.random.default_rng(seed + 1)
+    xp = players["xp"].to_numpy()[:, None] * rng.uniform(0.5, 1.5, (n, horizon))
+    return players.drop(columns="xp"), xp
+
+
+def benchmark(horizons=(3, 4, 6, 8), beams=(5, 10, 20, 40), n: int = 700, seed: int = 0):
+    """Planning time and plan value vs horizon length and beam width."""
+    rows = []
+    for h in horizons:
+        players, xp = random_horizon(n, h, seed)
+        # start from the best squad for the first gameweek, £0.5m in the bank
+        start = optimize_squad(players.assign(xp=xp[:, 0]), budget=BUDGET - 5)
+        for w in beams:
+            plan = plan_transfers(players, xp, start["element"].tolist(), bank=5, free=1, beam=w)
+            rows.append({"horizon": h, "beam": w, "seconds": plan.attrs["seconds"],
+                         "xp": plan.attrs["total"], "gain_vs_hold": plan.attrs["total"] - plan.attrs["hold"],
+                         "transfers": int(plan["in"].str.len().sum()), "hits": int(plan["hits"].sum())})
+    report = pd.DataFrame(rows)
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Plan transfers over the next gameweeks.")
+    ap.add_argument("--current", type=int, nargs="*", help="current squad element ids")
+    ap.add_argument("--bank", type=int, default=0, help="money in the bank, tenths of £m")
+    ap.add_argument("--ft", type=int, default=1, help="free transfers available")
+    ap.add_argument("--start", type=int, help="first gameweek to plan")
+    ap.add_argument("--horizon", type=int, default=HORIZON)
+    ap.add_argument("--beam", type=int, default=BEAM)
+    ap.add_argument("--version", default=None, help="model version in the predictions table")
+    ap.add_argument("--bench", action="store_true", help="runtime vs horizon and beam width")
+    a = ap.parse_args()
+
+    if a.bench:
+        benchmark()
+    else:
+        squad_size = sum(SQUAD_QUOTAS.values())
+        if not a.current or len(set(a.current)) != squad_size:
+            ap.error(f"--current needs the {squad_size} distinct element ids of the squad")
+        if a.start is None:
+            ap.error("--start is required")
+        if a.horizon < 1 or not 1 <= a.start <= GAMEWEEKS - a.horizon + 1:
+            ap.error(f"--start {a.start} with --horizon {a.horizon} runs past gameweek {GAMEWEEKS}")
+        rounds = range(a.start, a.start + a.horizon)
+        try:
+            players, xp = xp_matrix(rounds, a.version)
+        except (LookupError, sqlite3.OperationalError) as e:   # no predictions table yet
+            ap.error(str(e))
+        unpredicted = [r for r, col in zip(rounds, xp.T) if not col.any()]
+        if unpredicted:
+            ap.error(f"no predictions for gameweeks {unpredicted}; run predict.py first")
+        unknown = sorted(set(a.current) - set(players["element"]))
+        if unknown:
+            ap.error(f"--current ids without projections: {unknown}")
+        plan = plan_transfers(players, xp, a.current, a.bank, a.ft, rounds, a.beam)
+        names = dict(zip(players["element"], players["name"]))
+        for col in ("out", "in"):
+            plan[col] = plan[col].map(lambda ids: ", ".join(names.get(i, str(i)) for i in ids))
+        plan["captain"] = plan["captain"].map(names)
+        print(plan.to_string(index=False))
+        print(f"Plan {plan.attrs['total']:.2f} xp vs {plan.attrs['hold']:.2f} holding the squad "
+              f"| {plan.attrs['seconds']:.2f}s")
@@ -0,0 +1,331 @@
+# src/player_map.py
+#
+# Entity resolution from other sources' players (Understat, StatsBomb, ...) to
+# FPL `element` ids. Names are normalised (accents, punctuation, initials,
+# nicknames); a blocking index buckets FPL players by name token and character
+# n-gram within their team, so each source name is only scored against the few
+# players sharing a bucket. Results are cached per (season, source, source_id)
+# in the `player_id_map` table of fpl.db and reused on later runs.
+#     python src/player_map.py understat [--season 2025] [--refresh]
+#     python src/player_map.py statsbomb --competition-id 2 --season-id 27
+
+import re
+import time
+import json
+import argparse
+import unicodedata
+import pandas as pd
+from pathlib import Path
+from functools import lru_cache
+from collections import defaultdict
+
+from sqlite_bulk import connect
+
+DATA_DIR = Path("data/processed")
+RAW_DIR  = Path("data/raw")
+DB_PATH  = Path("data/fpl.db")
+SEASON   = "2025"
+
+NGRAM       = 3
+MIN_SCORE   = 0.6    # accept a match within the player's team
+MIN_GLOBAL  = 0.8    # accept a match found outside the team (transfers, unknown team)
+TEAM_WEIGHT = 0.1    # share of the score that is "same club"
+
+# letters NFKD does not split into base + accent
+_LETTERS = str.maketrans({"ø": "o", "ł": "l", "đ": "d", "ð": "d", "þ": "th", "ß": "ss",
+                          "æ": "ae", "œ": "oe", "ı": "i"})
+# particles that say little about who someone is
+STOPWORDS = {"de", "da", "do", "dos", "das", "del", "della", "di", "van", "von", "der", "den",
+             "la", "le", "el", "al", "bin", "jr", "junior", "sr"}
+NICKNAMES = {
+    "alex": "alexander", "andy": "andrew", "ben": "benjamin", "bobby": "robert",
+    "chris": "christopher", "dan": "daniel", "danny": "daniel", "dave": "david",
+    "ed": "edward", "eddie": "edward", "freddie": "frederick", "harry": "henry",
+    "jake": "jacob", "jamie": "james", "jim": "james", "joe": "joseph", "jon": "jonathan",
+    "jonny": "jonathan", "josh": "joshua", "kenny": "kenneth", "matt": "matthew",
+    "max": "maximilian", "mike": "michael", "mo": "mohamed", "mohammed": "mohamed",
+    "muhammad": "mohamed", "nat": "nathaniel", "nathan": "nathaniel", "nick": "nicholas",
+    "olly": "oliver", "ollie": "oliver", "pat": "patrick", "rob": "robert", "sam": "samuel",
+    "seb": "sebastian", "steve": "steven", "stephen": "steven", "tom": "thomas",
+    "tommy": "thomas", "will": "william", "zak": "zachary", "zach": "zachary",
+}
+# club names as other sources write them -> FPL's `teams.name`, after normalisation
+TEAM_ALIASES = {
+    "afc bournemouth": "bournemouth", "brighton hove albion": "brighton",
+    "brighton and hove albion": "brighton", "ipswich town": "ipswich",
+    "leeds united": "leeds", "leicester city": "leicester", "luton town": "luton",
+    "manchester city": "man city", "manchester united": "man utd",
+    "newcastle united": "newcastle", "nottingham forest": "nottm forest",
+    "sheffield united": "sheffield utd", "tottenham": "spurs", "tottenham hotspur": "spurs",
+    "west ham united": "west ham", "wolverhampton wanderers": "wolves",
+}
+
+PLAYER_MAP_SQL = """
+CREATE TABLE IF NOT EXISTS player_id_map (
+    season      TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    source_id   TEXT NOT NULL,
+    source_name TEXT,
+    element     INTEGER,     -- NULL: no FPL player matched (retried on the next run)
+    score       REAL,
+    created_at  REAL,
+    PRIMARY KEY (season, source, source_id)
+)"""
+
+
+def normalize_name(name) -> str:
+    """Lowercase ASCII words: accents and punctuation stripped, 'J.Doe' -> 'j doe'."""
+    if not isinstance(name, str):
+        return ""
+    s = unicodedata.normalize("NFKD", name.lower().translate(_LETTERS))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = re.sub(r"['’`]", "", s)
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", s).split())
+
+
+def name_tokens(name) -> tuple:
+    """Normalised tokens with nicknames expanded and particles dropped."""
+    toks = [NICKNAMES.get(t, t) for t in normalize_name(name).split()]
+    return tuple(t for t in toks if t not in STOPWORDS) or tuple(toks)
+
+
+def normalize_team(name) -> str:
+    s = re.sub(r"\b(a?fc|cf)\b", " ", normalize_name(name))
+    s = " ".join(s.split())
+    return TEAM_ALIASES.get(s, s)
+
+
+@lru_cache(maxsize=None)
+def _ngrams(s: str, n: int = NGRAM) -> frozenset:
+    s = f" {s} "
+    return frozenset(s[i:i + n] for i in range(len(s) - n + 1))
+
+
+def _dice(a: set, b: set) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+@lru_cache(maxsize=None)
+def _token_match(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    if len(a) == 1 or len(b) == 1:                    # initial
+        return 0.9 if a[0] == b[0] else 0.0
+    if a.startswith(b) or b.startswith(a):            # "alex" / "alexandre"
+        return 0.85 if min(len(a), len(b)) >= 3 else 0.0
+    d = _dice(_ngrams(a), _ngrams(b))
+    return d if d >= 0.6 else 0.0                     # spelling variants only
+
+
+@lru_cache(maxsize=None)
+def name_score(a: tuple, b: tuple) -> float:
+    """0..1 similarity of two token tuples: every token of the shorter name should
+    match a token of the longer one; unmatched extra tokens cost a little."""
+    if not a or not b:
+        return 0.0
+    short, long_ = (a, b) if len(a) <= len(b) else (b, a)
+    best = [max(_token_match(s, t) for t in long_) for s in short]
+    if sum(len(s) > 1 and m > 0 for s, m in zip(short, best)) == 0:
+        return 0.0                                    # initials alone never match
+    token = sum(best) / len(short)
+    chars = _dice(_ngrams(" ".join(a)), _ngrams(" ".join(b)))
+    return 0.75 * token + 0.1 * len(short) / len(long_) + 0.15 * chars
+
+
+class NameIndex:
+    """Blocking index over FPL players: bucket -> player rows.
+
+    Buckets are (team, token) and (team, character n-gram) for every name
+    variant (full name, first + last, web_name), plus (None, token) so a
+    player can still be found when the other source has them at another club.
+    """
+
+    def __init__(self, players: pd.DataFrame):
+        self.element = players["element"].to_numpy()
+        self.team = [normalize_team(t) if isinstance(t, str) else None for t in players["team_name"]]
+        self.variants = []
+        self.buckets = defaultdict(set)
+        for i, row in enumerate(players.itertuples(index=False)):
+            first, second, web = row.first_name, row.second_name, row.web_name
+            names = {name_tokens(f"{first} {second}"), name_tokens(web)}
+            if isinstance(second, str) and " " in second.strip():
+                names.add(name_tokens(f"{str(first).split()[0]} {second.split()[-1]}"))
+            names.discard(())
+            self.variants.append(list(names))
+            for toks in names:
+                for key in self._keys(toks, self.team[i]):
+                    self.buckets[key].add(i)
+
+    @staticmethod
+    def _keys(toks: tuple, team, ngrams: bool = True) -> set:
+        keys = set()
+        for t in toks:
+            if len(t) > 1:
+                keys.add((team, t))
+                keys.add((None, t))
+                if ngrams and team is not None and len(t) > NGRAM:
+                    keys.update((team, "~" + g) for g in _ngrams(t))
+        return keys
+
+    def candidates(self, toks: tuple, teams=()) -> set:
+        """Rows sharing a name token with the name, within `teams` or league-wide.
+        Within a team, character n-grams are the fallback when no token matches
+        (spelling variants), which keeps blocks to a handful of players."""
+        if not teams:
+            return set().union(*(self.buckets.get((None, t), ()) for t in toks))
+        for ngrams in (False, True):
+            found = set().union(*(self.buckets.get(k, ()) for team in teams
+                                  for k in self._keys(toks, team, ngrams) if k[0] == team))
+            if found:
+                return found
+        return found
+
+    def scores(self, name, teams=()) -> list:
+        """[(score, row)] for the name's block, best first.
+
+        Players of the given clubs need MIN_SCORE; anyone else found by name
+        token needs MIN_GLOBAL, so a transfer still resolves but a weak
+        surname-only match at another club does not.
+        """
+        toks = name_tokens(name)
+        teams = [normalize_team(t) for t in teams if isinstance(t, str) and t.strip()]
+        out = self._score(toks, self.candidates(toks, teams), teams) if teams else []
+        # nobody elsewhere can beat an in-team match this good
+        if not out or max(out)[0] < 1 - TEAM_WEIGHT:
+            out += self._score(toks, self.candidates(toks) - {i for _, i in out}, teams)
+        return sorted(out, reverse=True)
+
+    def _score(self, toks: tuple, rows, teams: list) -> list:
+        out = []
+        for i in rows:
+            in_team = self.team[i] in teams
+            s = (1 - TEAM_WEIGHT) * max(name_score(toks, v) for v in self.variants[i]) \
+                + TEAM_WEIGHT * in_team
+            if s >= (MIN_SCORE if in_team else MIN_GLOBAL):
+                out.append((s, i))
+        return out
+
+
+def fpl_players(season: str = SEASON, players: pd.DataFrame = None,
+                teams: pd.DataFrame = None) -> pd.DataFrame:
+    """element, first_name, second_name, web_name, team_name for a season's FPL players.
+
+    Team names come from teams.parquet (bootstrap-static); without it players
+    are still indexed, just not by club.
+    """
+    if players is None:
+        players = pd.read_parquet(DATA_DIR / f"players_{season}.parquet",
+                                  columns=["id", "team", "first_name", "second_name", "web_name"])
+    if teams is None and (DATA_DIR / "teams.parquet").exists():
+        teams = pd.read_parquet(DATA_DIR / "teams.parquet", columns=["id", "name"])
+    out = players.rename(columns={"id": "element"})
+    names = teams.set_index("id")["name"] if teams is not None else pd.Series(dtype=object)
+    out["team_name"] = out["team"].map(names)
+    return out[["element", "first_name", "second_name", "web_name", "team_name"]]
+
+
+def _match(records: pd.DataFrame, index: NameIndex) -> pd.DataFrame:
+    """One-to-one assignment: best-scoring (source, FPL) pairs first."""
+    pairs = []
+    for rec in records.itertuples(index=False):
+        teams = str(rec.team).split(",") if isinstance(rec.team, str) else ()
+        pairs += [(s, rec.source_id, i) for s, i in index.scores(rec.name, teams)]
+    taken_src, taken_row, found = set(), set(), {}
+    for s, sid, i in sorted(pairs, key=lambda p: -p[0]):
+        if sid not in taken_src and i not in taken_row:
+            taken_src.add(sid)
+            taken_row.add(i)
+            found[sid] = (int(index.element[i]), s)
+    return pd.DataFrame({
+        "source_id": records["source_id"],
+        "element": [found.get(sid, (None, None))[0] for sid in records["source_id"]],
+        "score": [found.get(sid, (None, None))[1] for sid in records["source_id"]],
+    }).astype({"element": "Int64", "score": "float64"})
+
+
+def resolve(records: pd.DataFrame, source: str, season: str = SEASON, players: pd.DataFrame = None,
+            db_path: Path = DB_PATH, refresh: bool = False) -> pd.DataFrame:
+    """FPL element for each source player.
+
+    records: source_id, name and team (club name; comma-separated if several).
+    Returns source_id, element (<NA> if unmatched) and score. Matches already
+    in player_id_map are reused; only new or unmatched source ids are scored.
+    Elements already claimed by a cached match are not handed out again.
+    """
+    records = records.assign(source_id=records["source_id"].astype(str)).drop_duplicates("source_id")
+    conn = connect(db_path)
+    try:
+        conn.execute(PLAYER_MAP_SQL)
+        cached = pd.read_sql("SELECT source_id, element, score FROM player_id_map "
+                             "WHERE season = ? AND source = ? AND element IS NOT NULL",
+                             conn, params=(season, source))
+        if refresh:
+            cached = cached.iloc[:0]
+        todo = records[~records["source_id"].isin(cached["source_id"])]
+        if len(todo):
+            players = players if players is not None else fpl_players(season)
+            players = players[~players["element"].isin(cached["element"])]
+            new = _match(todo, NameIndex(players.reset_index(drop=True)))
+            now = time.time()
+            conn.execute("BEGIN")
+            try:
+                if refresh:
+                    conn.execute("DELETE FROM player_id_map WHERE season = ? AND source = ?",
+                                 (season, source))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO player_id_map VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(season, source, sid, name, None if pd.isna(e) else int(e),
+                      None if pd.isna(s) else float(s), now)
+                     for sid, name, e, s in zip(new["source_id"], todo["name"], new["element"],
+                                                new["score"])])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            cached = pd.concat([cached, new.dropna(subset=["element"])], ignore_index=True)
+    finally:
+        conn.close()
+    out = records[["source_id"]].merge(cached, on="source_id", how="left")
+    return out.astype({"element": "Int64", "score": "float64"})
+
+
+def understat_records(season: str = SEASON, raw_dir: Path = RAW_DIR) -> pd.DataFrame:
+    """Understat league player list as resolve() records (plus the raw fields)."""
+    with open(Path(raw_dir) / f"understat-players-{season}.json", "r", encoding="utf8") as f:
+        us = pd.json_normalize(json.load(f))
+    return us.assign(source_id=us["id"].astype(str), name=us["player_name"], team=us["team_title"])
+
+
+def statsbomb_records(competition_id: int = None, season_id: int = None) -> pd.DataFrame:
+    """Players of the ingested StatsBomb matches (statsbomb_ingest.py) as resolve() records."""
+    from statsbomb_ingest import player_match
+
+    pm = player_match(competition_id, season_id, columns=["player_id", "player", "team"])
+    teams = pm.groupby("player_id")["team"].agg(lambda t: ",".join(dict.fromkeys(t.dropna())))
+    names = pm.drop_duplicates("player_id").set_index("player_id")["player"]
+    return pd.DataFrame({"source_id": names.index.astype(str), "name": names.to_numpy(),
+                         "team": teams.reindex(names.index).to_numpy()})
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Map another source's players to FPL elements")
+    ap.add_argument("source", choices=["understat", "statsbomb"])
+    ap.add_argument("--season", default=SEASON)
+    ap.add_argument("--competition-id", type=int, default=None, help="StatsBomb competition")
+    ap.add_argument("--season-id", type=int, default=None, help="StatsBomb season")
+    ap.add_argument("--refresh", action="store_true", help="ignore and replace cached matches")
+    a = ap.parse_args()
+
+    t0 = time.perf_counter()
+    records = understat_records(a.season) if a.source == "understat" \
+        else statsbomb_records(a.competition_id, a.season_id)
+    ids = resolve(records, a.source, a.season, refresh=a.refresh)
+    matched = ids["element"].notna()
+    print(f"✅ {a.source} {a.season}: {matched.sum()}/{len(ids)} players mapped to FPL elements "
+          f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    for name in records.loc[~records["source_id"].isin(ids.loc[matched, "source_id"]), "name"].head(20):
+        print(f"  unmatched: {name}")
+
+
+if __name__ == "__main__":
+    main()
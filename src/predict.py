@@ -0,0 +1,284 @@
+# src/predict.py
+#
+# Batch inference: the per-position models are fitted once and saved under
+# models/<version>/, then every player's next N gameweeks are predicted in one
+# call per position and written to the `predictions` table of fpl.db, keyed by
+# (element, round, model_version). The optimizer reads xp from there.
+#     python src/predict.py train --model lgbm [--params '{"n_estimators": 300}']
+#     python src/predict.py train --tuned              # per-position configs from tune.py
+#     python src/predict.py predict [--version V] [--horizon 6]
+
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from rolling import rolling_features, extend_rolling_features
+from team_ledger import TEAM_ROLLING_MEANS
+from table_schema import read_table
+from features_extended import (ROLLING_MEANS, ROLLING_CUMSUMS, _merge_context,
+                               _derive_features, _state_path)
+from fixture_index import build_index
+from backtest import MODELS, POSITIONS, load_position, config_key, position_configs
+from tune import best_config
+from sqlite_bulk import connect
+
+DATA_DIR  = Path("data/processed")
+DB_PATH   = Path("data/fpl.db")
+MODEL_DIR = Path("models")
+SEASON    = "2025"
+HORIZON   = 6
+POSITION_CODES = {"GK": 1, "DEF": 2, "MID": 3, "FWD": 4}
+
+PREDICTIONS_SQL = """
+CREATE TABLE IF NOT EXISTS predictions (
+    element       INTEGER NOT NULL,
+    round         INTEGER NOT NULL,
+    model_version TEXT    NOT NULL,
+    season        TEXT,
+    position      TEXT,
+    fixtures      INTEGER,
+    xp            REAL,
+    created_at    REAL,
+    PRIMARY KEY (element, round, model_version)
+)"""
+
+
+# --- models ------------------------------------------------------------------
+
+def train_models(config: dict, seasons=None, version: str = None,
+                 model_dir: Path = MODEL_DIR, threads: int = 1, data: dict = None) -> str:
+    """Fit one model per position on every feature row and save them as `version`.
+
+    config is one config for every position or {position: config} (e.g. the
+    tune.py results). The default version name is the model plus a hash of
+    the config(s) and the training rows, so retraining on the same data gives
+    the same version. `data` maps position -> PositionData already loaded
+    (see backtest.py).
+    """
+    data = data or {pos: load_position(pos, seasons) for pos in POSITIONS}
+    configs = position_configs(config)
+    if version is None:
+        h = hashlib.sha256(config_key(config).encode())
+        for pos in POSITIONS:
+            h.update(data[pos].hashes[-1].encode())
+        models = {c["model"] for c in configs.values()}
+        version = f"{models.pop() if len(models) == 1 else 'mixed'}-{h.hexdigest()[:10]}"
+
+    bundles = {}
+    for pos in POSITIONS:
+        d, cfg = data[pos], configs[pos]
+        model = MODELS[cfg["model"]](cfg.get("params", {}), threads)
+        model.fit(d.X, d.y)
+        bundles[pos] = {"model": model, "columns": d.columns, "config": cfg, "position": pos,
+                        "root": version, "trained_through": d.periods[-1], "full_through": d.periods[-1]}
+        print(f"Trained {version} {pos} on {len(d.y)} rows through {d.periods[-1]}")
+    save_models(version, bundles, model_dir)
+    return version
+
+
+def save_models(version: str, bundles: dict, model_dir: Path = MODEL_DIR):
+    """Pickle each position's bundle under models/<version>/ and make it the latest."""
+    out = Path(model_dir) / version
+    out.mkdir(parents=True, exist_ok=True)
+    for pos, bundle in bundles.items():
+        with open(out / f"{pos}.pkl", "wb") as f:
+            pickle.dump(bundle, f)
+    (Path(model_dir) / "LATEST").write_text(version)
+
+
+def load_models(version: str = None, model_dir: Path = MODEL_DIR):
+    """(version, {position: bundle}); the last trained version by default."""
+    version = version or (Path(model_dir) / "LATEST").read_text().strip()
+    bundles = {}
+    for pos in POSITIONS:
+        with open(Path(model_dir) / version / f"{pos}.pkl", "rb") as f:
+            bundles[pos] = pickle.load(f)
+    return version, bundles
+
+
+# --- feature rows for rounds not played yet ----------------------------------
+
+def _fixture_sides(fx: pd.DataFrame) -> pd.DataFrame:
+    """One row per (team, fixture): team_id, opp_team_id, round, was_home."""
+    home = pd.DataFrame({"team_id": fx["home_team_id"], "opp_team_id": fx["away_team_id"],
+                         "round": fx["round"], "was_home": True})
+    away = pd.DataFrame({"team_id": fx["away_team_id"], "opp_team_id": fx["home_team_id"],
+                         "round": fx["round"], "was_home": False})
+    return pd.concat([home, away], ignore_index=True)
+
+
+def _next_values(df, by, order, means, cumsums=None, state=None, next_round=None):
+    """Rolling features of one empty row per group placed after all its rows:
+    the windows as they stand going into the next round."""
+    keys = (state if state is not None else df)[by].unique()
+    blank = pd.DataFrame({by: keys, order: next_round})
+    sources = list(dict.fromkeys([c for c, _ in means.values()] + list((cumsums or {}).values())))
+    blank[sources] = np.nan
+    if state is not None:
+        roll = extend_rolling_features(blank, state, by, order, means, cumsums)
+    else:
+        both = pd.concat([df[[by, order] + sources], blank], ignore_index=True)
+        roll = rolling_features(both, by, order, means, cumsums).iloc[len(df):]
+        roll.index = blank.index
+    return roll.set_index(blank[by])
+
+
+def upcoming_features(season: str = SEASON, rounds=None, horizon: int = HORIZON,
+                      fixtures: pd.DataFrame = None) -> pd.DataFrame:
+    """Feature rows (FEATURE_COLS) for every player's fixtures in rounds not played yet.
+
+    Form is taken as it stands after the last built round (the rolling state of
+    features_extended and the team ledger) and held for the whole horizon;
+    opponent, venue and double gameweeks come from the fixture list
+    (fixtures_{season}.parquet unless `fixtures` is given). A round missing
+    from the fixture list gets no rows.
+    """
+    # 1) rounds to predict, and the schedule for them
+    state = pd.read_parquet(_state_path(season))
+    last = int(state["round"].max())
+    rounds = list(rounds) if rounds is not None else list(range(last + 1, last + 1 + horizon))
+    index = None
+    if fixtures is None:
+        fixtures = pd.read_parquet(DATA_DIR / f"fixtures_{season}.parquet",
+                                   columns=["round", "home_team_id", "away_team_id"])
+    else:
+        # look-ahead features from the given schedule, strength from the season's results
+        season_fx = pd.read_parquet(DATA_DIR / f"fixtures_{season}.parquet")
+        index = build_index(pd.concat([season_fx[~season_fx["round"].isin(fixtures["round"])],
+                                       fixtures], ignore_index=True))
+    sides = _fixture_sides(fixtures[fixtures["round"].isin(rounds)])
+    missing = sorted(set(rounds) - set(sides["round"]))
+    if missing:
+        print(f"No fixtures for rounds {missing}; they get no predictions")
+
+    # 2) team form going into the next fixture, from the played part of the ledger
+    with sqlite3.connect(DB_PATH) as conn:
+        ledger = pd.read_sql(f"SELECT * FROM team_ledger_{season} WHERE round <= ?",
+                             conn, params=(last,))
+    form = _next_values(ledger, "team_id", "round", TEAM_ROLLING_MEANS, next_round=last + 1)
+    team_ctx = sides.join(form, on="team_id")
+
+    # 3) one row per player per fixture of the player's team, through the usual context merge
+    players = read_table(DATA_DIR / f"players_{season}.parquet").rename(columns={"id": "element"})
+    hist = (players[["element", "team"]].rename(columns={"team": "team_id"})
+            .merge(sides, on="team_id").drop(columns="team_id")
+            .sort_values(["round", "element"], kind="stable").reset_index(drop=True))
+    hist["minutes"] = np.nan
+    hist["total_points"] = np.nan
+    df = _merge_context(hist, players, team_ctx.drop(columns="was_home"), season, index)
+
+    # 4) player windows going into the next round, the same for every upcoming fixture
+    roll = _next_values(None, "element", "round", ROLLING_MEANS, ROLLING_CUMSUMS,
+                        state=state, next_round=last + 1)
+    roll = roll.reindex(df["element"]).set_index(df.index)
+    return _derive_features(df, roll).drop(columns="gw_points")
+
+
+# --- batch prediction --------------------------------------------------------
+
+def predict_upcoming(version: str = None, season: str = SEASON, rounds=None,
+                     horizon: int = HORIZON, fixtures: pd.DataFrame = None,
+                     model_dir: Path = MODEL_DIR) -> pd.DataFrame:
+    """xp per (element, round) for the upcoming rounds: one predict call per position,
+    summed over a double gameweek's fixtures."""
+    t0 = time.perf_counter()
+    version, bundles = load_models(version, model_dir)
+    feats = upcoming_features(season, rounds, horizon, fixtures)
+    t1 = time.perf_counter()
+
+    etype = feats["element_type"].to_numpy()
+    xp = np.full(len(feats), np.nan)
+    for pos, bundle in bundles.items():
+        rows = np.flatnonzero(etype == POSITION_CODES[pos])
+        if len(rows):
+            X = feats[bundle["columns"]].to_numpy(dtype=np.float32)[rows]
+            xp[rows] = bundle["model"].predict(X)
+    t2 = time.perf_counter()
+
+    out = (feats[["element", "round", "element_type"]].assign(xp=xp, fixtures=1)
+           .dropna(subset=["xp"])
+           .groupby(["element", "round"], as_index=False)
+           .agg(element_type=("element_type", "first"), fixtures=("fixtures", "sum"), xp=("xp", "sum")))
+    out["position"] = out["element_type"].map({c: p for p, c in POSITION_CODES.items()})
+    out["model_version"] = version
+    out["season"] = season
+    out = out[["element", "round", "model_version", "season", "position", "fixtures", "xp"]]
+    out.attrs.update(build_s=t1 - t0, predict_s=t2 - t1)
+    return out
+
+
+def write_predictions(preds: pd.DataFrame, db_path: Path = DB_PATH) -> int:
+    """Upsert into `predictions`; rows for other versions or rounds are kept."""
+    conn = connect(db_path)
+    conn.execute("BEGIN")
+    try:
+        conn.execute(PREDICTIONS_SQL)
+        conn.execute('CREATE INDEX IF NOT EXISTS "ix_predictions_round" '
+                     'ON predictions (round, model_version)')
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((int(r.element), int(r.round), r.model_version, r.season, r.position,
+              int(r.fixtures), float(r.xp), now) for r in preds.itertuples(index=False)))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return len(preds)
+
+
+def read_predictions(rounds=None, version: str = None, db_path: Path = DB_PATH) -> pd.DataFrame:
+    """Stored predictions for `rounds` (all by default) from one model version;
+    the most recently written version unless given."""
+    with sqlite3.connect(db_path) as conn:
+        if version is None:
+            row = conn.execute("SELECT model_version FROM predictions "
+                               "ORDER BY created_at DESC LIMIT 1").fetchone()
+            if row is None:
+                raise LookupError(f"no predictions in {db_path}; run src/predict.py predict")
+            version = row[0]
+        sql, params = "SELECT * FROM predictions WHERE model_version = ?", [version]
+        if rounds is not None:
+            rounds = [int(r) for r in ([rounds] if np.isscalar(rounds) else rounds)]
+            sql += f" AND round IN ({','.join('?' * len(rounds))})"
+            params += rounds
+        return pd.read_sql(sql, conn, params=params)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Train the per-position models / predict upcoming gameweeks")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    tr = sub.add_parser("train")
+    tr.add_argument("--model", default="lgbm", choices=sorted(MODELS))
+    tr.add_argument("--params", default="{}", help="estimator params as JSON")
+    tr.add_argument("--tuned", action="store_true", help="each position's config from tune.py")
+    tr.add_argument("--version", default=None)
+    tr.add_argument("--threads", type=int, default=1)
+    pr = sub.add_parser("predict")
+    pr.add_argument("--version", default=None, help="model version (default: last trained)")
+    pr.add_argument("--horizon", type=int, default=HORIZON)
+    pr.add_argument("--rounds", type=int, nargs="*", default=None)
+    a = ap.parse_args()
+
+    if a.cmd == "train":
+        config = {pos: best_config(pos) for pos in POSITIONS} if a.tuned else \
+            {"model": a.model, "params": json.loads(a.params)}
+        train_models(config, version=a.version, threads=a.threads)
+    else:
+        preds = predict_upcoming(a.version, rounds=a.rounds, horizon=a.horizon)
+        n = write_predictions(preds)
+        print(f"✅ Wrote {n} predictions ({preds['element'].nunique()} players, rounds "
+              f"{sorted(preds['round'].unique().tolist())}) for {preds['model_version'].iat[0]} "
+              f"| features {preds.attrs['build_s']:.3f}s, predict {preds.attrs['predict_s']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
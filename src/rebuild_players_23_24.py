@@ -3,13 +3,16 @@
 import pandas as pd
 from pathlib import Path
 
+from table_schema import read_table
+from aggregate_history_to_players import HIST_COLS, add_history_sums
+
 # 1) Paths
 RAW_CSV    = Path("data/raw/cleaned_merged_seasons_team_aggregated.csv")
 PROC_DIR   = Path("data/processed")
 PLAY25_PQ  = PROC_DIR / "players_2025.parquet"
 
 # 2) Load the 2025 master schema so we know which columns to end up with
-players25 = pd.read_parquet(PLAY25_PQ)
+players25 = read_table(PLAY25_PQ)
 full_cols = players25.columns.tolist()
 
 # 3) Read the cleaned CSV
@@ -37,35 +40,21 @@ for season in ["2023","2024"]:
                 }
     players = players.rename(columns=rename_map)
 
-    # 5B) Aggregate history sums and merge in
-    hist = pd.read_parquet(PROC_DIR / f"history_{season}.parquet")
+    # 5B) Aggregate history sums and merge in (aggregate_history_to_players.py)
+    hist = read_table(PROC_DIR / f"history_{season}.parquet")
     # ensure starts exists
     if "starts" not in hist.columns:
         hist["starts"] = (hist["minutes"] > 45).astype(int)
-    # sum the per-GW fields
-    to_sum = [
-      "minutes","goals_scored","assists","goals_conceded","clean_sheets",
-      "own_goals","penalties_missed","penalties_saved","yellow_cards",
-      "red_cards","saves","bonus","bps","influence","creativity",
-      "threat","ict_index","transfers_in","transfers_out",
-      "total_points","starts"
-    ]
-    for c in to_sum:
-        if c not in hist.columns:
-            hist[c] = 0
-    agg = hist.groupby("element")[to_sum].sum().add_prefix("sum_").reset_index()
-
-    # merge sums onto minimal players
-    merged = players.merge(agg, on="element", how="left")
-    # fill any missing sums with zero
+    merged = add_history_sums(players, hist)
     sum_cols = [c for c in merged.columns if c.startswith("sum_")]
-    merged[sum_cols] = merged[sum_cols].fillna(0)
-    
+    # the plain season totals (minutes, goals_scored, … in players_2025) are the sums
+    for c in HIST_COLS:
+        merged[c] = merged[f"sum_{c}"]
 
     pos_map = {"GK":1,"GKP":1, "DEF":2, "MID":3, "FWD":4}
     merged["element_type"] = merged["position"].map(pos_map).fillna(0).astype(int)
     merged = merged.rename(columns={"element": "id"})
-    final_cols = full_cols + sum_cols
+    final_cols = full_cols + [c for c in sum_cols if c not in full_cols]
     merged = merged.reindex(columns=final_cols, fill_value=0)
     # 5C) Add any missing columns from 2025 schema
     #for col in full_cols:
@@ -75,4 +64,6 @@ for season in ["2023","2024"]:
     # 5E) Write out
     out_pq = PROC_DIR / f"players_{season}.parquet"
     merged.to_parquet(out_pq, index=False)
+    # already in the 2025 columns: a schema log left by the old rename/reorder scripts would be replayed
+    (PROC_DIR / f"players_{season}.schema.json").unlink(missing_ok=True)
     print(f"Wrote players_{season}.parquet (shape {merged.shape})")
\ No newline at end of file
@@ -0,0 +1,189 @@
+# src/rolling.py
+
+import numpy as np
+import pandas as pd
+from typing import NamedTuple
+
+
+class RollingLayout(NamedTuple):
+    order:    np.ndarray   # row positions of df, sorted by (by, order)
+    group_id: np.ndarray   # dense group number of each sorted row
+    pos:      np.ndarray   # 0-based position of each sorted row inside its group
+    n_groups: int
+    max_len:  int
+
+
+def build_layout(keys, rounds) -> RollingLayout:
+    """Sort once by (keys, rounds) and describe where every row sits in its group.
+
+    The sort is stable, so rows sharing a (key, round) pair (double gameweeks)
+    keep their original relative order, exactly like a pandas groupby.
+    """
+    keys   = np.asarray(keys)
+    rounds = np.asarray(rounds)
+    n = len(keys)
+    order = np.lexsort((rounds, keys))
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return RollingLayout(order, empty, empty, 0, 0)
+
+    k = keys[order]
+    new_group = np.empty(n, dtype=bool)
+    new_group[0]  = True
+    new_group[1:] = k[1:] != k[:-1]
+    starts   = np.flatnonzero(new_group)
+    group_id = np.cumsum(new_group) - 1
+    pos      = np.arange(n) - starts[group_id]
+    return RollingLayout(order, group_id, pos, len(starts), int(pos.max()) + 1)
+
+
+def _prefix_sums(layout: RollingLayout, values: np.ndarray):
+    """Per-group prefix sums of values / non-NaN counts on a dense (col, group, pos) grid.
+
+    values is (rows, cols) in sorted order. Slot p of a group holds the sum of its
+    first p values, so any window sum is the difference of two slots. Each group
+    starts from zero, which keeps the rounding error at the size of one player's
+    season rather than the whole table.
+    """
+    n_cols = values.shape[1]
+    valid  = ~np.isnan(values)
+    vals   = np.where(valid, values, 0.0)
+
+    sums   = np.zeros((n_cols, layout.n_groups, layout.max_len + 1))
+    counts = np.zeros((n_cols, layout.n_groups, layout.max_len + 1))
+    sums[:, layout.group_id, layout.pos + 1]   = vals.T
+    counts[:, layout.group_id, layout.pos + 1] = valid.T
+    np.cumsum(sums, axis=2, out=sums)
+    np.cumsum(counts, axis=2, out=counts)
+    return sums, counts, valid
+
+
+def rolling_features(df: pd.DataFrame, by: str, order: str,
+                     means: dict = None, cumsums: dict = None,
+                     layout: RollingLayout = None) -> pd.DataFrame:
+    """Shifted rolling means and cumulative sums for many columns in one pass.
+
+    means maps output name -> (source column, window) and reproduces
+        gb[col].transform(lambda s: s.shift(1).rolling(window, min_periods=1).mean())
+    cumsums maps output name -> source column and reproduces
+        gb[col].transform(lambda s: s.shift(1).cumsum())
+
+    Groups are `by`, ordered by `order`. The result is aligned to df.index.
+    """
+    means   = means or {}
+    cumsums = cumsums or {}
+    if layout is None:
+        layout = build_layout(df[by].to_numpy(), df[order].to_numpy())
+
+    # 1) every distinct source column goes through the prefix-sum grid once
+    sources = list(dict.fromkeys([c for c, _ in means.values()] + list(cumsums.values())))
+    col_ix  = {c: i for i, c in enumerate(sources)}
+    values  = df[sources].to_numpy(dtype=np.float64)[layout.order]
+    sums, counts, valid = _prefix_sums(layout, values)
+
+    gid, pos = layout.group_id, layout.pos
+    out = {}
+
+    # 2) rolling means over the previous `window` rows of the same group
+    for name, (col, window) in means.items():
+        i  = col_ix[col]
+        lo = np.maximum(pos - window, 0)
+        total = sums[i, gid, pos]   - sums[i, gid, lo]
+        n_obs = counts[i, gid, pos] - counts[i, gid, lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[name] = np.where(n_obs > 0, total / n_obs, np.nan)
+
+    # 3) cumulative sums of everything before this row (NaN where the lagged value is NaN)
+    for name, col in cumsums.items():
+        i = col_ix[col]
+        prev_valid = np.zeros(len(pos), dtype=bool)
+        prev_valid[1:] = valid[:-1, i]
+        prev_valid &= pos > 0
+        out[name] = np.where(prev_valid, sums[i, gid, pos], np.nan)
+
+    # 4) scatter back from sorted order to the caller's row order
+    result = np.empty((len(df), len(out)))
+    for j, arr in enumerate(out.values()):
+        result[layout.order, j] = arr
+    return pd.DataFrame(result, index=df.index, columns=list(out))
+
+
+def _tail_windows(means: dict, cumsums: dict) -> dict:
+    """How many trailing values of each source column a later extension needs."""
+    windows = {}
+    for col, window in means.values():
+        windows[col] = max(windows.get(col, 0), window)
+    for col in cumsums.values():
+        windows[col] = max(windows.get(col, 0), 1)
+    return windows
+
+
+def rolling_state(df: pd.DataFrame, by: str, order: str,
+                  means: dict = None, cumsums: dict = None,
+                  prev_state: pd.DataFrame = None) -> pd.DataFrame:
+    """Small per-group carry-over that lets rolling_features continue on later rows.
+
+    Long format, one row per (by, lag):
+      lag >= 1  the last values of every source column (lag 1 = most recent row),
+                kept only as deep as the widest window on that column needs;
+      lag == 0  running NaN-skipping totals of every source column.
+    If prev_state is given, df holds only the rows that came after it.
+    """
+    means   = means or {}
+    cumsums = cumsums or {}
+    windows = _tail_windows(means, cumsums)
+    sources = list(windows)
+
+    rows = df[[by, order]].copy()
+    rows[sources] = df[sources].to_numpy(dtype=np.float64)
+    totals = rows.groupby(by)[sources].sum()
+    if prev_state is not None:
+        old_tail = prev_state[prev_state["lag"] > 0]
+        rows = pd.concat([old_tail[[by, order] + sources], rows], ignore_index=True)
+        old_totals = prev_state[prev_state["lag"] == 0].set_index(by)[sources]
+        totals = old_totals.add(totals, fill_value=0)
+
+    # 1) keep the trailing max-window rows of each group
+    layout = build_layout(rows[by].to_numpy(), rows[order].to_numpy())
+    group_len = np.bincount(layout.group_id, minlength=layout.n_groups)
+    lag = group_len[layout.group_id] - layout.pos
+    keep = lag <= max(windows.values(), default=0)
+    tail = rows.iloc[layout.order[keep]].copy()
+    tail["lag"] = lag[keep]
+    # 2) blank out values deeper than any window on that column will ever look
+    for col, window in windows.items():
+        tail.loc[tail["lag"] > window, col] = np.nan
+
+    totals = totals.reset_index()
+    totals[order] = np.nan
+    totals["lag"] = 0
+    state = pd.concat([totals, tail], ignore_index=True)
+    return state[[by, order, "lag"] + sources]
+
+
+def extend_rolling_features(df: pd.DataFrame, state: pd.DataFrame, by: str, order: str,
+                            means: dict = None, cumsums: dict = None) -> pd.DataFrame:
+    """rolling_features for rows that follow a rolling_state, without the full history.
+
+    Values match what rolling_features would give these rows on the complete
+    table (running totals up to float rounding); only the state and the new
+    rows are touched.
+    """
+    means   = means or {}
+    cumsums = cumsums or {}
+    sources = list(_tail_windows(means, cumsums))
+
+    # 1) replay each group's tail just before its new rows
+    tail = state[state["lag"] > 0]
+    combined = pd.concat([tail[[by, order] + sources], df[[by, order] + sources]],
+                         ignore_index=True)
+    feats = rolling_features(combined, by, order, means, cumsums).iloc[len(tail):]
+    feats.index = df.index
+
+    # 2) the tail only reaches back so far; add everything before it to the running totals
+    if cumsums:
+        totals = state[state["lag"] == 0].set_index(by)[sources]
+        before_tail = totals.sub(tail.groupby(by)[sources].sum(), fill_value=0)
+        for name, col in cumsums.items():
+            feats[name] += df[by].map(before_tail[col]).fillna(0).to_numpy()
+    return feats
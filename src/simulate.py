@@ -0,0 +1,364 @@
+# src/simulate.py
+#
+# Monte Carlo gameweek points for many candidate line-ups at once. Team goals
+# are drawn per fixture from attack/defence rates fitted on team_stats_{season};
+# each player's minutes, goals, assists, clean sheet and bonus are drawn from
+# rates fitted on history_{season}, with goals and assists thinned from the
+# team's simulated goals so teammates move together. Line-ups are scored with
+# one matrix product per chunk of simulations.
+#     python src/simulate.py --bench [--sims 100000 --squads 50]
+
+import os
+import time
+import sqlite3
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+
+from table_schema import read_table
+
+DATA_DIR = Path("data/processed")
+DB_PATH  = Path("data/fpl.db")
+SEASON   = "2025"
+
+N_SIMS = 100_000
+CHUNK  = 10_000     # simulations held in memory at once
+SEED   = 0
+
+# FPL scoring by element_type
+GOAL_POINTS  = np.array([0, 10, 6, 5, 4])
+CS_POINTS    = np.array([0, 4, 4, 1, 0])
+CONCEDE_EVERY = np.array([0, 2, 2, 0, 0])   # -1 per this many goals conceded (0 = no penalty)
+ASSIST_POINTS = 3
+
+MAX_EVENTS = 3   # goals / assists one player can get in one fixture
+PRIOR = 2.0      # pseudo-observations pulling sparse players towards their position's rates
+
+
+class PlayerRates(NamedTuple):
+    element:  np.ndarray   # (P,)
+    team:     np.ndarray   # (P,) index into TeamRates
+    etype:    np.ndarray   # (P,)
+    p_mins:   np.ndarray   # (P, 3) P(no minutes, sub appearance < 60, 60+)
+    mins:     np.ndarray   # (P, 3) typical minutes in each case
+    goal:     np.ndarray   # (P,) share of the team's goals per 90 on the pitch
+    assist:   np.ndarray   # (P,)
+    p_bonus:  np.ndarray   # (P, 4) P(bonus = 0..3 | 60+ minutes)
+
+
+class TeamRates(NamedTuple):
+    team_id: np.ndarray    # (T,)
+    attack:  np.ndarray    # (T,) goals scored per fixture
+    defence: np.ndarray    # (T,) goals conceded per fixture
+    league:  float         # goals per team per fixture
+
+
+def _shrink(num, den, prior_rate, weight=PRIOR):
+    return (num + weight * prior_rate) / (den + weight)
+
+
+def fit_rates(season: str = SEASON):
+    """Player and team rates from history_{season}, players_{season} and team_stats_{season}."""
+    # 1) team attack/defence per fixture
+    with sqlite3.connect(DB_PATH) as conn:
+        ts = pd.read_sql(f"SELECT team_id, goals_scored, goals_conceded FROM team_stats_{season}", conn)
+    t = ts.groupby("team_id").agg(gf=("goals_scored", "mean"), ga=("goals_conceded", "mean"))
+    teams = TeamRates(t.index.to_numpy(), t["gf"].to_numpy(float), t["ga"].to_numpy(float),
+                      float(ts["goals_scored"].mean()))
+
+    # 2) player history joined to club and position
+    hist = read_table(DATA_DIR / f"history_{season}.parquet",
+                      columns=["element", "minutes", "goals_scored", "assists", "bonus",
+                               "was_home", "team_h_score", "team_a_score"])
+    players = read_table(DATA_DIR / f"players_{season}.parquet", columns=["id", "team", "element_type"])
+    players = players.rename(columns={"id": "element"})
+    players = players[players["team"].isin(teams.team_id)].reset_index(drop=True)
+    hist = hist[hist["element"].isin(players["element"])]
+
+    mins = hist["minutes"].to_numpy()
+    team_goals = np.where(hist["was_home"].astype(bool), hist["team_h_score"], hist["team_a_score"])
+    h = pd.DataFrame({
+        "element": hist["element"].to_numpy(),
+        "dnp": mins == 0, "sub": (mins > 0) & (mins < 60), "full": mins >= 60,
+        "sub_mins": np.where((mins > 0) & (mins < 60), mins, 0),
+        "full_mins": np.where(mins >= 60, mins, 0),
+        "goals": hist["goals_scored"].to_numpy(), "assists": hist["assists"].to_numpy(),
+        "exposure": team_goals * mins / 90.0,
+        **{f"b{k}": (mins >= 60) & (hist["bonus"].to_numpy() == k) for k in range(4)},
+    })
+    g = h.groupby("element").sum().reindex(players["element"]).fillna(0)
+    etype = players["element_type"].to_numpy()
+
+    # 3) per-position priors, then shrunk per-player rates
+    def by_pos(num, den):
+        out = np.zeros(5)
+        for e in range(1, 5):
+            m = etype == e
+            out[e] = g[num].to_numpy()[m].sum() / max(g[den].to_numpy()[m].sum(), 1e-9)
+        return out[etype]
+
+    counts = g[["dnp", "sub", "full"]].to_numpy(float)
+    p_mins = (counts + 0.5) / (counts.sum(1, keepdims=True) + 1.5)
+    sub_m = _shrink(g["sub_mins"].to_numpy(), g["sub"].to_numpy(), 25.0)
+    full_m = _shrink(g["full_mins"].to_numpy(), g["full"].to_numpy(), 88.0)
+    bonus = g[[f"b{k}" for k in range(4)]].to_numpy(float) + 0.25
+    rates = PlayerRates(
+        element=players["element"].to_numpy(),
+        team=np.searchsorted(teams.team_id, players["team"].to_numpy()),
+        etype=etype,
+        p_mins=p_mins,
+        mins=np.c_[np.zeros(len(players)), sub_m, full_m],
+        goal=_shrink(g["goals"].to_numpy(), g["exposure"].to_numpy(), by_pos("goals", "exposure")),
+        assist=_shrink(g["assists"].to_numpy(), g["exposure"].to_numpy(), by_pos("assists", "exposure")),
+        p_bonus=bonus / bonus.sum(1, keepdims=True),
+    )
+    return rates, teams
+
+
+class Schedule(NamedTuple):
+    home: np.ndarray   # (F,) TeamRates index of each fixture's home side
+    away: np.ndarray   # (F,)
+    side: np.ndarray   # (fixture slot, T) column of the team's goals in the (sims, 2F) draw,
+                       # -1 = no such fixture, -2 = one fixture vs a league-average side
+
+
+def _schedule(teams: TeamRates, fixtures: pd.DataFrame = None) -> Schedule:
+    """Which fixture, and which side of it, each team plays in each of its slots.
+
+    Without a fixture list every team plays one fixture against a league-average side.
+    """
+    T = len(teams.team_id)
+    if fixtures is None:
+        return Schedule(np.zeros(0, int), np.zeros(0, int), np.full((1, T), -2))
+    idx = {t: i for i, t in enumerate(teams.team_id)}
+    home = np.array([idx[t] for t in fixtures["home_team_id"]], dtype=int)
+    away = np.array([idx[t] for t in fixtures["away_team_id"]], dtype=int)
+    F = len(home)
+    # home goals of fixture f are column f of the draw, away goals column F + f
+    games = [[] for _ in range(T)]
+    for f, (h, a) in enumerate(zip(home, away)):
+        games[h].append(f)
+        games[a].append(F + f)
+    slots = max((len(g) for g in games), default=0)
+    side = np.full((max(slots, 1), T), -1)
+    for i, g in enumerate(games):
+        side[:len(g), i] = g
+    return Schedule(home, away, side)
+
+
+def team_goals(teams: TeamRates, sched: Schedule, n_sims: int, rng) -> list:
+    """[(goals for, goals against)] per fixture slot, each (n_sims, T) int8.
+
+    Both scores of a fixture are drawn once, so a team's goals against are
+    its opponent's goals for in that same match, in any slot of a double
+    gameweek. Teams without a fixture in the slot get 0-0.
+    """
+    F = len(sched.home)
+    h, a = sched.home, sched.away
+    lam = np.r_[teams.attack[h] * teams.defence[a], teams.attack[a] * teams.defence[h]] / teams.league
+    goals = rng.poisson(lam, size=(n_sims, 2 * F)).astype(np.int8)
+    out = []
+    for side in sched.side:
+        real, vs_avg = side >= 0, side == -2
+        if F:
+            col = np.where(real, side, 0)
+            gf = np.where(real, goals[:, col], 0).astype(np.int8)
+            ga = np.where(real, goals[:, (col + F) % (2 * F)], 0).astype(np.int8)
+        else:
+            gf = ga = np.zeros((n_sims, len(side)), dtype=np.int8)
+        if vs_avg.any():
+            gf = np.where(vs_avg, rng.poisson(np.where(vs_avg, teams.attack, 0.0), size=gf.shape), gf)
+            ga = np.where(vs_avg, rng.poisson(np.where(vs_avg, teams.defence, 0.0), size=ga.shape), ga)
+            gf, ga = gf.astype(np.int8), ga.astype(np.int8)
+        out.append((gf, ga))
+    return out
+
+
+def _small_binomial(u, n, p, cap: int = MAX_EVENTS):
+    """Binomial(n, p) by inverse CDF from one uniform per draw, counts capped at `cap`.
+
+    Team goal counts are tiny, so walking the first few CDF terms is exact below
+    the cap and far cheaper than Generator.binomial on arrays of n and p.
+    """
+    q = 1.0 - p
+    pk = q ** n
+    cdf = pk.copy()
+    out = (u > cdf).astype(np.int8)
+    for k in range(1, cap):
+        pk = pk * ((n - k + 1) / k) * (p / q)    # P(k) from P(k-1); 0 once k > n
+        cdf += pk
+        out += u > cdf
+    return out
+
+
+def simulate_points(rates: PlayerRates, teams: TeamRates, n_sims: int, rng,
+                    sched: Schedule) -> np.ndarray:
+    """(n_sims, P) float32 FPL points for one gameweek, every fixture of a double gameweek summed."""
+    P = len(rates.element)
+    f32 = np.float32
+    pts = np.zeros((n_sims, P), dtype=f32)
+    c_none, c_sub = (np.cumsum(rates.p_mins, axis=1)[:, :2].T).astype(f32)
+    c_bonus = np.cumsum(rates.p_bonus, axis=1)[:, :3].T.astype(f32)
+    p_goal = (rates.goal / 90.0).astype(f32)
+    p_assist = (rates.assist / 90.0).astype(f32)
+    et = rates.etype
+    goal_pts, cs_pts = GOAL_POINTS[et].astype(f32), CS_POINTS[et].astype(f32)
+    every = CONCEDE_EVERY[et]
+    concede = every > 0
+
+    # 1) team goals for and against, drawn once per fixture and shared by both sides
+    for side, (gf, ga) in zip(sched.side, team_goals(teams, sched, n_sims, rng)):
+        plays = side != -1
+        gf_p, ga_p = gf[:, rates.team].astype(f32), ga[:, rates.team]
+
+        # 2) minutes outcome per player: none / sub / 60+
+        u = rng.random((n_sims, P), dtype=f32)
+        sub = (u > c_none) & (u <= c_sub) & plays[rates.team]
+        full = (u > c_sub) & plays[rates.team]
+        on = np.where(full, rates.mins[:, 2].astype(f32), np.where(sub, rates.mins[:, 1].astype(f32), f32(0)))
+
+        # 3) goals and assists thinned from the team's goals, by share while on the pitch
+        goals = _small_binomial(rng.random((n_sims, P), dtype=f32), gf_p,
+                                np.minimum(p_goal * on, f32(0.999)))
+        assists = _small_binomial(rng.random((n_sims, P), dtype=f32), gf_p - goals,
+                                  np.minimum(p_assist * on, f32(0.999)))
+        ub = rng.random((n_sims, P), dtype=f32)
+        bonus = ((ub > c_bonus[0]).astype(np.int8) + (ub > c_bonus[1]) + (ub > c_bonus[2])) * full
+
+        # 4) FPL scoring
+        pts += sub + f32(2) * full
+        pts += goal_pts * goals + f32(ASSIST_POINTS) * assists + bonus
+        pts += cs_pts * (full & (ga_p == 0))
+        pts -= (ga_p // np.maximum(every, 1)) * (full & concede)
+    return pts
+
+
+def lineup_weights(elements: np.ndarray, xi, captain, bench=None, bench_boost=None,
+                   triple=None) -> np.ndarray:
+    """(P, n) weights: 1 per starter, +1 (or +2 with triple captain) for the captain,
+    1 per bench player under bench boost."""
+    pos = {e: i for i, e in enumerate(elements)}
+    xi = np.asarray(xi)
+    n = len(xi)
+    W = np.zeros((len(elements), n), dtype=np.float32)
+    for j in range(n):
+        W[[pos[e] for e in xi[j]], j] = 1
+        W[pos[captain[j]], j] += 2 if triple is not None and triple[j] else 1
+        if bench is not None and bench_boost is not None and bench_boost[j]:
+            W[[pos[e] for e in bench[j]], j] += 1
+    return W
+
+
+def evaluate(rates: PlayerRates, teams: TeamRates, xi, captain, bench=None, bench_boost=None,
+             triple=None, fixtures: pd.DataFrame = None, n_sims: int = N_SIMS, seed: int = SEED,
+             chunk: int = CHUNK, workers: int = None, return_samples=False):
+    """Points distribution of n candidate line-ups over the same simulated gameweeks.
+
+    xi is (n, 11) element ids and captain (n,); bench/bench_boost/triple are
+    optional per-candidate chips. Only the players appearing in some line-up
+    are simulated. Every chunk of simulations has its own child seed of `seed`,
+    so the draws are the same whatever the number of worker threads, and all
+    candidates are compared on the same outcomes. Returns a summary per
+    candidate (and the (n_sims, n) totals with return_samples).
+    """
+    used = set(np.asarray(xi).ravel()) | set(captain)
+    if bench is not None:
+        used |= set(np.asarray(bench).ravel())
+    keep = np.flatnonzero(np.isin(rates.element, list(used)))
+    sub = PlayerRates(*(a[keep] for a in rates))
+    W = lineup_weights(sub.element, xi, captain, bench, bench_boost, triple)
+    sched = _schedule(teams, fixtures)
+
+    totals = np.empty((n_sims, W.shape[1]), dtype=np.float32)
+    starts = range(0, n_sims, chunk)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+
+    def run(i, lo):
+        hi = min(lo + chunk, n_sims)
+        rng = np.random.default_rng(seeds[i])
+        totals[lo:hi] = simulate_points(sub, teams, hi - lo, rng, sched) @ W
+
+    # numpy releases the GIL in the array work, so chunks run side by side on threads
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        list(pool.map(run, range(len(starts)), starts))
+
+    q = np.percentile(totals, [10, 50, 90], axis=0)
+    best = totals.argmax(1)
+    summary = pd.DataFrame({
+        "candidate": np.arange(W.shape[1]),
+        "mean": totals.mean(0), "std": totals.std(0),
+        "p10": q[0], "p50": q[1], "p90": q[2],
+        "p_best": np.bincount(best, minlength=W.shape[1]) / n_sims,
+    })
+    return (summary, totals) if return_samples else summary
+
+
+def random_rates(n_players: int = 700, seed: int = 0):
+    """Synthetic PlayerRates/TeamRates with realistic magnitudes, for benchmarks."""
+    rng = np.random.default_rng(seed)
+    T = 20
+    teams = TeamRates(np.arange(1, T + 1), rng.uniform(0.9, 2.2, T), rng.uniform(0.8, 2.0, T), 1.4)
+    etype = rng.choice([1, 2, 3, 4], size=n_players, p=[0.1, 0.33, 0.4, 0.17])
+    p_full = rng.uniform(0.1, 0.95, n_players)
+    p_sub = (1 - p_full) * rng.uniform(0.2, 0.6, n_players)
+    share = np.array([0, 0.005, 0.04, 0.12, 0.25])[etype] * rng.uniform(0.3, 2.0, n_players)
+    bonus = rng.dirichlet([8, 1, 1, 1], n_players)
+    rates = PlayerRates(
+        element=np.arange(1, n_players + 1), team=rng.integers(0, T, n_players), etype=etype,
+        p_mins=np.c_[1 - p_full - p_sub, p_sub, p_full],
+        mins=np.c_[np.zeros(n_players), np.full(n_players, 25.0), np.full(n_players, 88.0)],
+        goal=share, assist=share * 0.8, p_bonus=bonus,
+    )
+    return rates, teams
+
+
+def random_lineups(rates: PlayerRates, n: int, seed: int = 0):
+    """n random legal-shaped XIs (1 GK, 4 DEF, 4 MID, 2 FWD) with a random captain."""
+    rng = np.random.default_rng(seed)
+    by = {e: rates.element[rates.etype == e] for e in (1, 2, 3, 4)}
+    xi = np.array([np.concatenate([rng.choice(by[1], 1, replace=False), rng.choice(by[2], 4, replace=False),
+                                   rng.choice(by[3], 4, replace=False), rng.choice(by[4], 2, replace=False)])
+                   for _ in range(n)])
+    return xi, xi[np.arange(n), rng.integers(0, 11, n)]
+
+
+def benchmark(n_sims: int = N_SIMS, n_squads: int = 50, seed: int = SEED):
+    rates, teams = random_rates(seed=seed)
+    xi, captain = random_lineups(rates, n_squads, seed)
+    t0 = time.perf_counter()
+    summary = evaluate(rates, teams, xi, captain, n_sims=n_sims, seed=seed)
+    dt = time.perf_counter() - t0
+    print(summary.sort_values("mean", ascending=False).head(10).to_string(index=False,
+                                                                         float_format=lambda v: f"{v:.2f}"))
+    print(f"{n_sims:,} simulated gameweeks x {n_squads} line-ups in {dt:.2f}s")
+    return dt
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Monte Carlo points distributions for candidate line-ups")
+    ap.add_argument("--bench", action="store_true", help="time synthetic sims x line-ups")
+    ap.add_argument("--sims", type=int, default=N_SIMS)
+    ap.add_argument("--squads", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--xi", type=int, nargs="*", help="starting XI element ids")
+    ap.add_argument("--captains", type=int, nargs="*", help="captain options to compare (default: all XI)")
+    ap.add_argument("--round", type=int, help="gameweek whose fixtures to simulate")
+    a = ap.parse_args()
+    if a.bench:
+        benchmark(a.sims, a.squads, a.seed)
+    else:
+        rates, teams = fit_rates()
+        fixtures = None
+        if a.round is not None:
+            fixtures = pd.read_parquet(DATA_DIR / f"fixtures_{SEASON}.parquet",
+                                       columns=["round", "home_team_id", "away_team_id"])
+            fixtures = fixtures[fixtures["round"] == a.round]
+        captains = a.captains or a.xi
+        summary = evaluate(rates, teams, [a.xi] * len(captains), captains, fixtures=fixtures,
+                           n_sims=a.sims, seed=a.seed)
+        summary.insert(1, "captain", captains)
+        print(summary.drop(columns="candidate").sort_values("mean", ascending=False)
+              .to_string(index=False, float_format=lambda v: f"{v:.2f}"))
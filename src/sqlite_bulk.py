@@ -0,0 +1,107 @@
+# src/sqlite_bulk.py
+
+import sqlite3
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from dtypes import apply_policy
+
+# Lookup indexes created whenever a table has all of the columns
+INDEXES = [
+    ("element", "round"),
+    ("team_id", "round"),
+    ("element_type", "round"),
+]
+BULK_BATCH_ROWS = 50_000
+
+
+def connect(db_path):
+    """sqlite3 connection with WAL and bulk-friendly PRAGMAs; transactions are explicit."""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-65536;")   # 64 MB
+    return conn
+
+
+def _sql_type(t: pa.DataType) -> str:
+    if pa.types.is_dictionary(t):
+        t = t.value_type
+    if pa.types.is_boolean(t) or pa.types.is_integer(t):
+        return "INTEGER"
+    if pa.types.is_floating(t) or pa.types.is_decimal(t):
+        return "REAL"
+    if pa.types.is_binary(t) or pa.types.is_large_binary(t):
+        return "BLOB"
+    return "TEXT"
+
+
+def _flat_schema(schema: pa.Schema):
+    """Schema fields SQLite can hold; lists/structs/maps are dropped from the schema, not by scanning cells."""
+    keep, dropped = [], []
+    for field in schema:
+        (dropped if pa.types.is_nested(field.type) else keep).append(field)
+    return keep, dropped
+
+
+def _sqlite_column(col):
+    """Arrow column -> values sqlite3 binds natively."""
+    t = col.type
+    if pa.types.is_dictionary(t):
+        col = col.cast(t.value_type)
+        t = t.value_type
+    if pa.types.is_temporal(t):
+        col = pc.cast(col, pa.string())
+    elif pa.types.is_decimal(t):
+        col = col.cast(pa.float64())
+    return col.to_pylist()
+
+
+def bulk_load(conn, table: str, source, if_exists="replace", indexes=INDEXES, delete_where=None):
+    """Load an Arrow table / parquet path / DataFrame into `table` in one transaction.
+
+    Columns get declared types from the Arrow schema, rows go in with
+    executemany in BULK_BATCH_ROWS chunks, and the INDEXES lookups the table has
+    columns for are built after the insert. delete_where = (condition, params)
+    deletes the rows an append replaces, in the same transaction.
+    Returns the number of rows written.
+    """
+    if isinstance(source, pa.Table):
+        tbl = source
+    elif hasattr(source, "to_parquet"):
+        tbl = pa.Table.from_pandas(source, preserve_index=False)
+    else:
+        tbl = pq.read_table(source)
+
+    # same column types as the parquet copies: flags/ids declared INTEGER, labels TEXT
+    tbl = apply_policy(tbl)
+    fields, dropped = _flat_schema(tbl.schema)
+    if dropped:
+        print(f"{table}: dropping nested columns {[f.name for f in dropped]}")
+    tbl = tbl.select([f.name for f in fields])
+
+    cols_sql = ", ".join(f'"{f.name}" {_sql_type(f.type)}' for f in fields)
+    col_names = ", ".join(f'"{f.name}"' for f in fields)
+    insert = f'INSERT INTO "{table}" ({col_names}) VALUES ({", ".join("?" * len(fields))})'
+
+    conn.execute("BEGIN")
+    try:
+        if if_exists == "replace":
+            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({cols_sql})')
+        if delete_where:
+            conn.execute(f'DELETE FROM "{table}" WHERE {delete_where[0]}', delete_where[1])
+        for batch in tbl.to_batches(max_chunksize=BULK_BATCH_ROWS):
+            conn.executemany(insert, zip(*(_sqlite_column(c) for c in batch.columns)))
+        names = {f.name for f in fields}
+        for cols in indexes:
+            if set(cols) <= names:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_{table}_{"_".join(cols)}" '
+                             f'ON "{table}" ({", ".join(cols)})')
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return tbl.num_rows
@@ -0,0 +1,297 @@
+# src/statsbomb_ingest.py
+#
+# StatsBomb events, one match at a time, into the lake:
+#     data/lake/statsbomb_events/competition=2/season=27/match=3754058/part-0.parquet
+#     data/lake/statsbomb_player_match/competition=2/season=27/match=3754058/part-0.parquet
+# Each match's events are flattened to a fixed schema and written as soon as
+# they are read, and per-player shot xG, key passes and touches in the box are
+# counted from the same pass, so peak memory is one match's events. Reads a
+# local copy of StatsBomb open data (data/ with competitions.json, matches/,
+# events/), or statsbombpy match by match when no directory is given.
+# Matches already in the lake are skipped.
+#     python src/statsbomb_ingest.py --root ~/open-data/data --competition "Premier League" --season 2015/2016
+#     python src/statsbomb_ingest.py --competition-id 2 --season-id 27      # statsbombpy
+
+import os
+import json
+import time
+import argparse
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pathlib import Path
+from collections import defaultdict
+
+from dtypes import PARQUET_OPTIONS
+
+LAKE_DIR    = Path("data/lake")
+EVENTS      = "statsbomb_events"
+PLAYER_AGG  = "statsbomb_player_match"
+
+# StatsBomb pitch is 120 x 80; the attacking penalty box is x >= 102, 18 <= y <= 62
+BOX_X, BOX_Y = 102.0, (18.0, 62.0)
+# on-ball actions that count as a touch
+TOUCH_TYPES = {"Pass", "Ball Receipt*", "Carry", "Dribble", "Shot", "Ball Recovery",
+               "Miscontrol", "Dispossessed", "Clearance", "Interception", "Goal Keeper",
+               "Duel", "Foul Won", "50/50", "Shield"}
+
+EVENT_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("index", pa.int32()),
+    ("period", pa.int8()),
+    ("minute", pa.int16()),
+    ("second", pa.int8()),
+    ("type", pa.dictionary(pa.int8(), pa.string())),
+    ("possession", pa.int16()),
+    ("possession_team_id", pa.int32()),
+    ("play_pattern", pa.dictionary(pa.int8(), pa.string())),
+    ("team_id", pa.int32()),
+    ("player_id", pa.int32()),
+    ("player", pa.string()),
+    ("position", pa.dictionary(pa.int8(), pa.string())),
+    ("x", pa.float32()),
+    ("y", pa.float32()),
+    ("end_x", pa.float32()),
+    ("end_y", pa.float32()),
+    ("duration", pa.float32()),
+    ("under_pressure", pa.bool_()),
+    ("outcome", pa.dictionary(pa.int8(), pa.string())),
+    ("shot_xg", pa.float32()),
+    ("shot_type", pa.dictionary(pa.int8(), pa.string())),
+    ("key_pass", pa.bool_()),
+    ("goal_assist", pa.bool_()),
+])
+PLAYER_SCHEMA = pa.schema([
+    ("match_id", pa.int32()),
+    ("match_date", pa.string()),
+    ("match_week", pa.int8()),
+    ("team_id", pa.int32()),
+    ("team", pa.string()),
+    ("player_id", pa.int32()),
+    ("player", pa.string()),
+    ("touches", pa.int16()),
+    ("touches_in_box", pa.int16()),
+    ("shots", pa.int8()),
+    ("goals", pa.int8()),
+    ("xg", pa.float32()),
+    ("key_passes", pa.int8()),
+    ("assists", pa.int8()),
+])
+# hive keys above each match's files
+PARTITIONING = ds.partitioning(pa.schema([("competition", pa.int32()), ("season", pa.int32()),
+                                          ("match", pa.int32())]), flavor="hive")
+
+
+# --- sources: competitions, a season's matches, one match's events -------------
+
+class LocalSource:
+    """A StatsBomb open-data checkout (the `data/` directory)."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def competitions(self) -> list:
+        with open(self.root / "competitions.json", encoding="utf8") as f:
+            return json.load(f)
+
+    def matches(self, competition_id: int, season_id: int) -> list:
+        with open(self.root / "matches" / str(competition_id) / f"{season_id}.json", encoding="utf8") as f:
+            return json.load(f)
+
+    def events(self, match_id: int) -> list:
+        with open(self.root / "events" / f"{match_id}.json", encoding="utf8") as f:
+            return json.load(f)
+
+
+class ApiSource:
+    """statsbombpy, asked for one match's events at a time."""
+
+    def __init__(self):
+        from statsbombpy import sb
+        self.sb = sb
+
+    def competitions(self) -> list:
+        return list(self.sb.competitions(fmt="dict").values())
+
+    def matches(self, competition_id: int, season_id: int) -> list:
+        return list(self.sb.matches(competition_id=competition_id, season_id=season_id,
+                                    fmt="dict").values())
+
+    def events(self, match_id: int) -> list:
+        return list(self.sb.events(match_id=match_id, fmt="dict").values())
+
+
+def find_season(source, competition: str, season: str) -> tuple:
+    """(competition_id, season_id) for names like ("Premier League", "2015/2016")."""
+    for c in source.competitions():
+        if c["competition_name"] == competition and c["season_name"] == season:
+            return c["competition_id"], c["season_id"]
+    raise LookupError(f"no StatsBomb data for {competition} {season}")
+
+
+# --- one match ---------------------------------------------------------------
+
+def _name(d):
+    return d.get("name") if isinstance(d, dict) else None
+
+
+def _flatten(ev: dict) -> dict:
+    """One raw event as an EVENT_SCHEMA row."""
+    loc = ev.get("location") or (None, None)
+    shot, pas = ev.get("shot") or {}, ev.get("pass") or {}
+    detail = shot or pas or ev.get("carry") or {}
+    end = detail.get("end_location") or (None, None)
+    outcome = detail.get("outcome") or (ev.get("dribble") or {}).get("outcome") \
+        or (ev.get("duel") or {}).get("outcome")
+    return {
+        "id": ev.get("id"),
+        "index": ev.get("index"),
+        "period": ev.get("period"),
+        "minute": ev.get("minute"),
+        "second": ev.get("second"),
+        "type": _name(ev.get("type")),
+        "possession": ev.get("possession"),
+        "possession_team_id": (ev.get("possession_team") or {}).get("id"),
+        "play_pattern": _name(ev.get("play_pattern")),
+        "team_id": (ev.get("team") or {}).get("id"),
+        "player_id": (ev.get("player") or {}).get("id"),
+        "player": _name(ev.get("player")),
+        "position": _name(ev.get("position")),
+        "x": loc[0], "y": loc[1],
+        "end_x": end[0], "end_y": end[1],
+        "duration": ev.get("duration"),
+        "under_pressure": ev.get("under_pressure", False),
+        "outcome": _name(outcome),
+        "shot_xg": shot.get("statsbomb_xg"),
+        "shot_type": _name(shot.get("type")),
+        "key_pass": bool(pas.get("shot_assist") or pas.get("goal_assist")),
+        "goal_assist": bool(pas.get("goal_assist")),
+    }
+
+
+def _count(agg: dict, row: dict):
+    """Add one flattened event to its player's running totals."""
+    if row["player_id"] is None:
+        return
+    p = agg[row["player_id"]]
+    p["player"], p["team_id"] = row["player"], row["team_id"]
+    if row["type"] in TOUCH_TYPES:
+        p["touches"] += 1
+        if row["x"] is not None and row["x"] >= BOX_X and BOX_Y[0] <= row["y"] <= BOX_Y[1]:
+            p["touches_in_box"] += 1
+    if row["type"] == "Shot":
+        p["shots"] += 1
+        p["goals"] += row["outcome"] == "Goal"
+        p["xg"] += row["shot_xg"] or 0.0
+    p["key_passes"] += row["key_pass"]
+    p["assists"] += row["goal_assist"]
+
+
+def _new_player():
+    return {"player": None, "team_id": None, "touches": 0, "touches_in_box": 0,
+            "shots": 0, "goals": 0, "xg": 0.0, "key_passes": 0, "assists": 0}
+
+
+def match_tables(match: dict, events: list) -> tuple:
+    """(events table, player totals table) for one match, built in one pass."""
+    cols = {f.name: [] for f in EVENT_SCHEMA}
+    agg = defaultdict(_new_player)
+    for ev in events:
+        row = _flatten(ev)
+        for k, v in row.items():
+            cols[k].append(v)
+        _count(agg, row)
+    events_tbl = pa.table({f.name: pa.array(cols[f.name], type=f.type) for f in EVENT_SCHEMA},
+                          schema=EVENT_SCHEMA)
+
+    teams = {match["home_team"]["home_team_id"]: match["home_team"]["home_team_name"],
+             match["away_team"]["away_team_id"]: match["away_team"]["away_team_name"]}
+    players = [{"match_id": match["match_id"], "match_date": match.get("match_date"),
+                "match_week": match.get("match_week"), "team": teams.get(p["team_id"]),
+                "player_id": pid, **p} for pid, p in agg.items()]
+    player_tbl = pa.Table.from_pylist(players, schema=PLAYER_SCHEMA)
+    return events_tbl, player_tbl
+
+
+def _part_path(lake_dir: Path, name: str, competition_id, season_id, match_id) -> Path:
+    return (Path(lake_dir) / name / f"competition={competition_id}" / f"season={season_id}"
+            / f"match={match_id}" / "part-0.parquet")
+
+
+def _write_part(tbl: pa.Table, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(tbl, tmp, **PARQUET_OPTIONS)
+    os.replace(tmp, path)
+
+
+# --- a season ----------------------------------------------------------------
+
+def ingest(source, competition_id: int, season_id: int, lake_dir: Path = LAKE_DIR,
+           force: bool = False) -> dict:
+    """Stream every match of a competition season into the lake.
+
+    The player totals are written after the events, so a match whose totals
+    file exists is complete and is skipped on reruns (unless force).
+    """
+    t0 = time.perf_counter()
+    matches = sorted(source.matches(competition_id, season_id), key=lambda m: m["match_id"])
+    done = skipped = n_events = 0
+    for m in matches:
+        mid = m["match_id"]
+        agg_path = _part_path(lake_dir, PLAYER_AGG, competition_id, season_id, mid)
+        if agg_path.exists() and not force:
+            skipped += 1
+            continue
+        events_tbl, player_tbl = match_tables(m, source.events(mid))
+        _write_part(events_tbl, _part_path(lake_dir, EVENTS, competition_id, season_id, mid))
+        _write_part(player_tbl, agg_path)
+        done += 1
+        n_events += events_tbl.num_rows
+        if done % 50 == 0:
+            print(f"  {done} matches, {n_events:,} events")
+    secs = time.perf_counter() - t0
+    print(f"✅ StatsBomb {competition_id}/{season_id}: {done} matches ({n_events:,} events) ingested, "
+          f"{skipped} already in the lake, {secs:.1f}s")
+    return {"matches": done, "skipped": skipped, "events": n_events, "seconds": secs}
+
+
+def dataset(name: str = PLAYER_AGG, lake_dir: Path = LAKE_DIR) -> ds.Dataset:
+    """statsbomb_events or statsbomb_player_match, with competition/season/match keys."""
+    return ds.dataset(Path(lake_dir) / name, format="parquet", partitioning=PARTITIONING)
+
+
+def player_match(competition_id: int = None, season_id: int = None, columns=None,
+                 lake_dir: Path = LAKE_DIR):
+    """Per-player-per-match totals as a DataFrame, filtered on the partition keys."""
+    filt = None
+    for key, val in (("competition", competition_id), ("season", season_id)):
+        if val is not None:
+            cond = ds.field(key) == val
+            filt = cond if filt is None else filt & cond
+    return dataset(PLAYER_AGG, lake_dir).to_table(columns=columns, filter=filt).to_pandas()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stream StatsBomb events into the parquet lake")
+    ap.add_argument("--root", default=os.getenv("STATSBOMB_DIR"),
+                    help="local open-data `data/` directory (default: statsbombpy)")
+    ap.add_argument("--competition", default="Premier League")
+    ap.add_argument("--season", default=None, help="season name, e.g. 2015/2016")
+    ap.add_argument("--competition-id", type=int, default=None)
+    ap.add_argument("--season-id", type=int, default=None)
+    ap.add_argument("--force", action="store_true", help="re-ingest matches already in the lake")
+    a = ap.parse_args()
+
+    source = LocalSource(a.root) if a.root else ApiSource()
+    if a.competition_id is not None and a.season_id is not None:
+        cid, sid = a.competition_id, a.season_id
+    elif a.season:
+        cid, sid = find_season(source, a.competition, a.season)
+    else:
+        ap.error("give --season, or --competition-id and --season-id")
+    ingest(source, cid, sid, force=a.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+# src/synth.py
+#
+# Deterministic synthetic FPL data in the repo's real shapes, for benchmarks
+# and for trying the pipeline without the API:
+#     data/raw/bootstrap-static.json, element-{id}-history.json, matches.json,
+#     matches_2025.csv                                     (latest season)
+#     data/processed/{history,players,fixtures}_{season}.parquet   (every season)
+#     fpl.db team_stats_{season}
+# The same seed and sizes always give the same files.
+#     python src/synth.py [--root DIR] [--players 700] [--rounds 38] [--seasons 1] [--seed 0]
+
+import os
+import json
+import sqlite3
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from team_ledger import team_stats_from_fixtures
+
+LATEST   = 2025
+MAX_SEASONS = 10
+# FPL team ids 1-20, as build_fixtures_2025.py maps matches_2025.csv names
+TEAMS = ["Arsenal", "Aston Villa", "Bournemouth", "Brentford", "Brighton", "Chelsea",
+         "Crystal Palace", "Everton", "Fulham", "Ipswich", "Leicester", "Liverpool",
+         "Man City", "Man Utd", "Newcastle", "Nott'm Forest", "Southampton", "Spurs",
+         "West Ham", "Wolves"]
+# element_type per squad slot (2/5/5/3); every position is in the first four,
+# so small synthetic squads still have all of them
+POSITION_MIX = [1, 2, 3, 4, 2, 3, 2, 3, 4, 2, 3, 4, 2, 3, 1]
+GOAL_POINTS  = {1: 10, 2: 6, 3: 5, 4: 4}
+CS_POINTS    = {1: 4, 2: 4, 3: 1, 4: 0}
+FIRST = ["James", "Jack", "Harry", "Oliver", "Lucas", "Mateo", "Gabriel", "João", "Bruno",
+         "Luis", "Kai", "Leon", "Mohamed", "Youssef", "Kofi", "Yves", "Mikel", "Rúben",
+         "Tomás", "Ángel", "Martin", "Erling", "Bukayo", "Declan", "Cole", "Son", "Dominik"]
+SYLLABLES = ["sa", "ka", "ro", "mi", "de", "la", "no", "ve", "ti", "ba", "ga", "lu",
+             "mo", "ri", "se", "to", "na", "ke", "do", "fe", "ha", "ni", "po", "zu"]
+
+
+def season_names(n_seasons: int = 1) -> list:
+    if not 1 <= n_seasons <= MAX_SEASONS:
+        raise ValueError(f"seasons must be 1-{MAX_SEASONS}")
+    return [str(LATEST - k) for k in range(n_seasons)][::-1]
+
+
+def _schedule(n_teams: int, n_rounds: int, rng) -> np.ndarray:
+    """(round, home, away) for a double round robin (circle method), repeated if
+    n_rounds is longer, with a few fixtures moved to earlier rounds so there
+    are blank and double gameweeks."""
+    ids = list(range(1, n_teams + 1))
+    single = []
+    for _ in range(n_teams - 1):
+        single.append([(ids[i], ids[-1 - i]) for i in range(n_teams // 2)])
+        ids = [ids[0], ids[-1]] + ids[1:-1]
+    cycle = single + [[(a, h) for h, a in rnd] for rnd in single]
+    rows = [(r + 1, h, a) for r in range(n_rounds) for h, a in cycle[r % len(cycle)]]
+    out = np.array(rows, dtype=np.int64)
+    # about one postponed fixture per 8 rounds, replayed alongside the round before
+    for r in range(8, n_rounds + 1, 8):
+        idx = np.flatnonzero(out[:, 0] == r)
+        out[rng.choice(idx), 0] = r - 1
+    return out[np.lexsort((out[:, 1], out[:, 0]))]
+
+
+def _players(n_players: int, n_teams: int, rng) -> pd.DataFrame:
+    etype = np.array([POSITION_MIX[i // n_teams % len(POSITION_MIX)] for i in range(n_players)])
+    team = np.arange(n_players) % n_teams + 1
+    quality = rng.lognormal(0.0, 0.45, n_players)
+    seconds, seen = [], set()
+    for i in range(n_players):
+        while True:
+            name = "".join(rng.choice(SYLLABLES, rng.integers(2, 4))).capitalize()
+            if name not in seen:
+                break
+        seen.add(name)
+        seconds.append(name)
+    first = rng.choice(FIRST, n_players)
+    price = np.clip(np.round(35 + 10 * etype + 25 * (quality - 1)), 40, 150).astype(int)
+    return pd.DataFrame({
+        "id": np.arange(1, n_players + 1), "team": team, "element_type": etype,
+        "first_name": first, "second_name": seconds, "web_name": seconds,
+        "now_cost": price, "quality": quality,
+        "regular": rng.beta(3, 2, n_players),    # chance of starting
+    })
+
+
+def _fixtures(schedule: np.ndarray, strength: np.ndarray, rng) -> pd.DataFrame:
+    h, a = schedule[:, 1], schedule[:, 2]
+    lam_h = 1.45 * strength[h] / strength[a]
+    lam_a = 1.15 * strength[a] / strength[h]
+    return pd.DataFrame({"round": schedule[:, 0], "home_team_id": h, "away_team_id": a,
+                         "home_goals": rng.poisson(lam_h), "away_goals": rng.poisson(lam_a)})
+
+
+def _history(players: pd.DataFrame, fx: pd.DataFrame, season: str, rng) -> pd.DataFrame:
+    """One element-summary history record per player per fixture of their team."""
+    fx = fx.assign(fixture=np.arange(1, len(fx) + 1))
+    start = pd.Timestamp(f"{season[:4]}-08-16T19:00:00Z")
+    side = lambda us, them, gf, ga, home: fx.rename(columns={us: "team", them: "opponent_team",
+                                                              gf: "gf", ga: "ga"}).assign(was_home=home)
+    team_fx = pd.concat([side("home_team_id", "away_team_id", "home_goals", "away_goals", True),
+                         side("away_team_id", "home_team_id", "away_goals", "home_goals", False)])
+    h = players.merge(team_fx, on="team").sort_values(["id", "round", "fixture"], kind="stable")
+    h = h.reset_index(drop=True)
+    n, et, q = len(h), h["element_type"].to_numpy(), h["quality"].to_numpy()
+
+    # minutes: start (mostly 90), sub appearance or nothing
+    u = rng.random(n)
+    starts = u < h["regular"].to_numpy()
+    sub = ~starts & (u < h["regular"].to_numpy() + 0.15)
+    minutes = np.where(starts, np.where(rng.random(n) < 0.8, 90, rng.integers(46, 90, n)),
+                       np.where(sub, rng.integers(1, 45, n), 0))
+    share = minutes / 90
+    attack = np.select([et == 1, et == 2, et == 3], [0.0, 0.06, 0.18], 0.4) * q * share
+    xg = rng.gamma(2.0, attack / 2 + 1e-9)
+    xa = rng.gamma(2.0, np.select([et == 1, et == 2], [0.01, 0.06], 0.14) * q * share / 2 + 1e-9)
+    goals = np.minimum(rng.poisson(xg), h["gf"].to_numpy())
+    assists = rng.poisson(xa)
+    ga = np.where(minutes > 0, h["ga"].to_numpy(), 0)
+    cs = ((h["ga"].to_numpy() == 0) & (minutes >= 60)).astype(int)
+    saves = np.where((et == 1) & (minutes > 0), rng.poisson(3.0, n), 0)
+    yellow = (rng.random(n) < 0.1 * share).astype(int)
+    red = (rng.random(n) < 0.004 * share).astype(int)
+    pen_saved = ((et == 1) & (rng.random(n) < 0.02 * share)).astype(int)
+    pen_missed = (rng.random(n) < 0.005 * share).astype(int)
+    bps = np.maximum(0, (3 * minutes // 60 + 12 * goals + 9 * assists + 12 * cs * (et <= 2)
+                         + 2 * saves + rng.integers(-3, 12, n)) * (minutes > 0))
+    bonus = np.where(bps >= 30, 3, np.where(bps >= 24, 2, np.where(bps >= 20, 1, 0)))
+    points = ((minutes > 0).astype(int) + (minutes >= 60) + goals * np.vectorize(GOAL_POINTS.get)(et)
+              + 3 * assists + cs * np.vectorize(CS_POINTS.get)(et) + saves // 3
+              - np.where(et <= 2, ga // 2, 0) + bonus + 5 * pen_saved - 2 * pen_missed
+              - yellow - 3 * red)
+    transfers_in = rng.integers(0, 50_000, n) * q.round().astype(int)
+    transfers_out = rng.integers(0, 50_000, n)
+    influence = rng.gamma(2.0, 6.0 * share + 1e-9)
+    creativity = rng.gamma(2.0, 6.0 * share * (et > 1) + 1e-9)
+    threat = rng.gamma(2.0, 8.0 * attack + 1e-9)
+    f1 = lambda x: np.char.mod("%.1f", np.round(x, 1))
+    f2 = lambda x: np.char.mod("%.2f", np.round(x, 2))
+
+    return pd.DataFrame({
+        "element": h["id"], "fixture": h["fixture"], "opponent_team": h["opponent_team"],
+        "total_points": points, "was_home": h["was_home"],
+        "kickoff_time": (start + pd.to_timedelta(7 * (h["round"] - 1), unit="D"))
+                        .dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "team_h_score": np.where(h["was_home"], h["gf"], h["ga"]),
+        "team_a_score": np.where(h["was_home"], h["ga"], h["gf"]),
+        "round": h["round"], "modified": False, "minutes": minutes, "goals_scored": goals,
+        "assists": assists, "clean_sheets": cs, "goals_conceded": ga, "own_goals": 0,
+        "penalties_saved": pen_saved, "penalties_missed": pen_missed, "yellow_cards": yellow,
+        "red_cards": red, "saves": saves, "bonus": bonus, "bps": bps,
+        "influence": f1(influence), "creativity": f1(creativity), "threat": f1(threat),
+        "ict_index": f1((influence + creativity + threat) / 10), "starts": starts.astype(int),
+        "expected_goals": f2(xg), "expected_assists": f2(xa), "expected_goal_involvements": f2(xg + xa),
+        "expected_goals_conceded": f2(rng.gamma(2.0, 0.6, n) * share),
+        "value": h["now_cost"], "transfers_balance": transfers_in - transfers_out,
+        "selected": rng.integers(1_000, 2_000_000, n), "transfers_in": transfers_in,
+        "transfers_out": transfers_out,
+    })
+
+
+def _season_players(players: pd.DataFrame, hist: pd.DataFrame) -> pd.DataFrame:
+    """players_{season} / bootstrap `elements` rows, with season totals."""
+    totals = hist.groupby("element")[["total_points", "minutes", "goals_scored", "assists"]].sum()
+    out = players.drop(columns=["quality", "regular"]).join(totals, on="id").fillna(0)
+    owned = hist.groupby("element")["selected"].last().reindex(out["id"]).to_numpy()
+    out["selected_by_percent"] = np.char.mod("%.1f", owned / 20_000)   # of ~2M managers
+    out["status"] = "a"
+    return out.astype({c: int for c in ["total_points", "minutes", "goals_scored", "assists"]})
+
+
+def _write_raw(raw: Path, players: pd.DataFrame, hist: pd.DataFrame, fx: pd.DataFrame,
+               strength: np.ndarray):
+    n_teams = len(strength) - 1
+    teams = [{"id": t, "code": t, "name": TEAMS[t - 1] if t <= len(TEAMS) else f"Team {t}",
+              "short_name": (TEAMS[t - 1] if t <= len(TEAMS) else f"T{t}")[:3].upper(),
+              "strength": int(np.clip(round(3 + 2 * np.log(strength[t])), 1, 5))}
+             for t in range(1, n_teams + 1)]
+    element_types = [{"id": 1, "singular_name_short": "GKP", "squad_select": 2},
+                     {"id": 2, "singular_name_short": "DEF", "squad_select": 5},
+                     {"id": 3, "singular_name_short": "MID", "squad_select": 5},
+                     {"id": 4, "singular_name_short": "FWD", "squad_select": 3}]
+    # json.dumps rather than json.dump: dump streams through the pure-Python encoder
+    with open(raw / "bootstrap-static.json", "w", encoding="utf8") as f:
+        f.write(json.dumps({"elements": players.to_dict("records"), "teams": teams,
+                            "element_types": element_types}))
+
+    # element-summary files: {"fixtures": [], "history": [...], "history_past": []};
+    # hist is sorted by element, so each player's records are one contiguous slice
+    records = hist.to_dict("records")
+    elements = hist["element"].to_numpy()
+    bounds = np.flatnonzero(np.r_[True, elements[1:] != elements[:-1], True])
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        with open(raw / f"element-{elements[lo]}-history.json", "w", encoding="utf8") as f:
+            f.write(json.dumps({"fixtures": [], "history": records[lo:hi], "history_past": []}))
+
+    names = {t["id"]: t["name"] for t in teams}
+    dates = pd.Timestamp("2024-08-16") + pd.to_timedelta(7 * (fx["round"] - 1), unit="D")
+    pd.DataFrame({
+        "Match Number": np.arange(1, len(fx) + 1), "Round Number": fx["round"],
+        "Date": dates.dt.strftime("%d/%m/%Y 20:00"), "Location": "Stadium",
+        "Home Team": fx["home_team_id"].map(names), "Away Team": fx["away_team_id"].map(names),
+        "Result": fx["home_goals"].astype(str) + " - " + fx["away_goals"].astype(str),
+    }).to_csv(raw / "matches_2025.csv", index=False)
+
+    matches = [{"id": i + 1, "matchday": int(r.round), "status": "FINISHED",
+                "homeTeam": {"id": int(r.home_team_id), "name": names[r.home_team_id]},
+                "awayTeam": {"id": int(r.away_team_id), "name": names[r.away_team_id]},
+                "score": {"fullTime": {"home": int(r.home_goals), "away": int(r.away_goals)}}}
+               for i, r in enumerate(fx.itertuples(index=False))]
+    with open(raw / "matches.json", "w", encoding="utf8") as f:
+        f.write(json.dumps({"matches": matches}))
+
+
+def generate(root=".", n_players: int = 700, n_rounds: int = 38, n_seasons: int = 1,
+             seed: int = 0, n_teams: int = 20, raw: bool = True) -> dict:
+    """Write a synthetic dataset under root/data; returns row counts per table.
+
+    raw=False skips the API-shaped JSON/CSV files of the latest season.
+    """
+    root = Path(root)
+    raw_dir, proc = root / "data" / "raw", root / "data" / "processed"
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    proc.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    base = _players(n_players, n_teams, rng)
+    counts = {}
+
+    for season in season_names(n_seasons):
+        strength = np.r_[1.0, rng.lognormal(0.0, 0.25, n_teams)]
+        players = base.assign(quality=base["quality"] * rng.lognormal(0.0, 0.1, n_players))
+        moved = rng.random(n_players) < 0.1                  # transfers between seasons
+        players.loc[moved, "team"] = rng.integers(1, n_teams + 1, moved.sum())
+        fx = _fixtures(_schedule(n_teams, n_rounds, rng), strength, rng)
+        hist = _history(players, fx, season, rng)
+        season_players = _season_players(players, hist)
+
+        fx.to_parquet(proc / f"fixtures_{season}.parquet", index=False)
+        hist.to_parquet(proc / f"history_{season}.parquet", index=False)
+        season_players.to_parquet(proc / f"players_{season}.parquet", index=False)
+        with sqlite3.connect(root / "data" / "fpl.db") as conn:
+            team_stats_from_fixtures(fx).to_sql(f"team_stats_{season}", conn,
+                                                if_exists="replace", index=False)
+        conn.close()
+        counts[season] = {"history": len(hist), "players": len(season_players), "fixtures": len(fx)}
+        if raw and season == str(LATEST):
+            _write_raw(raw_dir, season_players, hist, fx, strength)
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write a deterministic synthetic FPL dataset")
+    ap.add_argument("--root", default=".", help="directory to write data/ under")
+    ap.add_argument("--players", type=int, default=700)
+    ap.add_argument("--rounds", type=int, default=38)
+    ap.add_argument("--seasons", type=int, default=1, help=f"1-{MAX_SEASONS}, ending with {LATEST}")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--no-raw", action="store_true", help="only the processed parquet files")
+    a = ap.parse_args()
+    counts = generate(a.root, a.players, a.rounds, a.seasons, a.seed, raw=not a.no_raw)
+    for season, c in counts.items():
+        print(f"✅ {season}: {c['history']:,} history rows, {c['players']} players, "
+              f"{c['fixtures']} fixtures")
+
+
+if __name__ == "__main__":
+    main()
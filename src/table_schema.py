@@ -0,0 +1,224 @@
+# src/table_schema.py
+#
+# Drops, renames, column orders and derived columns recorded as a versioned
+# log next to each parquet file (players_2024.parquet -> players_2024.schema.json)
+# and applied at read time as a pyarrow projection. Physical rewrites only
+# happen in compact().
+#     python src/table_schema.py show    data/processed/players_2024.parquet
+#     python src/table_schema.py compact data/processed/players_2024.parquet
+
+import os
+import ast
+import sys
+import json
+import time
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pathlib import Path
+
+# parquet key-value metadata: how many log entries the file already has baked in
+VERSION_KEY = b"schema_version"
+
+_CASTS = {"int": pa.int64(), "float": pa.float64(), "str": pa.string(), "bool": pa.bool_()}
+_CMP = {ast.Gt: "__gt__", ast.GtE: "__ge__", ast.Lt: "__lt__", ast.LtE: "__le__",
+        ast.Eq: "__eq__", ast.NotEq: "__ne__"}
+_BIN = {ast.Add: "__add__", ast.Sub: "__sub__", ast.Mult: "__mul__", ast.Div: "__truediv__",
+        ast.BitAnd: "__and__", ast.BitOr: "__or__"}
+
+
+def to_expression(text: str, columns: dict) -> pc.Expression:
+    """Compile a small Python-like expression over logical column names.
+
+    Supports comparisons, + - * /, and/or/not, & |, and int()/float()/str()/bool()
+    casts, e.g. "int(minutes > 45)". `columns` maps logical names to expressions.
+    """
+    def conv(node):
+        if isinstance(node, ast.Expression):
+            return conv(node.body)
+        if isinstance(node, ast.Name):
+            if node.id not in columns:
+                raise KeyError(f"unknown column {node.id!r} in {text!r}")
+            return columns[node.id]
+        if isinstance(node, ast.Constant):
+            return pc.scalar(node.value)
+        if isinstance(node, ast.Compare) and len(node.ops) == 1:
+            return getattr(conv(node.left), _CMP[type(node.ops[0])])(conv(node.comparators[0]))
+        if isinstance(node, ast.BinOp) and type(node.op) in _BIN:
+            return getattr(conv(node.left), _BIN[type(node.op)])(conv(node.right))
+        if isinstance(node, ast.BoolOp):
+            out = conv(node.values[0])
+            for v in node.values[1:]:
+                out = out & conv(v) if isinstance(node.op, ast.And) else out | conv(v)
+            return out
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ~conv(node.operand)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return pc.scalar(0) - conv(node.operand)
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in _CASTS and len(node.args) == 1):
+            return conv(node.args[0]).cast(_CASTS[node.func.id])
+        raise ValueError(f"unsupported expression {ast.dump(node)} in {text!r}")
+
+    return conv(ast.parse(text, mode="eval"))
+
+
+class TableSchema:
+    """The logical schema of one parquet file: its physical columns plus a log of changes.
+
+    Log entries (schema.json, {"ops": [...]}), each with a version number:
+      {"op": "drop",   "columns": [...]}             missing columns are ignored
+      {"op": "rename", "mapping": {old: new}}        missing columns are ignored
+      {"op": "order",  "columns": [...], "fill": v}  reindex: extras dropped, missing filled
+      {"op": "derive", "name": col, "expr": "int(minutes > 45)"}
+    The file's own parquet metadata says how many entries are already applied
+    physically, so a producer that rewrites the file from scratch gets the
+    whole log replayed on it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.log_path = self.path.with_suffix(".schema.json")
+        if self.log_path.exists():
+            self.ops = json.loads(self.log_path.read_text(encoding="utf8"))["ops"]
+        else:
+            self.ops = []
+
+    @property
+    def version(self) -> int:
+        return len(self.ops)
+
+    def file_version(self) -> int:
+        meta = pq.read_schema(self.path).metadata or {}
+        return int(meta.get(VERSION_KEY, b"0"))
+
+    # --- recording ---------------------------------------------------------
+
+    def _append(self, op: dict) -> int:
+        """Add an entry unless it changes nothing (it repeats the latest one, or the
+        logical schema already is its result), so re-running a script is a no-op."""
+        if self.ops and {k: v for k, v in self.ops[-1].items() if k not in ("version", "at")} == op:
+            return self.version
+        if self.path.exists():
+            cols = self.projection()
+            after = _apply(dict(cols), op, self.log_path)
+            if list(after) == list(cols) and all(after[c].equals(cols[c]) for c in cols):
+                return self.version
+        self.ops.append({**op, "version": self.version + 1, "at": time.time()})
+        tmp = self.log_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"ops": self.ops}, indent=1), encoding="utf8")
+        os.replace(tmp, self.log_path)
+        return self.version
+
+    def drop(self, columns) -> int:
+        return self._append({"op": "drop", "columns": list(columns)})
+
+    def rename(self, mapping: dict) -> int:
+        return self._append({"op": "rename", "mapping": dict(mapping)})
+
+    def order(self, columns, fill=None) -> int:
+        return self._append({"op": "order", "columns": list(columns), "fill": fill})
+
+    def derive(self, name: str, expr: str) -> int:
+        to_expression(expr, _AnyColumn())   # fail at record time, not at the next read
+        return self._append({"op": "derive", "name": name, "expr": expr})
+
+    # --- reading -----------------------------------------------------------
+
+    def projection(self, version: int = None) -> dict:
+        """Logical column name -> pyarrow expression over the physical file, at `version`."""
+        version = self.version if version is None else version
+        cols = {name: pc.field(name) for name in pq.read_schema(self.path).names}
+        for op in self.ops[self.file_version():version]:
+            cols = _apply(cols, op, self.log_path)
+        return cols
+
+    def columns(self, version: int = None) -> list:
+        return list(self.projection(version))
+
+    def read(self, columns=None, where: str = None, version: int = None, as_arrow=False):
+        """The logical table; only the physical columns the projection needs are read.
+
+        where is an expression over logical names (e.g. "round > 30"), pushed down
+        as a row filter.
+        """
+        full = self.projection(version)
+        proj = full if columns is None else {c: full[c] for c in columns}
+        filt = to_expression(where, full) if where else None
+        tbl = ds.dataset(self.path, format="parquet").to_table(columns=proj, filter=filt)
+        return tbl if as_arrow else tbl.to_pandas()
+
+    # --- compaction --------------------------------------------------------
+
+    def compact(self):
+        """Rewrite the file at the latest version (atomic swap); the log is kept."""
+        if self.file_version() == self.version:
+            print(f"{self.path.name} already at schema version {self.version}")
+            return
+        tbl = self.read(as_arrow=True)
+        write_table(self.path, tbl)
+        print(f"Compacted {self.path.name} to schema version {self.version}, {tbl.num_columns} cols")
+
+
+def _apply(cols: dict, op: dict, log_path=None) -> dict:
+    """One log entry applied to a {logical name: expression} projection."""
+    kind = op["op"]
+    if kind == "drop":
+        for c in op["columns"]:
+            cols.pop(c, None)
+    elif kind == "rename":
+        cols = {op["mapping"].get(c, c): e for c, e in cols.items()}
+    elif kind == "order":
+        fill = pc.scalar(op["fill"]) if op["fill"] is not None \
+            else pc.scalar(None).cast(pa.float64())
+        cols = {c: cols.get(c, fill) for c in op["columns"]}
+    elif kind == "derive":
+        cols[op["name"]] = to_expression(op["expr"], cols)
+    else:
+        raise ValueError(f"unknown schema op {kind!r} in {log_path}")
+    return cols
+
+
+class _AnyColumn(dict):
+    """Column lookup that accepts any name, for validating expressions."""
+
+    def __contains__(self, key):
+        return True
+
+    def __getitem__(self, key):
+        return pc.field(key)
+
+
+def read_table(path, columns=None, where: str = None, as_arrow=False):
+    """pd.read_parquet through the schema log of `path`."""
+    return TableSchema(path).read(columns=columns, where=where, as_arrow=as_arrow)
+
+
+def write_table(path, data):
+    """Write a table that already has the logical schema (read_table output, changed).
+
+    The file is stamped with the log's current version, so the log is not
+    replayed on top of it. A producer rebuilding from raw sources should use
+    plain to_parquet instead and let the log apply.
+    """
+    tbl = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+    path = Path(path)
+    meta = dict(tbl.schema.metadata or {})
+    meta[VERSION_KEY] = str(TableSchema(path).version).encode()
+    tmp = path.with_suffix(".write.tmp")
+    pq.write_table(tbl.replace_schema_metadata(meta), tmp)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    cmd, paths = sys.argv[1], sys.argv[2:]
+    for p in paths:
+        ts = TableSchema(p)
+        if cmd == "compact":
+            ts.compact()
+        else:
+            print(f"{p}: file at v{ts.file_version()}, log at v{ts.version}")
+            for op in ts.ops:
+                print(f"  v{op['version']}: {json.dumps({k: v for k, v in op.items() if k not in ('version', 'at')})}")
+            print(f"  columns: {ts.columns()}")
@@ -0,0 +1,103 @@
+# src/team_ledger.py
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from rolling import rolling_features
+from sqlite_bulk import connect, bulk_load
+from dataset import write_season
+from dtypes import write_parquet
+
+DATA_DIR = Path("data/processed")
+DB_PATH  = Path("data/fpl.db")
+SEASONS  = ["2025"]
+
+# team / opponent rolling form over the team's previous fixtures:
+# output name -> (ledger column, window)
+TEAM_ROLLING_MEANS = {
+    "team_form_4":                ("points", 4),
+    "team_form_10":               ("points", 10),
+    "team_form_38":               ("points", 10),   # historically a 10-GW window
+    "opp_form_4":                 ("opp_points", 4),
+    "opp_form_10":                ("opp_points", 10),
+    "opp_form_38":                ("opp_points", 38),
+    "team_goals_scored_10":       ("goals_scored", 10),
+    "team_goals_conceded_10":     ("goals_conceded", 10),
+    "opp_team_goals_scored_10":   ("opp_goals_scored", 10),
+    "opp_team_goals_conceded_10": ("opp_goals_conceded", 10),
+    "opp_clean_sheets_4":         ("opp_clean_sheet", 4),
+    "opp_clean_sheets_10":        ("opp_clean_sheet", 10),
+}
+
+TEAM_STATS_COLS = ["team_id", "round", "points", "goals_scored", "goals_conceded"]
+
+
+def team_match_ledger(fx: pd.DataFrame) -> pd.DataFrame:
+    """One row per (team, fixture) with both sides' results, built with array ops.
+
+    fx has round, home_team_id, away_team_id, home_goals, away_goals
+    (fixtures_{season}.parquet).
+    """
+    home_ids, away_ids = fx["home_team_id"].to_numpy(), fx["away_team_id"].to_numpy()
+    home_goals, away_goals = fx["home_goals"].to_numpy(), fx["away_goals"].to_numpy()
+    rounds = fx["round"].to_numpy()
+
+    gf = np.concatenate([home_goals, away_goals])
+    ga = np.concatenate([away_goals, home_goals])
+    ledger = pd.DataFrame({
+        "team_id":     np.concatenate([home_ids, away_ids]),
+        "opp_team_id": np.concatenate([away_ids, home_ids]),
+        "round":       np.concatenate([rounds, rounds]),
+        "is_home":     np.repeat([True, False], len(fx)),
+        "goals_scored":   gf,
+        "goals_conceded": ga,
+        "points":      np.select([gf > ga, gf == ga], [3, 1], 0),
+        "opp_points":  np.select([gf < ga, gf == ga], [3, 1], 0),
+    })
+    # the opponent's view of the same fixture
+    ledger["opp_goals_scored"]   = ledger["goals_conceded"]
+    ledger["opp_goals_conceded"] = ledger["goals_scored"]
+    ledger["clean_sheet"]        = (ledger["goals_conceded"] == 0).astype(int)
+    ledger["opp_clean_sheet"]    = (ledger["goals_scored"] == 0).astype(int)
+    return ledger.sort_values(["team_id", "round"], kind="stable").reset_index(drop=True)
+
+
+def team_stats_from_fixtures(fx: pd.DataFrame) -> pd.DataFrame:
+    """The team_stats_{season} shape: team_id, round, points, goals_scored, goals_conceded."""
+    return team_match_ledger(fx)[TEAM_STATS_COLS]
+
+
+def build_team_ledger(fx: pd.DataFrame) -> pd.DataFrame:
+    """Ledger plus every team/opponent rolling aggregate, computed once per team.
+
+    Windows cover the team's fixtures before this one, so players join the
+    ledger on their fixture instead of recomputing the series per squad member.
+    """
+    ledger = team_match_ledger(fx)
+    roll = rolling_features(ledger, by="team_id", order="round", means=TEAM_ROLLING_MEANS)
+    return pd.concat([ledger, roll], axis=1)
+
+
+def build_team_ledger_for(season: str):
+    """team_ledger_{season} and its team_stats_{season} summary, as parquet and in SQLite."""
+    fx = pd.read_parquet(DATA_DIR / f"fixtures_{season}.parquet")
+    ledger = build_team_ledger(fx)
+    stats = ledger[TEAM_STATS_COLS]
+
+    for name, df in ((f"team_ledger_{season}", ledger), (f"team_stats_{season}", stats)):
+        out = DATA_DIR / f"{name}.parquet"
+        write_parquet(df, out)
+        print(f"Wrote {out} ({len(df)} rows)")
+    write_season("team_ledger", ledger, season)
+
+    conn = connect(DB_PATH)
+    bulk_load(conn, f"team_ledger_{season}", ledger)
+    bulk_load(conn, f"team_stats_{season}", stats)
+    conn.close()
+    print(f"✅ Loaded {len(ledger)} rows into tables 'team_ledger_{season}' and 'team_stats_{season}'")
+
+
+if __name__ == "__main__":
+    for s in SEASONS:
+        build_team_ledger_for(s)
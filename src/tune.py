@@ -0,0 +1,219 @@
+# src/tune.py
+#
+# LightGBM hyperparameter search per position by successive halving: every
+# trial boosts to the first rung, the best 1/ETA go on boosting to the next
+# rung, and so on, so poor configs stop after a few dozen trees instead of
+# running to completion. Each walk-forward fold's lgb.Dataset is binned once
+# and shared by all trials; trials of a rung run in parallel within a CPU
+# budget. The best config per position goes to the `tuning_results` table.
+#     python src/tune.py [--positions GK DEF] [--trials 27] [--cpus 4]
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from backtest import POSITIONS, load_position, make_folds
+from sqlite_bulk import connect
+
+DB_PATH = Path("data/fpl.db")
+
+# sampled without replacement from the grid (sklearn names, which lgb.train also accepts)
+SEARCH_SPACE = {
+    "learning_rate":     [0.01, 0.02, 0.05, 0.1],
+    "num_leaves":        [15, 31, 63],
+    "max_depth":         [3, 5, 7, -1],
+    "min_child_samples": [10, 20, 50],
+    "subsample":         [0.6, 0.8, 1.0],
+    "colsample_bytree":  [0.6, 0.8, 1.0],
+    "reg_lambda":        [0.0, 1.0, 10.0],
+}
+BASE_PARAMS = {"objective": "regression", "subsample_freq": 1, "verbosity": -1, "seed": 42}
+# binning is fixed per fold; no pre-filtering so min_child_samples can vary between trials
+DATASET_PARAMS = {"max_bin": 255, "feature_pre_filter": False, "verbosity": -1, "seed": 42}
+# what a trial trained with besides its sampled params, as LGBMRegressor takes them,
+# so the logged config scores like its trial: without subsample_freq the sklearn
+# default (0) ignores the tuned subsample, and pre-filtering would drop the
+# constant features the trials' colsample_bytree drew from
+FIXED_PARAMS = {"subsample_freq": BASE_PARAMS["subsample_freq"], "random_state": BASE_PARAMS["seed"],
+                "feature_pre_filter": DATASET_PARAMS["feature_pre_filter"], "verbose": -1}
+
+N_TRIALS   = 27
+ETA        = 3
+MIN_ROUNDS = 25
+MAX_ROUNDS = 400
+TUNE_FOLDS = 4     # last walk-forward folds (one round each) every trial is scored on
+
+TUNING_SQL = """
+CREATE TABLE IF NOT EXISTS tuning_results (
+    position    TEXT NOT NULL,
+    model       TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    rmse        REAL,
+    trials      INTEGER,
+    rounds      INTEGER,    -- boosting rounds trained, all trials and folds
+    full_rounds INTEGER,    -- what running every trial to completion would cost
+    seconds     REAL,
+    created_at  REAL
+)"""
+
+
+def sample_configs(n: int, space: dict = SEARCH_SPACE, seed: int = 0) -> list:
+    """n distinct points of the grid, in a seeded random order."""
+    grid = list(itertools.product(*space.values()))
+    rng = np.random.default_rng(seed)
+    pick = rng.choice(len(grid), size=min(n, len(grid)), replace=False)
+    return [dict(zip(space, grid[i])) for i in pick]
+
+
+def rungs(min_rounds: int = MIN_ROUNDS, max_rounds: int = MAX_ROUNDS, eta: int = ETA) -> list:
+    """Boosting rounds at which trials are compared: min_rounds * eta^k, capped at max_rounds."""
+    out = [min_rounds]
+    while out[-1] < max_rounds:
+        out.append(min(out[-1] * eta, max_rounds))
+    return out
+
+
+class _Trial:
+    """One config's boosters, one per fold, trained on the folds' shared Datasets."""
+
+    def __init__(self, params: dict, folds: list):
+        self.params = params
+        self.folds = folds
+        self.boosters = []
+        self.rounds = 0
+        self.rmse = np.inf
+
+    def start(self, threads: int):
+        """Create the boosters (serially: this touches the shared Datasets' params)."""
+        import lightgbm as lgb
+
+        params = {**BASE_PARAMS, **self.params, "num_threads": threads}
+        self.boosters = [lgb.Booster(params, train) for train, _, _ in self.folds]
+        return self
+
+    def advance(self, to_rounds: int):
+        """Boost every fold up to to_rounds trees in total and rescore."""
+        for b in self.boosters:
+            for _ in range(to_rounds - self.rounds):
+                b.update()
+        self.rounds = to_rounds
+
+        # RMSE over all folds' test rows together
+        se = n = 0
+        for b, (_, X_test, y_test) in zip(self.boosters, self.folds):
+            se += float(np.sum((b.predict(X_test) - y_test) ** 2))
+            n += len(y_test)
+        self.rmse = np.sqrt(se / max(n, 1))
+        return self
+
+
+def _fold_datasets(d, n_folds: int) -> list:
+    """(train Dataset, test X, test y) for the last n_folds walk-forward folds, binned once."""
+    import lightgbm as lgb
+
+    out = []
+    for f in make_folds(d, min_train=len(d.periods) - n_folds, horizon=1):
+        train = lgb.Dataset(d.X[:f.train_end], d.y[:f.train_end], params=DATASET_PARAMS,
+                            free_raw_data=False).construct()
+        out.append((train, d.X[f.test_start:f.test_end], d.y[f.test_start:f.test_end]))
+    return out
+
+
+def successive_halving(d, n_trials: int = N_TRIALS, eta: int = ETA, min_rounds: int = MIN_ROUNDS,
+                       max_rounds: int = MAX_ROUNDS, n_folds: int = TUNE_FOLDS,
+                       cpus: int = None, threads: int = 1, seed: int = 0) -> dict:
+    """Tune LightGBM on one position's PositionData; returns the best config and its cost.
+
+    cpus caps the total threads: cpus // threads trials train at once.
+    """
+    t0 = time.perf_counter()
+    folds = _fold_datasets(d, min(n_folds, len(d.periods) - 1))
+    trials = [_Trial(p, folds).start(threads) for p in sample_configs(n_trials, seed=seed)]
+    workers = max(1, (cpus or os.cpu_count() or 1) // threads)
+
+    alive = trials
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for k, rnd in enumerate(rungs(min_rounds, max_rounds, eta)):
+            list(pool.map(lambda t: t.advance(rnd), alive))
+            alive = sorted(alive, key=lambda t: t.rmse)
+            print(f"  rung {k}: {len(alive)} trials at {rnd} rounds, best RMSE {alive[0].rmse:.4f}")
+            if rnd < max_rounds:
+                alive = alive[:max(1, len(alive) // eta)]
+
+    best = min(trials, key=lambda t: (t.rmse, -t.rounds))
+    return {
+        "params": {**best.params, **FIXED_PARAMS, "n_estimators": best.rounds},
+        "rmse": best.rmse,
+        "trials": len(trials),
+        "rounds": sum(t.rounds for t in trials) * len(folds),
+        "full_rounds": len(trials) * max_rounds * len(folds),
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def log_result(pos: str, result: dict, db_path: Path = DB_PATH):
+    conn = connect(db_path)
+    conn.execute("BEGIN")
+    try:
+        conn.execute(TUNING_SQL)
+        conn.execute("INSERT INTO tuning_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     (pos, "lgbm", json.dumps(result["params"], sort_keys=True), result["rmse"],
+                      result["trials"], result["rounds"], result["full_rounds"],
+                      result["seconds"], time.time()))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def best_config(pos: str, db_path: Path = DB_PATH) -> dict:
+    """The latest tuned config for a position, as a backtest/predict config dict
+    (`predict.py train --tuned`, `backtest.py --tuned`)."""
+    with sqlite3.connect(db_path) as conn:
+        row = conn.execute("SELECT model, params FROM tuning_results WHERE position = ? "
+                           "ORDER BY created_at DESC LIMIT 1", (pos,)).fetchone()
+    if row is None:
+        raise LookupError(f"no tuning results for {pos}; run src/tune.py")
+    return {"model": row[0], "params": json.loads(row[1])}
+
+
+def tune(positions=POSITIONS, seasons=None, **kwargs) -> pd.DataFrame:
+    rows = []
+    for pos in positions:
+        print(f"Tuning {pos}")
+        result = successive_halving(load_position(pos, seasons), **kwargs)
+        log_result(pos, result)
+        rows.append({"position": pos, **result})
+        print(f"✅ {pos}: RMSE {result['rmse']:.4f} with {result['params']} | "
+              f"{result['rounds']:,}/{result['full_rounds']:,} boosting rounds "
+              f"({result['rounds'] / result['full_rounds']:.0%}) in {result['seconds']:.1f}s")
+    return pd.DataFrame(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Successive-halving LightGBM tuning per position")
+    ap.add_argument("--positions", nargs="*", default=POSITIONS)
+    ap.add_argument("--seasons", nargs="*", default=None)
+    ap.add_argument("--trials", type=int, default=N_TRIALS)
+    ap.add_argument("--eta", type=int, default=ETA)
+    ap.add_argument("--min-rounds", type=int, default=MIN_ROUNDS)
+    ap.add_argument("--max-rounds", type=int, default=MAX_ROUNDS)
+    ap.add_argument("--folds", type=int, default=TUNE_FOLDS)
+    ap.add_argument("--cpus", type=int, default=None, help="total threads (default: all cores)")
+    ap.add_argument("--threads", type=int, default=1, help="threads per trial")
+    a = ap.parse_args()
+    tune(a.positions, a.seasons, n_trials=a.trials, eta=a.eta, min_rounds=a.min_rounds,
+         max_rounds=a.max_rounds, n_folds=a.folds, cpus=a.cpus, threads=a.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# tests/conftest.py
+#
+# src/ is a flat collection of scripts importing each other by name.
+
+import sys
+import pandas as pd
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+
+@pytest.fixture
+def lake(tmp_path, monkeypatch):
+    """Synthetic season with features built through round 30; call it to build the
+    rest, or finish(update=True) to append rounds 31-34 incrementally."""
+    import synth
+    import features_extended
+    from team_ledger import build_team_ledger_for
+
+    monkeypatch.chdir(tmp_path)
+    synth.generate(tmp_path, n_players=120, n_rounds=34, raw=False)
+    build_team_ledger_for("2025")
+    path = tmp_path / "data/processed/history_2025.parquet"
+    full = pd.read_parquet(path)
+    full[full["round"] <= 30].to_parquet(path, index=False)
+    features_extended.build_features_for("2025")
+
+    def finish(update=False):
+        full.to_parquet(path, index=False)
+        if update:
+            features_extended.update_features_for("2025")
+        else:
+            features_extended.build_features_for("2025")
+    return finish
@@ -0,0 +1,28 @@
+# tests/test_backtest.py
+
+import numpy as np
+import pandas as pd
+
+import backtest
+
+
+def test_walk_forward_mean_model(lake, tmp_path, capsys):
+    lake()
+    cache = tmp_path / "cache"
+    config = {"model": "mean", "params": {}}
+    preds = backtest.run_backtest(config, min_train=5, horizon=2, cache_dir=cache, workers=2)
+
+    feats = pd.read_parquet("data/processed/features_2025.parquet")
+    for (pos, fold_round), fold in preds.groupby(["position", "fold_round"]):
+        # trained on rounds up to the fold's, tested on the next `horizon` rounds only
+        assert set(fold["round"]) == {fold_round + 1, fold_round + 2} & set(feats["round"])
+        code = {"GK": 1, "DEF": 2, "MID": 3, "FWD": 4}[pos]
+        seen = feats[(feats["element_type"] == code) & (feats["round"] <= fold_round)]
+        np.testing.assert_allclose(fold["pred"], seen["gw_points"].mean(), rtol=1e-5)
+    assert sorted(preds["fold_round"].unique()) == list(range(5, 34))
+
+    # a second run is served from the per-fold cache with the same predictions
+    capsys.readouterr()
+    again = backtest.run_backtest(config, min_train=5, horizon=2, cache_dir=cache, workers=2)
+    assert "0 folds fitted" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(again, preds)
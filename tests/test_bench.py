@@ -0,0 +1,30 @@
+# tests/test_bench.py
+
+import pandas as pd
+
+import bench
+import synth
+
+
+def test_synth_is_deterministic(tmp_path):
+    counts = [synth.generate(tmp_path / d, n_players=50, n_rounds=6, n_seasons=2, seed=3) for d in "ab"]
+    assert counts[0] == counts[1] and list(counts[0]) == synth.season_names(2)
+    for name in ["history_2025", "players_2025", "fixtures_2024"]:
+        pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "a/data/processed" / f"{name}.parquet"),
+                                      pd.read_parquet(tmp_path / "b/data/processed" / f"{name}.parquet"))
+    raw = sorted(p.name for p in (tmp_path / "a/data/raw").iterdir())
+    assert raw[:2] == ["bootstrap-static.json", "element-1-history.json"] and "matches.json" in raw
+
+
+def test_compare_flags_regressions():
+    res = pd.DataFrame({"rows": [1000, 1000, 1000], "wall_s": [2.0, 0.02, 1.0],
+                        "cpu_s": [2.0, 0.02, 1.0], "peak_rss_mb": [100.0, 100.0, 200.0]},
+                       index=pd.Index(["slow", "tiny", "fat"], name="stage"))
+    res["rows_per_s"] = res["rows"] / res["wall_s"]
+    base = [{"stage": "slow", "rows_per_s": 1000.0, "peak_rss_mb": 100.0},
+            {"stage": "tiny", "rows_per_s": 100_000.0, "peak_rss_mb": 100.0},
+            {"stage": "fat", "rows_per_s": 1000.0, "peak_rss_mb": 100.0}]
+    out = bench.compare(res, base, tolerance=0.25)
+    # half the throughput fails; a 10 ms slow-down is timer noise; doubled memory fails
+    assert out["flag"].to_dict() == {"slow": "slower", "tiny": "", "fat": "memory"}
+    assert (bench.compare(res, None)["flag"] == "").all()
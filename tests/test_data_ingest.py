@@ -0,0 +1,98 @@
+# tests/test_data_ingest.py
+
+import json
+import time
+import threading
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import data_ingest
+
+
+class _Stub(BaseHTTPRequestHandler):
+    """element-summary endpoint: player 1 answers 503 once, player 2 429 once
+    (Retry-After: 1), player 99 does not exist; every request takes 20 ms."""
+    protocol_version = "HTTP/1.1"   # keep-alive, so pooled connections are reused
+
+    def do_GET(self):
+        srv = self.server
+        pid = int(self.path.strip("/").split("/")[-1])
+        with srv.lock:
+            srv.hits[pid].append(time.monotonic())
+            srv.ports.add(self.client_address[1])
+            srv.inflight += 1
+            srv.peak = max(srv.peak, srv.inflight)
+            n = len(srv.hits[pid])
+        time.sleep(0.02)
+        with srv.lock:
+            srv.inflight -= 1
+        if pid == 99:
+            self._send(404)
+        elif pid == 1 and n == 1:
+            self._send(503)
+        elif pid == 2 and n == 1:
+            self._send(429, {"Retry-After": "1"})
+        else:
+            self._send(200, body=json.dumps({"history": [{"element": pid, "round": 1}]}).encode())
+
+    def _send(self, status, headers=None, body=b"{}"):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    srv.lock, srv.hits, srv.ports, srv.inflight, srv.peak = threading.Lock(), defaultdict(list), set(), 0, 0
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_token_bucket_rate():
+    bucket = data_ingest.TokenBucket(rate=50, capacity=1)
+    t0 = time.monotonic()
+    for _ in range(26):
+        bucket.acquire()
+    assert 0.48 <= time.monotonic() - t0 < 1.0
+
+
+def test_fetch_element_histories(stub, tmp_path):
+    ids = list(range(1, 31)) + [99]
+    t0 = time.monotonic()
+    stats = data_ingest.fetch_element_histories(
+        ids, max_workers=4, rate=20, base_url=f"http://127.0.0.1:{stub.server_port}", raw_dir=tmp_path)
+    elapsed = time.monotonic() - t0
+
+    # 1) every player saved once, the missing one reported, not raised
+    assert stats["saved"] == 30 and stats["failed_ids"] == [99]
+    for pid in range(1, 31):
+        data = json.loads((tmp_path / f"element-{pid}-history.json").read_text())
+        assert data["history"][0]["element"] == pid
+    assert not (tmp_path / "element-99-history.json").exists()
+
+    # 2) retries: one retry each, after the backoff / Retry-After delay
+    assert len(stub.hits[1]) == 2 and stub.hits[1][1] - stub.hits[1][0] >= 0.5
+    assert len(stub.hits[2]) == 2 and stub.hits[2][1] - stub.hits[2][0] >= 1.0
+    assert len(stub.hits[99]) == 1
+
+    # 3) rate: 33 requests at 20/s with a burst of 20 take at least 13 / 20 s
+    assert elapsed >= 13 / 20
+    # 4) concurrency bounded by the pool, over reused keep-alive connections
+    assert 1 < stub.peak <= 4
+    assert len(stub.ports) <= 4
+
+    # 5) a second run finds everything fresh and sends nothing
+    again = data_ingest.fetch_element_histories(
+        range(1, 31), base_url=f"http://127.0.0.1:{stub.server_port}", raw_dir=tmp_path)
+    assert again["skipped"] == 30 and sum(len(h) for h in stub.hits.values()) == 33
@@ -0,0 +1,34 @@
+# tests/test_data_storage.py
+
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import data_storage
+
+
+def _write(raw, element, records):
+    history = [{"element": element, "round": r + 1, **rec} for r, rec in enumerate(records)]
+    (raw / f"element-{element}-history.json").write_text(json.dumps({"history": history}))
+
+
+def test_extra_fields_typed_across_files(tmp_path, monkeypatch):
+    raw, proc = tmp_path / "raw", tmp_path / "processed"
+    raw.mkdir(), proc.mkdir()
+    # the first file has nothing useful for the extras; later ones disagree on their types
+    _write(raw, 1, [{"new_int": None, "new_mixed": 1}])
+    _write(raw, 2, [{"new_int": 3, "new_mixed": 2.5, "recoveries": 4}])
+    _write(raw, 3, [{"new_int": 4, "new_mixed": "n/a", "new_float": 0.5}])
+    monkeypatch.setattr(data_storage, "RAW_DIR", str(raw))
+    monkeypatch.setattr(data_storage, "PROC_DIR", str(proc))
+
+    data_storage.load_element_histories(workers=1)
+    t = pq.read_table(proc / "history.parquet").sort_by("element")
+    assert t.schema.field("new_int").type == pa.int64()
+    assert t.schema.field("new_mixed").type == pa.string()
+    assert t.schema.field("new_float").type == pa.float64()
+    assert t.schema.field("recoveries").type == pa.int64()
+    assert t.column("new_int").to_pylist() == [None, 3, 4]
+    assert t.column("new_mixed").to_pylist() == ["1", "2.5", "n/a"]
+    assert t.column("recoveries").to_pylist() == [None, 4, None]
@@ -0,0 +1,23 @@
+# tests/test_dataset.py
+
+import pandas as pd
+
+import dataset
+
+
+def test_unknown_element_type_partitioned_as_unk(tmp_path):
+    feats = pd.DataFrame({
+        "element":      [1, 2, 3, 4, 5, 6, 7],
+        "round":        [1, 1, 1, 1, 1, 2, 2],
+        # 0: player missing from players_{season}; 7 and null: anything else off the map
+        "element_type": pd.array([1, 2, 3, 4, 0, 7, None], dtype="Int64"),
+        "points_4":     [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0],
+    })
+    dataset.write_season("features", feats, "2025", lake_dir=tmp_path)
+
+    out = dataset.read("features", lake_dir=tmp_path).sort_values("element")
+    assert out["position"].astype(str).tolist() == ["GK", "DEF", "MID", "FWD", "UNK", "UNK", "UNK"]
+    unk = dataset.read("features", positions=dataset.UNKNOWN_POSITION, lake_dir=tmp_path)
+    assert sorted(unk["element"]) == [5, 6, 7]
+    assert sorted(p.name for p in (tmp_path / "features" / "season=2025").iterdir()) == \
+        ["position=DEF", "position=FWD", "position=GK", "position=MID", "position=UNK"]
@@ -0,0 +1,35 @@
+# tests/test_feature_store.py
+
+import sqlite3
+
+import pandas as pd
+import pyarrow as pa
+
+import feature_store
+
+
+def test_position_views_match_the_full_table(lake):
+    import add_features_2025_to_db
+
+    lake()
+    full = pd.read_parquet("data/processed/features_2025.parquet")
+    slices = feature_store.position_slices(pa.Table.from_pandas(full.sample(frac=1, random_state=0),
+                                                                preserve_index=False))
+    add_features_2025_to_db.main()
+
+    with sqlite3.connect("data/fpl.db") as conn:
+        for code, pos in feature_store.POSITIONS.items():
+            want = full[full["element_type"] == code]
+            cols = feature_store.position_columns(pos, full.columns)
+            key = [c for c in cols if c != "name"]   # a double gameweek repeats (round, element)
+            assert not set(cols) & set(feature_store.POSITION_DROPS[pos])
+
+            # lake partition, in-memory slice and SQL view all hold the same rows and columns
+            lake_rows = feature_store.read_position(pos, lake_dir="data/lake")
+            view = pd.read_sql(f'SELECT * FROM "features_2025_{pos}"', conn)
+            for got in (lake_rows, slices[pos].to_pandas(), view):
+                assert list(got.columns) == cols
+                pd.testing.assert_frame_equal(
+                    got.sort_values(key).reset_index(drop=True),
+                    want[cols].sort_values(key).reset_index(drop=True),
+                    check_dtype=False, check_categorical=False)
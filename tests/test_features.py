@@ -0,0 +1,102 @@
+# tests/test_features.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import features_extended
+
+
+@pytest.mark.parametrize("by_position", [False, True])
+def test_parallel_build_matches_serial(lake, by_position):
+    lake()
+    path = "data/processed/features_2025.parquet"
+    serial = pd.read_parquet(path)
+    features_extended.build_features_parallel(["2025"], workers=2, by_position=by_position)
+    pd.testing.assert_frame_equal(pd.read_parquet(path), serial)
+
+
+def test_update_appends_rows_typed_like_a_full_load(lake):
+    import sqlite3
+    import add_features_2025_to_db
+
+    add_features_2025_to_db.main()
+    lake(update=True)
+    with sqlite3.connect("data/fpl.db") as conn:
+        db = pd.read_sql("SELECT * FROM features_2025 WHERE round > 30 ORDER BY round, element", conn)
+    pq = (pd.read_parquet("data/processed/features_2025.parquet").query("round > 30")
+          .sort_values(["round", "element"]).reset_index(drop=True))
+    # float32 features hold the same (rounded) values in both copies
+    pd.testing.assert_frame_equal(db, pq[db.columns], check_dtype=False, check_categorical=False,
+                                  check_exact=True)
+
+
+def test_rolling_features_match_groupby_rolling():
+    from rolling import rolling_features
+
+    rng = np.random.default_rng(0)
+    # ragged groups: 1, 2, 3 and 12 rows, shuffled, with gaps in the values
+    element = np.repeat([7, 3, 9, 1], [1, 2, 3, 12])
+    rnd = np.concatenate([rng.permutation(n) + 1 for n in [1, 2, 3, 12]])
+    df = pd.DataFrame({"element": element, "round": rnd, "x": rng.normal(size=len(element))})
+    df.loc[[2, 6, 10], "x"] = np.nan
+    df = df.sample(frac=1, random_state=1).reset_index(drop=True)
+
+    got = rolling_features(df, by="element", order="round",
+                           means={"x_4": ("x", 4), "x_10": ("x", 10)}, cumsums={"x_cum": "x"})
+    gb = df.sort_values(["element", "round"]).groupby("element")["x"]
+    for name, window in [("x_4", 4), ("x_10", 10)]:
+        want = gb.transform(lambda s: s.shift(1).rolling(window, min_periods=1).mean())
+        pd.testing.assert_series_equal(got[name], want.reindex(df.index), check_names=False)
+    want = gb.transform(lambda s: s.shift(1).cumsum())
+    pd.testing.assert_series_equal(got["x_cum"], want.reindex(df.index), check_names=False)
+
+
+def test_update_matches_full_rebuild(lake):
+    lake(update=True)
+    path = "data/processed/features_2025.parquet"
+    key = ["round", "element", "is_home"]
+    updated = pd.read_parquet(path).sort_values(key, kind="stable").reset_index(drop=True)
+    # the rebuild must not depend on how history rows are ordered in the file
+    hist = "data/processed/history_2025.parquet"
+    pd.read_parquet(hist).sort_values(["round", "element"]).to_parquet(hist, index=False)
+    features_extended.build_features_for("2025")
+    rebuilt = pd.read_parquet(path).sort_values(key, kind="stable").reset_index(drop=True)
+    assert (updated["transfers_in_pct"] > 0).any()
+    pd.testing.assert_frame_equal(updated, rebuilt, check_dtype=False, check_categorical=False)
+
+
+def test_transferred_player_keeps_the_club_they_played_for(lake):
+    lake()
+    path = "data/processed/features_2025.parquet"
+    context = ["team_form_4", "team_goals_scored_10", "opp_form_4", "fixture_difficulty",
+               "fixtures_next_3", "double_gw", "blank_gw"]
+    before = pd.read_parquet(path).sort_values(["element", "round", "is_home"]).reset_index(drop=True)
+
+    # a move after the last round: players_2025 now lists the new club for every row
+    players_path = "data/processed/players_2025.parquet"
+    players = pd.read_parquet(players_path)
+    moved = players["id"].iloc[:10]
+    players.loc[players["id"].isin(moved), "team"] = players["team"] % 20 + 1
+    players.to_parquet(players_path, index=False)
+    features_extended.build_features_for("2025")
+    after = pd.read_parquet(path).sort_values(["element", "round", "is_home"]).reset_index(drop=True)
+
+    rows = before["element"].isin(moved)
+    assert rows.any()
+    pd.testing.assert_frame_equal(after.loc[rows, context], before.loc[rows, context])
+
+
+def test_clubs_played_for_reads_the_fixture_list():
+    from fixture_index import build_index, clubs_played_for
+
+    # round 1: 1 v 2, 3 v 4; round 2: 2 v 3 and a double for 4, at home to 1 and to 2
+    fx = pd.DataFrame({"round": [1, 1, 2, 2, 2], "home_team_id": [1, 3, 2, 4, 4],
+                       "away_team_id": [2, 4, 3, 1, 2]})
+    index = build_index(fx)
+    team = clubs_played_for(index, elements=[10, 10, 11, 11, 12, 12, 13], opponents=[2, 4, 4, 4, 9, 4, 4],
+                            rounds=[1, 2, 1, 2, 1, 2, 2], was_home=[True, False, True, False, True, False, False],
+                            current=[7, 7, 7, 7, 7, 7, 8])
+    # away at 4 in round 2 could be 1 or 2: the player's own round-1 row decides,
+    # then the current club; no fixture at all (opponent 9) falls back the same way
+    assert team.tolist() == [1, 1, 3, 3, 7, 7, 8]
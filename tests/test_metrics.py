@@ -0,0 +1,51 @@
+# tests/test_metrics.py
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def on(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)                     # DB_PATH is data/fpl.db
+    monkeypatch.setattr(metrics, "_enabled", True)
+    monkeypatch.setattr(metrics, "_trace", False)
+    monkeypatch.setenv("FPL_RUN_ID", "run-1")
+    return tmp_path / "data" / "fpl.db"
+
+
+def _rows(db):
+    with sqlite3.connect(db) as conn:
+        return pd.read_sql("SELECT * FROM run_metrics", conn)
+
+
+def test_stage_records_a_row(on):
+    @metrics.stage
+    def build(n):
+        with metrics.stage("inner") as m:
+            m.rows_in = 5
+        metrics.rows(rows_in=n)
+        return pd.DataFrame({"x": range(3)})
+
+    assert len(build(7)) == 3
+    with pytest.raises(ValueError), metrics.stage("broken"):
+        raise ValueError("boom")
+
+    got = _rows(on).set_index("stage")
+    assert list(got.index) == ["inner", "test_stage_records_a_row.<locals>.build", "broken"]
+    outer = got.loc["test_stage_records_a_row.<locals>.build"]
+    assert (outer["run_id"], outer["rows_in"], outer["rows_out"], outer["status"]) == ("run-1", 7, 3, "ok")
+    assert outer["wall_s"] >= 0 and outer["peak_rss_mb"] > 0
+    assert got.loc["inner", "parent"] == outer.name and got.loc["inner", "rows_in"] == 5
+    assert got.loc["broken", "status"] == "failed"
+    assert metrics.load_runs(on).set_index("stage").loc["broken", "failed"]
+
+
+def test_disabled_stage_records_nothing(on, monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", False)
+    with metrics.stage("quiet") as m:
+        m.rows_in = 1
+    assert not on.exists()
@@ -0,0 +1,63 @@
+# tests/test_model_update.py
+#
+# Incremental refresh for the models that support it. Each test is skipped
+# when its library can't be imported.
+
+import numpy as np
+import pytest
+
+import model_update
+from predict import load_models
+
+
+def _xy(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.random((n, 5)).astype(np.float32)
+    return X, (3 * X[:, 0] + rng.random(n)).astype(np.float32)
+
+
+def test_lgbm_update_adds_n_trees(tmp_path):
+    lgb = pytest.importorskip("lightgbm")
+    X, y = _xy()
+    model = lgb.LGBMRegressor(n_estimators=30, verbose=-1).fit(X, y)
+    d = type("D", (), {"X": X, "y": y})
+    binned = tmp_path / "MID.bin"
+    model_update._save_binned(model, d, binned)
+    out = model_update._add_trees_lgbm(model, X[:100], y[:100], 5, binned)
+    assert out.num_trees() == 35
+    assert model.booster_.num_trees() == 30
+
+
+def test_xgb_update_adds_n_trees():
+    xgb = pytest.importorskip("xgboost")
+    X, y = _xy()
+    model = xgb.XGBRegressor(n_estimators=30).fit(X, y)
+    out = model_update._add_trees_xgb(model, X[:100], y[:100], 5, None)
+    assert out.get_booster().num_boosted_rounds() == 35
+
+
+@pytest.mark.parametrize("model, params", [
+    ("lgbm", {"n_estimators": 20, "verbose": -1}),
+    ("xgb", {"n_estimators": 20}),
+])
+def test_refresh_adds_trees(lake, tmp_path, model, params):
+    pytest.importorskip({"lgbm": "lightgbm", "xgb": "xgboost"}[model])
+    models = tmp_path / "models"
+    version = model_update.full_train({"model": model, "params": params}, model_dir=models)
+    lake()
+    new = model_update.refresh(full_every=100, drift=np.inf, n_trees=5, model_dir=models)
+    assert new == f"{version}+34"
+    _, bundles = load_models(new, models)
+    for bundle in bundles.values():
+        m = bundle["model"]
+        n = m.num_trees() if model == "lgbm" else m.get_booster().num_boosted_rounds()
+        assert n == 25
+        assert tuple(bundle["trained_through"]) == ("2025", 34)
+
+
+def test_refresh_without_updater_retrains(lake, tmp_path):
+    models = tmp_path / "models"
+    version = model_update.full_train({"model": "mean", "params": {}}, model_dir=models)
+    lake()
+    new = model_update.refresh(full_every=100, drift=np.inf, model_dir=models)
+    assert new != version and "+" not in new
@@ -0,0 +1,31 @@
+# tests/test_optimizer.py
+
+import numpy as np
+import pytest
+
+import optimizer
+
+
+def _club_heavy_pool(n=120, seed=0):
+    """random_pool with the best value players crowded into three clubs."""
+    cand = optimizer.random_pool(n, seed)
+    value = (cand["xp"] / cand["price"]).to_numpy()
+    top = np.argsort(-value)[: n // 3]
+    cand.loc[top, "team_id"] = np.arange(len(top)) % 3 + 1
+    return cand
+
+
+@pytest.mark.parametrize("cand", [optimizer.random_pool(150, 0), optimizer.random_pool(150, 1),
+                                  _club_heavy_pool()], ids=["random0", "random1", "club_heavy"])
+def test_pruning_keeps_the_optimum(cand):
+    full = optimizer.optimize_squad(cand, prune=False)
+    pruned = optimizer.optimize_squad(cand, prune=True)
+    assert pruned.attrs["candidates"] < len(cand)
+    assert pruned.attrs["objective"] == pytest.approx(full.attrs["objective"], abs=1e-6)
+
+
+def test_pruning_spares_kept_players():
+    cand = optimizer.random_pool(150, 0)
+    worst = cand.loc[cand["xp"].idxmin(), "element"]
+    assert worst not in optimizer.prune_dominated(cand)["element"].values
+    assert worst in optimizer.prune_dominated(cand, keep=[worst])["element"].values
@@ -0,0 +1,58 @@
+# tests/test_player_map.py
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from player_map import name_tokens, name_score, resolve
+
+
+def _score(a, b):
+    return name_score(name_tokens(a), name_tokens(b))
+
+
+def test_name_score_variants():
+    # accents and letters NFKD does not decompose
+    assert _score("Martin Ødegaard", "Martin Odegaard") == pytest.approx(1.0)
+    assert _score("Kepa Arrizabalaga", "Kepa Arrizabalága") == pytest.approx(1.0)
+    # nicknames expand to the full first name
+    assert _score("Mo Salah", "Mohamed Salah") == pytest.approx(1.0)
+    # an initial plus surname matches, initials alone never do
+    assert _score("B. Saka", "Bukayo Saka") > 0.8
+    assert _score("B.", "Bukayo Saka") == 0.0
+    # different people sharing a surname stay well apart
+    assert _score("Nicolas Jackson", "Nicolas Jackson") > _score("Nicolas Jackson", "Curtis Jones") + 0.5
+
+
+PLAYERS = pd.DataFrame({
+    "element":     [1, 2, 3, 4],
+    "first_name":  ["Mohamed", "Bukayo", "Gabriel", "Gabriel"],
+    "second_name": ["Salah", "Saka", "dos Santos Magalhães", "Fernando de Jesus"],
+    "web_name":    ["M.Salah", "Saka", "Gabriel", "G.Jesus"],
+    "team_name":   ["Liverpool", "Arsenal", "Arsenal", "Arsenal"],
+})
+
+
+def test_resolve_assigns_one_to_one_and_caches(tmp_path):
+    db = tmp_path / "fpl.db"
+    records = pd.DataFrame({
+        "source_id": [10, 11, 12, 13],
+        "name":      ["Mo Salah", "B. Saka", "Gabriel Magalhães", "Gabriel Jesus"],
+        "team":      ["Liverpool", "Arsenal FC", "Arsenal", "Arsenal"],
+    })
+    out = resolve(records, "test", players=PLAYERS, db_path=db).set_index("source_id")
+    assert out["element"].to_dict() == {"10": 1, "11": 2, "12": 3, "13": 4}
+
+    # a second source record for Salah finds him taken: one FPL player per source player
+    again = pd.DataFrame({"source_id": [10, 14], "name": ["Mo Salah", "Mohamed Salah"],
+                          "team": ["Liverpool", "Liverpool"]})
+    out = resolve(again, "test", players=PLAYERS, db_path=db).set_index("source_id")
+    assert out.loc["10", "element"] == 1 and pd.isna(out.loc["14", "element"])
+
+    # everything cached: no FPL players needed (players=None would read players_2025.parquet)
+    out = resolve(records, "test", db_path=db)
+    assert out["element"].tolist() == [1, 2, 3, 4]
+    with sqlite3.connect(db) as conn:
+        n = conn.execute("SELECT COUNT(*), COUNT(element) FROM player_id_map").fetchone()
+    assert n == (5, 4)   # the unmatched record is kept, to be retried
@@ -0,0 +1,36 @@
+# tests/test_predict.py
+
+import sqlite3
+
+import pandas as pd
+
+from predict import train_models, predict_upcoming, write_predictions, read_predictions
+
+
+def test_predict_writes_the_predictions_table(lake, tmp_path):
+    models = tmp_path / "models"
+    version = train_models({"model": "mean", "params": {}}, model_dir=models)
+
+    # features are built through round 30 and the synthetic season ends at 34
+    preds = predict_upcoming(version, model_dir=models)
+    assert sorted(preds["round"].unique()) == [31, 32, 33, 34]
+    assert not preds.duplicated(["element", "round"]).any() and preds["xp"].notna().all()
+    # a double gameweek is one row with both fixtures' xp
+    fx = pd.read_parquet("data/processed/fixtures_2025.parquet").query("round > 30")
+    per_team = pd.concat([fx[["round", "home_team_id"]].set_axis(["round", "team"], axis=1),
+                          fx[["round", "away_team_id"]].set_axis(["round", "team"], axis=1)])
+    assert preds["fixtures"].max() == per_team.value_counts().max()
+
+    assert write_predictions(preds) == len(preds)
+    stored = read_predictions(db_path="data/fpl.db")
+    pd.testing.assert_frame_equal(
+        stored.drop(columns="created_at").sort_values(["element", "round"]).reset_index(drop=True),
+        preds.sort_values(["element", "round"]).reset_index(drop=True), check_dtype=False)
+
+    # rewriting upserts; another version's rows are kept alongside
+    write_predictions(preds)
+    write_predictions(preds.assign(model_version="other", xp=0.0))
+    with sqlite3.connect("data/fpl.db") as conn:
+        counts = dict(conn.execute("SELECT model_version, COUNT(*) FROM predictions GROUP BY 1").fetchall())
+    assert counts == {version: len(preds), "other": len(preds)}
+    assert (read_predictions(32, version)["round"] == 32).all()
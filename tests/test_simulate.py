@@ -0,0 +1,35 @@
+# tests/test_simulate.py
+
+import numpy as np
+import pandas as pd
+
+import simulate
+
+
+def _teams():
+    return simulate.TeamRates(np.array([1, 2, 3]), np.array([1.6, 1.2, 1.0]),
+                              np.array([1.0, 1.3, 1.5]), 1.3)
+
+
+def test_double_gameweek_goals_against_are_the_opponents_goals():
+    # team 1 plays twice: 3 v 1 (away, slot 0) then 1 v 2 (home, slot 1)
+    teams = _teams()
+    fixtures = pd.DataFrame({"home_team_id": [3, 1], "away_team_id": [1, 2]})
+    sched = simulate._schedule(teams, fixtures)
+    (gf0, ga0), (gf1, ga1) = simulate.team_goals(teams, sched, 20_000, np.random.default_rng(0))
+    t1, t2, t3 = 0, 1, 2
+    # 3 v 1
+    assert (ga0[:, t1] == gf0[:, t3]).all() and (ga0[:, t3] == gf0[:, t1]).all()
+    # 1 v 2: team 1's second fixture against team 2's only one
+    assert (ga1[:, t1] == gf0[:, t2]).all() and (ga0[:, t2] == gf1[:, t1]).all()
+    assert 0.1 < (ga1[:, t1] == 0).mean() < 0.9
+    # nobody else has a second fixture
+    assert (gf1[:, [t2, t3]] == 0).all() and (ga1[:, [t2, t3]] == 0).all()
+
+
+def test_league_average_opponent_without_fixtures():
+    teams = _teams()
+    sched = simulate._schedule(teams)
+    [(gf, ga)] = simulate.team_goals(teams, sched, 50_000, np.random.default_rng(1))
+    assert np.allclose(gf.mean(0), teams.attack, rtol=0.05)
+    assert np.allclose(ga.mean(0), teams.defence, rtol=0.05)
@@ -0,0 +1,57 @@
+# tests/test_statsbomb_ingest.py
+
+import json
+
+import pytest
+
+import statsbomb_ingest as sbi
+
+MATCH = {"match_id": 5, "match_date": "2025-08-16", "match_week": 1,
+         "home_team": {"home_team_id": 1, "home_team_name": "Arsenal"},
+         "away_team": {"away_team_id": 2, "away_team_name": "Chelsea"}}
+EVENTS = [
+    {"id": "a", "index": 1, "period": 1, "minute": 10, "second": 5, "type": {"name": "Pass"},
+     "possession": 3, "possession_team": {"id": 1}, "play_pattern": {"name": "Regular Play"},
+     "team": {"id": 1}, "player": {"id": 7, "name": "Bukayo Saka"}, "position": {"name": "Right Wing"},
+     "location": [60.0, 40.0], "duration": 1.2,
+     "pass": {"end_location": [108.0, 38.0], "goal_assist": True}},
+    {"id": "b", "index": 2, "period": 1, "minute": 10, "second": 7, "type": {"name": "Shot"},
+     "possession": 3, "possession_team": {"id": 1}, "play_pattern": {"name": "Regular Play"},
+     "team": {"id": 1}, "player": {"id": 9, "name": "Kai Havertz"}, "position": {"name": "Center Forward"},
+     "location": [108.0, 38.0], "under_pressure": True,
+     "shot": {"statsbomb_xg": 0.35, "outcome": {"name": "Goal"}, "type": {"name": "Open Play"},
+              "end_location": [120.0, 40.0, 1.0]}},
+]
+
+
+def test_match_tables_two_events():
+    events, players = sbi.match_tables(MATCH, EVENTS)
+    assert events.schema == sbi.EVENT_SCHEMA and players.schema == sbi.PLAYER_SCHEMA
+
+    ev = events.to_pylist()
+    assert [e["type"] for e in ev] == ["Pass", "Shot"]
+    assert ev[0]["end_x"] == 108.0 and ev[0]["key_pass"] and ev[0]["goal_assist"]
+    assert ev[1]["outcome"] == "Goal" and ev[1]["shot_xg"] == pytest.approx(0.35)
+    assert ev[1]["under_pressure"] and not ev[0]["under_pressure"]
+
+    rows = {p["player_id"]: p for p in players.to_pylist()}
+    assert rows[7] == {
+        "match_id": 5, "match_date": "2025-08-16", "match_week": 1, "team_id": 1, "team": "Arsenal",
+        "player_id": 7, "player": "Bukayo Saka", "touches": 1, "touches_in_box": 0, "shots": 0,
+        "goals": 0, "xg": 0.0, "key_passes": 1, "assists": 1}
+    assert (rows[9]["touches"], rows[9]["touches_in_box"], rows[9]["shots"], rows[9]["goals"]) == (1, 1, 1, 1)
+    assert rows[9]["xg"] == pytest.approx(0.35) and rows[9]["assists"] == 0
+
+
+def test_ingest_writes_each_match_once(tmp_path):
+    src = tmp_path / "open-data"
+    (src / "matches" / "2").mkdir(parents=True)
+    (src / "events").mkdir()
+    (src / "matches" / "2" / "27.json").write_text(json.dumps([MATCH]))
+    (src / "events" / "5.json").write_text(json.dumps(EVENTS))
+    lake = tmp_path / "lake"
+
+    assert sbi.ingest(sbi.LocalSource(src), 2, 27, lake_dir=lake)["matches"] == 1
+    assert sbi.ingest(sbi.LocalSource(src), 2, 27, lake_dir=lake)["skipped"] == 1
+    totals = sbi.player_match(2, 27, lake_dir=lake)
+    assert sorted(totals["player_id"]) == [7, 9] and set(totals["match"]) == {5}
@@ -0,0 +1,20 @@
+# tests/test_tune.py
+
+import pytest
+
+import tune
+from backtest import load_position, run_backtest, score
+
+
+def test_logged_config_reproduces_tuned_rmse(lake, tmp_path, monkeypatch):
+    pytest.importorskip("lightgbm")
+    # row subsampling on, so a logged config that loses subsample_freq scores differently
+    monkeypatch.setitem(tune.SEARCH_SPACE, "subsample", [0.6])
+    lake()
+    d = load_position("MID")
+    result = tune.successive_halving(d, n_trials=6, min_rounds=10, max_rounds=90, n_folds=3)
+    tune.log_result("MID", result)
+    config = tune.best_config("MID")
+    preds = run_backtest(config, ["MID"], min_train=len(d.periods) - 3, data={"MID": d},
+                         cache_dir=tmp_path / "cache")
+    assert score(preds)["rmse"].iat[0] == pytest.approx(result["rmse"], rel=1e-5)